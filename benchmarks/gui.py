@@ -0,0 +1,238 @@
+# file:   gui.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: interactive latency benchmarks of the running application.
+# Drives the real App through a scripted session on synthetic files: open a
+# file, scroll the table, click-select columns and assign them as x- and
+# y-data, Update the plot, move the cursor across it, drag continuum segments
+# and Run Tool. Each step is injected as a Tk event or menu callback and timed
+# until Tk is idle again, which is the delay a user sees before the window
+# responds. Latency percentiles and the number of full plot draws and overlay
+# blits are recorded per step, and compared against a saved baseline like
+# benchmarks.run. Dialogs raise instead of waiting for input, so no human
+# interaction is needed; without a display the session runs under a virtual
+# X server.
+#
+# usage: python -m benchmarks.gui [--preset quick|full] [--baseline FILE] [--threshold 0.2]
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tkinter as tk
+import tkinter.messagebox
+import tkinter.simpledialog
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.run import DEFAULT_THRESHOLD, compare, environment, start_display
+
+# (n_points, n_spectra) per session, the table is populated cell by cell so sizes stay small
+PRESETS = {
+    'quick': [(500, 10)],
+    'full':  [(500, 10), (2000, 50)],
+}
+DEFAULT_REPEAT = 5
+N_SCROLL = 60  # mouse wheel events, down then back up
+N_MOTION = 200 # cursor positions across the plot
+N_DRAG = 40    # cursor positions while dragging each segment
+
+def _no_dialog(*args, **kwargs):
+    """Stands in for the dialogs during a session, a dialog would wait for input forever."""
+    raise RuntimeError(f'a dialog was opened: {args or kwargs}')
+
+_dialogs = [(tkinter.messagebox, name) for name in ('showwarning', 'showinfo', 'showerror', 'askyesno', 'askokcancel')] + \
+           [(tkinter.simpledialog, name) for name in ('askfloat', 'askinteger', 'askstring')]
+
+class _Recorder():
+    """Collects event-to-idle latencies and plot frame counts per step of the session."""
+
+    def __init__(self, app):
+        self._app = app
+        self._samples = {}
+        self._frames = {'draws': 0, 'blits': 0}
+        canvas = app._plot._canvas
+        canvas.mpl_connect('draw_event', lambda e: self._count('draws'))
+        blit = canvas.blit
+        def counting_blit(*args, **kwargs):
+            self._count('blits')
+            return blit(*args, **kwargs)
+        canvas.blit = counting_blit
+
+    def _count(self, kind: str) -> None:
+        self._frames[kind] += 1
+
+    def settle(self) -> None:
+        """Process every pending event and idle callback."""
+        self._app.update()
+
+    def time(self, step: str, fn) -> None:
+        """Run fn, which injects one event or callback, and record the time until Tk is idle again."""
+        samples = self._samples.setdefault(step, {'times': [], 'draws': 0, 'blits': 0})
+        draws, blits = self._frames['draws'], self._frames['blits']
+        start = time.perf_counter()
+        fn()
+        self._app.update()
+        samples['times'].append(time.perf_counter() - start)
+        samples['draws'] += self._frames['draws'] - draws
+        samples['blits'] += self._frames['blits'] - blits
+
+    def results(self, suffix: str) -> dict:
+        """Returns the latency percentiles and frame counts of every step, keyed by 'step[suffix]'."""
+        results = {}
+        for step, samples in self._samples.items():
+            times = np.array(samples['times'])
+            results[f'{step}[{suffix}]'] = {
+                'events': len(times), 'median s': float(statistics.median(times)), 'mean s': float(times.mean()),
+                'p90 s': float(np.percentile(times, 90)), 'p99 s': float(np.percentile(times, 99)),
+                'max s': float(times.max()), 'draws': samples['draws'], 'blits': samples['blits']}
+        self._samples = {}
+        return results
+
+def _plot_position(app, x: float, y: float) -> tuple:
+    """Returns the Tk widget coordinates of the data point (x, y) on the plot."""
+    plot = app._plot
+    x_px, y_px = plot._plot.transData.transform((x, y))
+    height = plot._canvas.get_width_height(physical=True)[1]
+    return int(round(x_px)), int(round(height - y_px))
+
+def _motion(widget, x: int, y: int):
+    return lambda: widget.event_generate('<Motion>', x=x, y=y)
+
+def _session(app, recorder: _Recorder, filename: str, x: np.array, y: np.array, repeat: int) -> None:
+    """The scripted session on one file, see the module description."""
+    table, plot = app._table, app._plot
+
+    # File -> Open, without the file dialog
+    for _ in range(repeat):
+        recorder.time('open', lambda: (table.open(filename), app._update_dataset_menu()))
+
+    # mouse wheel over the table
+    for i in range(N_SCROLL):
+        delta = -120 if i < N_SCROLL // 2 else 120
+        recorder.time('table_scroll', lambda: table._canvas.event_generate('<MouseWheel>', delta=delta, x=5, y=5))
+
+    # click the first value of a column, its values below are selected, then assign it
+    def click(col: int):
+        column = table._table_columns[col]
+        column.selection_clear(0, tk.END)
+        column.selection_set(1)
+        column.event_generate('<ButtonRelease-1>', x=1, y=1)
+    recorder.time('click_select', lambda: click(0))
+    recorder.time('set_x', table._set_x)
+    for col in range(1, len(table._table_columns)):
+        recorder.time('click_select', lambda: click(col))
+        recorder.time('add_y', table._add_y)
+
+    # Update, a full plot draw
+    for _ in range(repeat):
+        recorder.time('update', plot._update_button.invoke)
+
+    # cursor motion across the plot while selecting points, snapping to the nearest spectrum
+    app._straight_line_continuum_removal_cb()
+    recorder.settle()
+    widget = plot._canvas.get_tk_widget()
+    y_mid = float(np.nanmedian(y))
+    for x_pt in np.linspace(x[0], x[-1], N_MOTION):
+        recorder.time('plot_motion', _motion(widget, *_plot_position(app, x_pt, y_mid)))
+
+    # drag a segment around each band, the live preview follows the cursor
+    y_first = y[:, 0]
+    for x_min, x_max in synthetic.band_segments(3, x[0], x[-1]):
+        start = _plot_position(app, x_min, np.interp(x_min, x, y_first))
+        recorder.time('plot_press', lambda: widget.event_generate('<ButtonPress-1>', x=start[0], y=start[1]))
+        for x_pt in np.linspace(x_min, x_max, N_DRAG):
+            recorder.time('plot_drag', _motion(widget, *_plot_position(app, x_pt, np.interp(x_pt, x, y_first))))
+        end = _plot_position(app, x_max, np.interp(x_max, x, y_first))
+        recorder.time('plot_release', lambda: widget.event_generate('<ButtonRelease-1>', x=end[0], y=end[1]))
+
+    # Run Tool on the selected segments, the analytics window is closed again after each run
+    for _ in range(repeat):
+        recorder.time('run_tool', app._run_tool)
+        if app._analytics_window is not None:
+            app._analytics_window.destroy()
+            app._analytics_window = None
+            recorder.settle()
+
+    # close the file for the next session
+    while table.get_dataset_id() is not None:
+        app._close_dataset()
+    plot.clear()
+    recorder.settle()
+
+def run_session(preset='quick', repeat=DEFAULT_REPEAT) -> dict:
+    """Runs the scripted session for every size of the preset, returns the results keyed by 'step[n_points x n_spectra]'."""
+    gui, display = start_display('benchmarks.gui')
+    if not gui:
+        print('skipped, no display available')
+        return {}
+    tmp_dir = tempfile.mkdtemp(prefix='sat-bench-gui-')
+    originals = [(module, name, getattr(module, name)) for module, name in _dialogs]
+    for module, name, _ in originals:
+        setattr(module, name, _no_dialog)
+    app = None
+    results = {}
+    try:
+        from classes.App import App
+        app = App()
+        while app._plot is None: # the plot is built once the window is shown
+            app.update()
+        app._result_store = None # every run is computed, and the user's stored results are left alone
+        recorder = _Recorder(app)
+        for n_points, n_spectra in PRESETS[preset]:
+            x, y = synthetic.generate_spectra(n_points, n_spectra, n_bands=3, noise=0.01)
+            filename = os.path.join(tmp_dir, f'spectra_{n_points}x{n_spectra}.csv')
+            synthetic.write_spectra(filename, x, y)
+            _session(app, recorder, filename, x, y, repeat)
+            for key, result in recorder.results(f'{n_points}x{n_spectra}').items():
+                results[key] = result
+                print(f'{key:32s} median {1000 * result["median s"]:9.2f} ms   p90 {1000 * result["p90 s"]:9.2f} ms'
+                      f'   p99 {1000 * result["p99 s"]:9.2f} ms   draws {result["draws"]:4d}   blits {result["blits"]:5d}')
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+        if app is not None:
+            app.destroy()
+        if display is not None:
+            display.stop()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the interactive latency of the application.')
+    parser.add_argument('--preset', choices=sorted(PRESETS.keys()), default='quick')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'gui_results.json'))
+    parser.add_argument('--baseline', default=os.path.join('benchmarks', 'gui_baseline.json'))
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown of the median latency relative to the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='also write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run_session(args.preset, args.repeat)
+    report = {'environment': environment(), 'preset': args.preset, 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        for key, base, current, ratio in regressions:
+            print(f'REGRESSION {key}: {1000 * base:.2f} ms -> {1000 * current:.2f} ms ({ratio:.2f}x)')
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+# file:   run.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: entrypoint for the benchmark suite.
+# Times the load, render and analysis hot paths on synthetic spectra, writes
+# the timings to JSON and compares them against a saved baseline. Scenarios
+# needing Tk run under a virtual X server when no display is available.
+#
+# usage: python -m benchmarks.run [--preset quick|full] [--baseline FILE] [--threshold 0.2]
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+
+# (n_points, n_spectra) per scenario, the table is populated cell by cell so it gets smaller sizes.
+# The analysis scenarios also vary the bands and noise of the spectra, as (n_points, n_spectra, n_bands, noise)
+PRESETS = {
+    'quick': {'parse': [(2000, 20)], 'snap': [(10000, 50)], 'populate': [(500, 10)], 'draw': [(2000, 50)],
+              'analysis': [(2000, 50, 3, 0.01), (2000, 50, 1, 0.0), (2000, 50, 6, 0.03)]},
+    'full':  {'parse': [(2000, 20), (20000, 100)], 'snap': [(10000, 50), (100000, 300)],
+              'populate': [(500, 10), (2000, 50)], 'draw': [(2000, 50), (20000, 500)],
+              'analysis': [(2000, 50, 3, 0.01), (2000, 50, 1, 0.0), (2000, 50, 6, 0.03),
+                           (20000, 500, 3, 0.01), (20000, 500, 1, 0.05), (20000, 500, 6, 0.0), (20000, 500, 6, 0.05)]},
+}
+DEFAULT_BANDS = 3
+DEFAULT_NOISE = 0.01
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+_xvfb_env = 'SAT_BENCH_XVFB' # set when re-launched under xvfb-run, prevents relaunch loops
+
+def _time(fn, repeat: int, setup=None) -> list:
+    """Returns the wall time of repeat calls of fn, setup runs untimed before each call."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def _spectra(n_points: int, n_spectra: int, nan_fraction=0.0, n_bands=DEFAULT_BANDS, noise=DEFAULT_NOISE) -> tuple:
+    """Returns x and a list of spectra from the synthetic generator."""
+    x, y = synthetic.generate_spectra(n_points, n_spectra, n_bands=n_bands, noise=noise, nan_fraction=nan_fraction)
+    return x, [y[:, i] for i in range(n_spectra)]
+
+def _segment_points(x: np.array, y_list: list, n_bands=DEFAULT_BANDS) -> tuple:
+    """Returns continuum segments around the synthetic bands, in the App's (x_pts, y_pts) form."""
+    x_pts = [list(segment) for segment in synthetic.band_segments(n_bands, x[0], x[-1])]
+    y_pts = []
+    for x_min, x_max in x_pts:
+        y_pts.append([float(np.interp(x_min, x, y_list[0])), float(np.interp(x_max, x, y_list[0]))])
+    return x_pts, y_pts
+
+# scenarios, each takes (n_points, n_spectra, repeat, context), the analysis scenarios also (n_bands, noise),
+# and returns a list of times
+
+def bench_import_app(n_points, n_spectra, repeat, context) -> list:
+    """Cold import of classes.App in a fresh interpreter, the part of startup before the window is built."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    args = [sys.executable, '-c', 'import classes.App']
+    return _time(lambda: subprocess.run(args, cwd=root, check=True), repeat)
+
+def bench_parse_csv(n_points, n_spectra, repeat, context) -> list:
+    """readers.read_table() and to_numeric() on a csv file."""
+    import classes.readers as readers
+    x, y = synthetic.generate_spectra(n_points, n_spectra, nan_fraction=0.01)
+    filename = os.path.join(context['tmp dir'], f'spectra_{n_points}x{n_spectra}.csv')
+    synthetic.write_spectra(filename, x, y)
+    return _time(lambda: readers.to_numeric(readers.read_table(filename)), repeat)
+
+def bench_continuum_removal(n_points, n_spectra, repeat, context, n_bands=DEFAULT_BANDS, noise=DEFAULT_NOISE) -> list:
+    """continuum.straight_line_continuum_removal(), the continuum removal tool, on one segment per band."""
+    import classes.continuum as continuum
+    x, y_list = _spectra(n_points, n_spectra, 0.01, n_bands, noise)
+    x_pts, y_pts = _segment_points(x, y_list, n_bands)
+    return _time(lambda: continuum.straight_line_continuum_removal(x, y_list, x_pts, y_pts), repeat)
+
+def bench_band_metrics(n_points, n_spectra, repeat, context, n_bands=DEFAULT_BANDS, noise=DEFAULT_NOISE) -> list:
+    """Vectorized continuum.remove_continuum() and band_metrics() on one segment per band."""
+    import classes.continuum as continuum
+    x, y_list = _spectra(n_points, n_spectra, 0.01, n_bands, noise)
+    y = np.vstack(y_list)
+    segments = synthetic.band_segments(n_bands, x[0], x[-1])
+    def run():
+        for x_min, x_max in segments:
+            x_seg, y_removed = continuum.remove_continuum(x, y, x_min, x_max)
+            continuum.band_metrics(x_seg, y_removed)
+    return _time(run, repeat)
+
+def bench_detect_bands(n_points, n_spectra, repeat, context, n_bands=DEFAULT_BANDS, noise=DEFAULT_NOISE) -> list:
+    """banddetect.detect_bands(), after checking that it proposes one segment around each synthetic band."""
+    import classes.banddetect as banddetect
+    x, y_list = _spectra(n_points, n_spectra, 0.01, n_bands, noise)
+    centres = synthetic.band_centres(n_bands, x[0], x[-1])
+    x_pts, _ = banddetect.detect_bands(x, y_list)
+    if len(x_pts) != len(centres) or not all(x_min < centre < x_max for (x_min, x_max), centre in zip(x_pts, centres)):
+        raise ValueError(f'expected one segment around each band at {centres.round().tolist()}, detected {x_pts}')
+    return _time(lambda: banddetect.detect_bands(x, y_list), repeat)
+
+def bench_snap_query(n_points, n_spectra, repeat, context) -> list:
+    """SnapIndex construction plus 200 cursor queries, as done by EmbeddedPlot._get_nearest()."""
+    from classes.SnapIndex import SnapIndex
+    x, y_list = _spectra(n_points, n_spectra)
+    rng = np.random.default_rng(1)
+    x_lim = (x[0], x[-1])
+    y_lim = (min(np.nanmin(y) for y in y_list), max(np.nanmax(y) for y in y_list))
+    queries = np.column_stack([rng.uniform(*x_lim, 200), rng.uniform(*y_lim, 200)])
+    def run():
+        index = SnapIndex(x, y_list)
+        for x_pt, y_pt in queries:
+            index.query(x_pt, y_pt, x_lim, y_lim, 0.0025)
+    return _time(run, repeat)
+
+def bench_table_populate(n_points, n_spectra, repeat, context) -> list:
+    """EmbeddedTable._populate() with a parsed table."""
+    import classes.readers as readers
+    app = context['app']
+    x, y = synthetic.generate_spectra(n_points, n_spectra, nan_fraction=0.01)
+    df = readers.to_numeric(synthetic.to_dataframe(x, y))
+    def run():
+        app._table._populate(df)
+        app.update()
+    return _time(run, repeat)
+
+def bench_plot_draw(n_points, n_spectra, repeat, context) -> list:
+    """EmbeddedPlot.draw() of raw and continuum-removed curves, including the Tk render."""
+    app = context['app']
+    x, y_list = _spectra(n_points, n_spectra)
+    y_tool_list = [y / np.nanmax(y) for y in y_list]
+    def run():
+        app._plot.draw(x, y_list, y_tool_list)
+        app.update()
+    return _time(run, repeat, setup=lambda: (app._plot.clear(), app.update()))
+
+def bench_plot_get_nearest(n_points, n_spectra, repeat, context) -> list:
+    """EmbeddedPlot._get_nearest() for 200 cursor positions on drawn data."""
+    app = context['app']
+    x, y_list = _spectra(n_points, n_spectra)
+    app._plot.draw(x, y_list)
+    app.update()
+    rng = np.random.default_rng(1)
+    queries = np.column_stack([rng.uniform(x[0], x[-1], 200), rng.uniform(0.2, 0.8, 200)])
+    def run():
+        for x_pt, y_pt in queries:
+            app._plot._get_nearest(x, y_list, x_pt, y_pt)
+    return _time(run, repeat)
+
+# name -> (function, preset sizes key or None if the scenario doesn't depend on data, needs Tk)
+SCENARIOS = {
+    'import_app': (bench_import_app, None, False),
+    'parse_csv': (bench_parse_csv, 'parse', False),
+    'continuum_removal': (bench_continuum_removal, 'analysis', False),
+    'band_metrics': (bench_band_metrics, 'analysis', False),
+    'detect_bands': (bench_detect_bands, 'analysis', False),
+    'snap_query': (bench_snap_query, 'snap', False),
+    'table_populate': (bench_table_populate, 'populate', True),
+    'plot_draw': (bench_plot_draw, 'draw', True),
+    'plot_get_nearest': (bench_plot_get_nearest, 'snap', True),
+}
+
+def start_display(module='benchmarks.run'):
+    """
+    Make an X display available for Tk. Returns (True, display) if one is available, where
+    display must be stopped afterwards if not None, or (False, None) if Tk scenarios can't run.
+    Re-launches module under xvfb-run if pyvirtualdisplay is missing, which doesn't return.
+    """
+    if sys.platform in ('win32', 'darwin') or os.environ.get('DISPLAY', '') != '':
+        return True, None
+    try:
+        from pyvirtualdisplay import Display
+        display = Display(visible=False, size=(1280, 720))
+        display.start()
+        return True, display
+    except Exception:
+        pass
+    if shutil.which('xvfb-run') is not None and os.environ.get(_xvfb_env) is None:
+        env = dict(os.environ, **{_xvfb_env: '1'})
+        args = ['xvfb-run', '-a', '-s', '-screen 0 1280x720x24', sys.executable, '-m', module] + sys.argv[1:]
+        sys.exit(subprocess.call(args, env=env))
+    return False, None
+
+def run_benchmarks(preset='quick', repeat=DEFAULT_REPEAT, pattern='*', gui=True) -> dict:
+    """
+    Runs all scenarios matching pattern and returns the results, keyed by 'scenario[n_points x n_spectra]',
+    followed by the bands and noise if they aren't the defaults.
+    """
+    sizes = PRESETS[preset]
+    selected = {name: scenario for name, scenario in SCENARIOS.items() if fnmatch.fnmatch(name, pattern)}
+    results = {}
+    context = {'tmp dir': tempfile.mkdtemp(prefix='sat-bench-'), 'app': None}
+    display = None
+    if gui and any(needs_tk for _, _, needs_tk in selected.values()):
+        gui, display = start_display()
+    try:
+        for name, (fn, size_key, needs_tk) in selected.items():
+            for n_points, n_spectra, *data in (sizes[size_key] if size_key is not None else [(0, 0)]):
+                key = f'{name}[{n_points}x{n_spectra}]' if size_key is not None else name
+                if len(data) > 0 and tuple(data) != (DEFAULT_BANDS, DEFAULT_NOISE):
+                    key = f'{key[:-1]}, bands {data[0]}, noise {data[1]}]'
+                if needs_tk and not gui:
+                    results[key] = {'skipped': 'no display available'}
+                    print(f'{key:56s} skipped, no display available')
+                    continue
+                if needs_tk and context['app'] is None:
+                    from classes.App import App
+                    context['app'] = App()
+                    while context['app']._plot is None: # the plot is built once the window is shown
+                        context['app'].update()
+                try:
+                    times = fn(n_points, n_spectra, repeat, context, *data)
+                except Exception as e:
+                    results[key] = {'error': f'{type(e).__name__}: {e}'}
+                    print(f'{key:56s} error, {type(e).__name__}: {e}')
+                    continue
+                results[key] = {'min s': min(times), 'median s': statistics.median(times),
+                                'mean s': statistics.fmean(times), 'repeat': len(times)}
+                print(f'{key:56s} median {1000 * results[key]["median s"]:10.2f} ms'
+                      f'   min {1000 * results[key]["min s"]:10.2f} ms')
+    finally:
+        if context['app'] is not None:
+            context['app'].destroy()
+        if display is not None:
+            display.stop()
+        shutil.rmtree(context['tmp dir'], ignore_errors=True)
+    return results
+
+def environment() -> dict:
+    """Returns the interpreter and library versions the results were measured with."""
+    import pandas as pd
+    import matplotlib
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'matplotlib': matplotlib.__version__,
+            'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare median times against the baseline. Returns (key, baseline s, current s, ratio)
+    for every scenario slower than the baseline by more than threshold (eg. 0.2 = 20%).
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None or 'median s' not in base or 'median s' not in result:
+            continue
+        ratio = result['median s'] / base['median s'] if base['median s'] > 0 else float('inf')
+        print(f'{key:56s} {ratio:6.2f}x baseline')
+        if ratio > 1 + threshold:
+            regressions.append((key, base['median s'], result['median s'], ratio))
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the load, render and analysis hot paths.')
+    parser.add_argument('--preset', choices=sorted(PRESETS.keys()), default='quick')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--filter', default='*', help='glob of scenario names to run, eg. "plot_*"')
+    parser.add_argument('--no-gui', action='store_true', help='skip the scenarios needing Tk')
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'results.json'))
+    parser.add_argument('--baseline', default=os.path.join('benchmarks', 'baseline.json'))
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown of the median time relative to the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='also write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.preset, args.repeat, args.filter, not args.no_gui)
+    report = {'environment': environment(), 'preset': args.preset, 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        for key, base, current, ratio in regressions:
+            print(f'REGRESSION {key}: {1000 * base:.2f} ms -> {1000 * current:.2f} ms ({ratio:.2f}x)')
+        if len(regressions) > 0:
+            return 1
+    # scenarios that check their results fail with an error
+    return 1 if any('error' in result for result in results.values()) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# file:   synthetic.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: synthetic spectra for benchmarking.
+# Spectra are a sloped continuum with Gaussian absorption bands, optional
+# noise and NaN gaps, laid out like the files the application opens: the
+# first column holds x-values and every following column one spectrum.
+
+import numpy as np
+import pandas as pd
+
+def generate_spectra(n_points: int, n_spectra: int, n_bands=3, noise=0.01, nan_fraction=0.0,
+                     x_min=400.0, x_max=2500.0, seed=0) -> tuple:
+    """
+    Returns x of shape (n_points,) and y of shape (n_points, n_spectra).
+    Band centres, widths and depths vary per spectrum. nan_fraction of the points
+    in each spectrum are replaced by NaN, as contiguous gaps.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(x_min, x_max, n_points)
+    span = x_max - x_min
+
+    # continuum, a random straight line per spectrum
+    start = rng.uniform(0.4, 0.8, n_spectra)
+    end = rng.uniform(0.4, 0.8, n_spectra)
+    t = (x - x_min) / span
+    y = start + np.outer(t, end - start)
+
+    # evenly spread bands with some jitter, so segments can be chosen around them
+    for i, centre in enumerate(band_centres(n_bands, x_min, x_max)):
+        centres = centre + rng.normal(0, 0.01 * span, n_spectra)
+        widths = rng.uniform(0.01, 0.03, n_spectra) * span
+        depths = rng.uniform(0.05, 0.3, n_spectra)
+        y *= 1 - depths * np.exp(-0.5 * ((x[:, None] - centres) / widths) ** 2)
+
+    if noise > 0:
+        y += rng.normal(0, noise, y.shape)
+
+    if nan_fraction > 0:
+        gap = max(1, int(n_points * nan_fraction))
+        for col in range(n_spectra):
+            first = rng.integers(0, n_points - gap + 1)
+            y[first:first+gap, col] = np.nan
+    return x, y
+
+def band_centres(n_bands: int, x_min=400.0, x_max=2500.0) -> np.array:
+    """Returns the nominal band centres used by generate_spectra()."""
+    return x_min + (x_max - x_min) * (np.arange(n_bands) + 1) / (n_bands + 1)
+
+def band_segments(n_bands: int, x_min=400.0, x_max=2500.0) -> list:
+    """Returns one (x_min, x_max) continuum segment around each nominal band."""
+    half_width = 0.1 * (x_max - x_min) / (n_bands + 1)
+    return [(centre - half_width, centre + half_width) for centre in band_centres(n_bands, x_min, x_max)]
+
+def to_dataframe(x: np.array, y: np.array, header=True) -> pd.DataFrame:
+    """Returns the spectra as a headerless table, with an optional text header row like real exports."""
+    df = pd.DataFrame(np.column_stack([x, y]))
+    if header:
+        names = pd.DataFrame([['wavelength'] + [f'spectrum {i+1}' for i in range(y.shape[1])]])
+        df = pd.concat([names, df.astype(object)], ignore_index=True)
+    return df
+
+def write_spectra(filename: str, x: np.array, y: np.array, header=True) -> None:
+    """Write the spectra to a csv, txt or xlsx file, in the layout read by readers.read_table()."""
+    df = to_dataframe(x, y, header)
+    if filename.lower().endswith('.xlsx'):
+        df.to_excel(filename, header=False, index=False)
+    else:
+        sep = '\t' if filename.lower().endswith('.txt') else ','
+        df.to_csv(filename, sep=sep, header=False, index=False)
@@ -0,0 +1,298 @@
+# file:   AnalysisServer.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: local HTTP service running the continuum removal tool.
+# Spectra and continuum segments are posted as JSON or as an .npz payload
+# and analysed by a bounded pool of worker processes; requests beyond the
+# pool and its queue are rejected rather than piling up. The analytics
+# table and continuum-removed curves are returned in the request's format.
+#
+# endpoints:
+#   POST /analyze  run the continuum removal tool
+#   GET  /health   liveness and pool occupancy
+#   GET  /metrics  request counts, latency and throughput
+
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import classes.config as config
+import classes.continuum as continuum
+from classes.container import pack_ragged, unpack_ragged
+
+JSON_TYPE = 'application/json'
+NPZ_TYPE = 'application/x-npz'
+
+class QueueFullError(RuntimeError):
+    """Raised when the worker pool and its queue are both full."""
+
+def _analyze(x: np.array, y_list: list, x_pts: list, y_pts) -> tuple:
+    """Worker function, see continuum.straight_line_continuum_removal(). Analytics are returned as plain columns."""
+    y_removed, analytics = continuum.straight_line_continuum_removal(x, y_list, x_pts, y_pts)
+    return y_removed, {column: analytics[column].to_numpy() for column in analytics.columns}
+
+def _parse_segments(segments) -> tuple:
+    """
+    Returns (x_pts, y_pts) from a list of [x_min, x_max] or [x_min, x_max, y_min, y_max] segments.
+    y_pts is None if the segments have no y-values, the continuum is then anchored to each spectrum.
+    """
+    segments = [list(segment) for segment in segments]
+    if len(segments) == 0:
+        raise ValueError("at least one segment is required")
+    lengths = set(len(segment) for segment in segments)
+    if lengths == {2}:
+        return [[float(s[0]), float(s[1])] for s in segments], None
+    if lengths == {4}:
+        return [[float(s[0]), float(s[1])] for s in segments], [[float(s[2]), float(s[3])] for s in segments]
+    raise ValueError("segments must all be [x_min, x_max] or all be [x_min, x_max, y_min, y_max]")
+
+def _parse_json(body: bytes) -> tuple:
+    """Returns (x, y_list, x_pts, y_pts, include curves) from a JSON request body."""
+    request = json.loads(body)
+    x = np.asarray(request['x'], dtype=np.float64)
+    y = request['y']
+    if len(y) > 0 and not isinstance(y[0], list):
+        y = [y]
+    # null marks a missing value, as it is returned for NaN
+    y_list = [np.array([np.nan if v is None else v for v in spectrum], dtype=np.float64) for spectrum in y]
+    x_pts, y_pts = _parse_segments(request['segments'])
+    return x, y_list, x_pts, y_pts, bool(request.get('curves', True))
+
+def _parse_npz(body: bytes) -> tuple:
+    """
+    Returns (x, y_list, x_pts, y_pts, include curves) from an .npz request body holding 'x', 'y' of shape
+    (n_spectra, n_points), 'segments' of shape (n_segments, 2 or 4), and optionally 'y lengths' for
+    NaN-padded spectra of different lengths and a scalar 'curves' flag.
+    """
+    with np.load(io.BytesIO(body), allow_pickle=False) as npz:
+        x = np.asarray(npz['x'], dtype=np.float64)
+        y = np.atleast_2d(np.asarray(npz['y'], dtype=np.float64))
+        if 'y lengths' in npz.files:
+            y_list = unpack_ragged(y, npz['y lengths'])
+        else:
+            y_list = list(y)
+        x_pts, y_pts = _parse_segments(np.atleast_2d(npz['segments']).tolist())
+        include_curves = bool(npz['curves']) if 'curves' in npz.files else True
+    return x, y_list, x_pts, y_pts, include_curves
+
+def _to_json_list(values: np.array) -> list:
+    """Returns values as a list with NaN replaced by None, NaN is not valid JSON."""
+    values = np.asarray(values, dtype=object)
+    values[np.isnan(values.astype(np.float64))] = None
+    return values.tolist()
+
+class _RequestHandler(BaseHTTPRequestHandler):
+
+    server_version = 'SpectralAnalysisTools'
+
+    def log_message(self, format, *args) -> None:
+        """Silence per-request logging unless enabled on the server."""
+        if self.server.analysis_server._verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self._send_json(200, self.server.analysis_server.get_health())
+        elif self.path == '/metrics':
+            self._send_json(200, self.server.analysis_server.get_metrics())
+        else:
+            self._send_json(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self) -> None:
+        if self.path != '/analyze':
+            self._send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        server = self.server.analysis_server
+        # the body can't be skipped without a valid length, so the connection is closed on errors
+        header = self.headers.get('Content-Length')
+        if header is None:
+            server._count('bad requests')
+            self._send_json(411, {'error': 'Content-Length required'})
+            self.close_connection = True
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            server._count('bad requests')
+            self._send_json(400, {'error': f'invalid Content-Length {header!r}'})
+            self.close_connection = True
+            return
+        if length > server._max_body_bytes:
+            self._send_json(413, {'error': f'request body exceeds {server._max_body_bytes} bytes'})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length)
+        binary = self.headers.get('Content-Type', JSON_TYPE).split(';')[0].strip() in (NPZ_TYPE, 'application/octet-stream')
+
+        try:
+            x, y_list, x_pts, y_pts, include_curves = _parse_npz(body) if binary else _parse_json(body)
+        except KeyError as e:
+            server._count('bad requests')
+            self._send_json(400, {'error': f'invalid request: missing {e}'})
+            return
+        except (ValueError, TypeError, OSError) as e:
+            server._count('bad requests')
+            self._send_json(400, {'error': f'invalid request: {e}'})
+            return
+        try:
+            y_removed, analytics = server.analyze(x, y_list, x_pts, y_pts)
+        except QueueFullError as e:
+            self._send_json(503, {'error': str(e)}, {'Retry-After': '1'})
+            return
+        except TimeoutError:
+            self._send_json(504, {'error': 'analysis timed out'})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f'analysis failed: {e}'})
+            return
+
+        if binary:
+            arrays = {f'analytics/{column}': values for column, values in analytics.items()}
+            if include_curves:
+                arrays['curves'], arrays['curve lengths'] = pack_ragged(y_removed)
+            buffer = io.BytesIO()
+            np.savez(buffer, **arrays)
+            self._send(200, buffer.getvalue(), NPZ_TYPE)
+        else:
+            response = {'columns': list(analytics.keys()),
+                        'analytics': {column: _to_json_list(values) for column, values in analytics.items()}}
+            if include_curves:
+                response['curves'] = [_to_json_list(y) for y in y_removed]
+            self._send_json(200, response)
+
+    def _send_json(self, status: int, response: dict, headers=None) -> None:
+        self._send(status, json.dumps(response).encode(), JSON_TYPE, headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers=None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class AnalysisServer():
+
+    def __init__(self, host=config.server_host, port=config.server_port, max_workers=None,
+                 max_queue=config.server_max_queue, max_body_bytes=config.server_max_body_bytes,
+                 timeout=config.server_timeout, verbose=False):
+        """
+        Serve on host:port, port 0 picks a free port, see get_address().
+        At most max_workers analyses run at once and max_queue more wait, further requests get a 503.
+        """
+        self._max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self._max_queue = max_queue
+        self._max_body_bytes = max_body_bytes
+        self._timeout = timeout
+        self._verbose = verbose
+        self._slots = threading.BoundedSemaphore(self._max_workers + self._max_queue)
+        # spawned workers never inherit the server's threads
+        context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(max_workers=self._max_workers, mp_context=context)
+        self._httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.analysis_server = self
+        self._thread = None
+
+        self._lock = threading.Lock()
+        self._start_time = time.time()
+        self._counts = {'requests': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'bad requests': 0, 'spectra': 0}
+        self._in_flight = 0
+        self._busy_s = 0.0
+        self._max_latency_s = 0.0
+
+    def get_address(self) -> tuple:
+        """Returns the (host, port) the server is bound to."""
+        return self._httpd.server_address[:2]
+
+    def serve_forever(self) -> None:
+        """Handle requests until shutdown() is called."""
+        self._httpd.serve_forever()
+
+    def start(self) -> None:
+        """Handle requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        """Stop serving and shut down the worker pool, waiting for running analyses."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def analyze(self, x: np.array, y_list: list, x_pts: list, y_pts=None) -> tuple:
+        """
+        Run the continuum removal tool on the worker pool, blocking until it completes.
+        Returns the continuum-removed curves and a dictionary of analytics columns.
+        Raises QueueFullError if the pool and queue are full, and TimeoutError if the analysis takes too long.
+        """
+        self._count('requests')
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise QueueFullError(f"server busy, {self._max_workers} analyses running and {self._max_queue} queued")
+        start = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(_analyze, x, y_list, x_pts, y_pts)
+        except Exception:
+            self._finish(start, 0, False)
+            raise
+        # the slot is held until the worker is done, even if this request times out
+        future.add_done_callback(lambda f: self._finish(start, len(y_list), not f.cancelled() and f.exception() is None))
+        return future.result(timeout=self._timeout)
+
+    def _finish(self, start: float, n_spectra: int, success: bool) -> None:
+        """Release the request's slot and record its outcome."""
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._in_flight -= 1
+            self._counts['completed' if success else 'failed'] += 1
+            if success:
+                self._counts['spectra'] += n_spectra
+                self._busy_s += seconds
+                self._max_latency_s = max(self._max_latency_s, seconds)
+        self._slots.release()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def get_health(self) -> dict:
+        """Returns the server status and pool occupancy."""
+        with self._lock:
+            in_flight = self._in_flight
+        return {'status': 'ok',
+                'uptime s': time.time() - self._start_time,
+                'workers': self._max_workers,
+                'running': min(in_flight, self._max_workers),
+                'queued': max(0, in_flight - self._max_workers),
+                'queue size': self._max_queue}
+
+    def get_metrics(self) -> dict:
+        """Returns request counts, analysis latency and throughput since the server started."""
+        uptime = time.time() - self._start_time
+        with self._lock:
+            metrics = dict(self._counts)
+            completed = self._counts['completed']
+            metrics.update({'uptime s': uptime,
+                            'in flight': self._in_flight,
+                            'mean latency ms': 1000 * self._busy_s / completed if completed > 0 else 0.0,
+                            'max latency ms': 1000 * self._max_latency_s,
+                            'requests per s': completed / uptime if uptime > 0 else 0.0,
+                            'spectra per s': self._counts['spectra'] / uptime if uptime > 0 else 0.0})
+        return metrics
@@ -1,42 +1,296 @@
+import operator
+
 import tkinter as tk
 import tkinter.ttk as ttk
 
+import numpy as np
 import pandas as pd
 
 import classes.config as config
+import classes.export as export
+from classes.SpectralIndex import SpectralIndex
 
 class AnalyticsWindow(tk.Toplevel):
 
-    def __init__(self, parent, analytics):
+    _max_visible_rows = 25
+    _n_round = 4
+    _filter_ops = {'>=': operator.ge, '<=': operator.le, '!=': operator.ne,
+                   '==': operator.eq, '>': operator.gt, '<': operator.lt}
+
+    def __init__(self, parent, analytics, x=None, curves=None, spectra=None):
+        """
+        x and curves are the tool output curves, saved alongside the analytics in binary exports.
+        spectra are the analysed spectra, for computing spectral indices, see SpectralIndex.py.
+        """
         super().__init__(parent)
 
         self.title("Analytics")
         self.config(bg=config.widget_bg_color)
 
-        # save for later access
+        # save for later access, spectral index columns are added to the tool's analytics
+        self._tool_analytics = analytics
         self._analytics = analytics
+        self._x = x
+        self._curves = curves
+        self._spectra = spectra
+        self._indices = []
+        self._spectrum_columns = {}  # name -> one value per spectrum, eg. cluster labels
+        self._columns = list(analytics.columns)
+
+        # rounded values are computed once, only the visible rows are ever put in the treeview
+        self._values = analytics.to_numpy(dtype=np.float64).round(self._n_round)
+        self._sort_cache = {}            # column index -> ascending argsort of that column
+        self._sort_column = None
+        self._sort_descending = False
+        self._filter_mask = None
+        self._view = np.arange(len(analytics))
+        self._offset = 0
+        self._n_visible = max(1, min(len(analytics), self._max_visible_rows))
 
-        self._treeview = ttk.Treeview(self, columns=list(analytics.columns), show='headings', height=len(analytics))
+        self._treeview = ttk.Treeview(self, columns=self._columns, show='headings', height=self._n_visible)
         # add headers, prevent column expansion
         width = 100
-        for column in list(analytics.columns):
+        for i, column in enumerate(self._columns):
             self._treeview.column(column, stretch=False, width=width)
-            self._treeview.heading(column, text=column)
-        # add data
-        n_round = 4
-        for i in range(len(analytics)):
-            self._treeview.insert('', 0, values=list(analytics.iloc[i, :].round(n_round).values))
-        self._treeview.grid(row=0, column=0, columnspan=len(analytics.columns), sticky=tk.NSEW)
+            self._treeview.heading(column, text=column, command=lambda i=i: self._sort(i))
+        # fixed rows whose values are swapped in as the view scrolls
+        self._items = [self._treeview.insert('', tk.END, values=[]) for _ in range(self._n_visible)]
+        self._treeview.grid(row=0, column=0, sticky=tk.NSEW)
+        self._treeview.bind("<MouseWheel>", lambda e: self._scroll(-1 if e.delta > 0 else 1, tk.UNITS))
+        self._treeview.bind("<Button-4>", lambda e: self._scroll(-1, tk.UNITS))
+        self._treeview.bind("<Button-5>", lambda e: self._scroll(1, tk.UNITS))
+
+        self._scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._scrollbar_cb)
+        self._scrollbar.grid(row=0, column=1, sticky=tk.NS)
 
         # add save button beneath
-        self._save_button = ttk.Button(self, 
-                                       text='Save', 
+        self._save_button = ttk.Button(self,
+                                       text='Save',
                                        command=self._save)
-        self._save_button.grid(row=0, column=len(analytics.columns), padx=5)
+        self._save_button.grid(row=0, column=2, padx=5)
+
+        # filter input, eg. 'band depth > 0.1', empty to show all rows
+        self._filter_frame = ttk.Frame(self)
+        self._filter_frame.grid(row=1, column=0, columnspan=3, sticky=tk.EW, pady=5)
+        self._filter_entry = ttk.Entry(self._filter_frame)
+        self._filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self._filter_entry.bind("<Return>", lambda e: self._filter())
+        self._filter_button = ttk.Button(self._filter_frame, text='Filter', command=self._filter)
+        self._filter_button.pack(side=tk.LEFT, padx=5)
+        self._count_label = tk.Label(self._filter_frame, bg=config.widget_bg_color, fg=config.text_color)
+        self._count_label.pack(side=tk.LEFT, padx=5)
+
+        # spectral index input, eg. 'ndi = (R[2200] - R[2100]) / (R[2200] + R[2100])'
+        self._index_frame = ttk.Frame(self)
+        self._index_frame.grid(row=2, column=0, columnspan=3, sticky=tk.EW, pady=5)
+        self._index_entry = ttk.Entry(self._index_frame)
+        self._index_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self._index_entry.bind("<Return>", lambda e: self._add_index())
+        self._index_button = ttk.Button(self._index_frame, text='Add Index', command=self._add_index)
+        self._index_button.pack(side=tk.LEFT, padx=5)
+        if spectra is None or x is None:
+            self._index_entry.config(state=tk.DISABLED)
+            self._index_button.config(state=tk.DISABLED)
+
+        self._render()
+
+    def set_analytics(self, analytics, x=None, curves=None, spectra=None) -> None:
+        """
+        Replace the displayed analytics as new data arrives, keeping the spectral indices, sort order, filter
+        and scroll position. The spectra are kept if not given.
+        """
+        self._tool_analytics = analytics
+        self._x = x
+        self._curves = curves
+        if spectra is not None:
+            self._spectra = spectra
+        if self._spectra is not None and self._x is not None:
+            self._index_entry.config(state=tk.NORMAL)
+            self._index_button.config(state=tk.NORMAL)
+        try:
+            analytics = self._with_indices(analytics)
+        except ValueError:
+            # the new data no longer matches, eg. more spectra than were clustered or other x-values
+            self._spectrum_columns = {}
+            try:
+                analytics = self._with_indices(analytics)
+            except ValueError:
+                self._indices = []
+        self._set_values(analytics)
+        self._sort_cache = {}
+        if self._sort_column is not None:
+            self._sort_cache[self._sort_column] = np.argsort(self._values[:, self._sort_column], kind='stable')
+        try:
+            self._filter_mask = self._get_filter_mask()
+        except ValueError:
+            self._filter_mask = None
+        # more fixed rows are needed while the table is shorter than a page
+        n_visible = max(1, min(len(analytics), self._max_visible_rows))
+        if n_visible > self._n_visible:
+            self._items += [self._treeview.insert('', tk.END, values=[]) for _ in range(n_visible - self._n_visible)]
+            self._n_visible = n_visible
+            self._treeview.config(height=n_visible)
+        offset = self._offset
+        self._update_view()
+        self._set_offset(offset)
+
+    def get_analytics(self) -> pd.DataFrame:
+        """Returns the displayed analytics, including spectral index columns."""
+        return self._analytics
+
+    def _add_index(self) -> None:
+        """Add the spectral index in the index entry as a column, replacing an index of the same name."""
+        try:
+            index = SpectralIndex.parse(self._index_entry.get())
+            indices = [other for other in self._indices if other.get_name() != index.get_name()] + [index]
+            if index.get_name() in self._tool_analytics.columns or index.get_name() in self._spectrum_columns.keys():
+                raise ValueError(f"'{index.get_name()}' is already a column, please name the index, eg. 'name = {index.get_expression()}'")
+            analytics = self._with_indices(self._tool_analytics, indices)
+        except ValueError as e:
+            s = f"Unable to add the index. {e}\nUse R[w] for the value at wavelength w, or mean, min, max, depth, centre and area of a wavelength range, eg. depth(2100, 2300)."
+            tk.messagebox.showwarning(title=None, message=s, parent=self)
+            return
+        self._indices = indices
+        self._index_entry.delete(0, tk.END)
+        self._refresh(analytics)
+
+    def set_spectrum_column(self, name: str, values: np.array) -> None:
+        """Add or replace a column of one value per analysed spectrum, eg. cluster labels, repeated on each spectrum's rows."""
+        spectrum_columns = dict(self._spectrum_columns)
+        spectrum_columns[name] = np.asarray(values)
+        analytics = self._with_indices(self._tool_analytics, spectrum_columns=spectrum_columns)
+        self._spectrum_columns = spectrum_columns
+        self._refresh(analytics)
+
+    def _refresh(self, analytics: pd.DataFrame) -> None:
+        """Display analytics with changed columns, keeping the sort column and filter."""
+        self._set_values(analytics)
+        self._sort_cache = {}
+        if self._sort_column is not None:
+            self._sort_cache[self._sort_column] = np.argsort(self._values[:, self._sort_column], kind='stable')
+        self._update_view()
+
+    def _with_indices(self, analytics, indices=None, spectrum_columns=None) -> pd.DataFrame:
+        """
+        Returns analytics with the per-spectrum columns and a column for each spectral index. Rows are
+        spectrum-major, so each spectrum's value is repeated for all of its rows.
+        Raises ValueError if an index can't be computed or a column doesn't match the spectra.
+        """
+        indices = self._indices if indices is None else indices
+        columns = dict(self._spectrum_columns if spectrum_columns is None else spectrum_columns)
+        if len(indices) > 0:
+            if self._spectra is None or len(self._spectra) == 0:
+                raise ValueError("the analysed spectra are not available")
+            for index in indices:
+                columns[index.get_name()] = index.evaluate(self._x, self._spectra)
+        if len(columns) == 0:
+            return analytics
+        analytics = analytics.copy()
+        for name, values in columns.items():
+            if len(values) == 0 or len(analytics) % len(values) != 0:
+                raise ValueError(f"'{name}' doesn't match the analysed spectra")
+            analytics[name] = np.repeat(values, len(analytics) // len(values))
+        return analytics
+
+    def _set_values(self, analytics) -> None:
+        """Display analytics, updating the treeview columns if they changed."""
+        self._analytics = analytics
+        self._values = analytics.to_numpy(dtype=np.float64).round(self._n_round)
+        columns = list(analytics.columns)
+        if columns != self._columns:
+            self._columns = columns
+            self._treeview.config(columns=columns)
+            for i, column in enumerate(columns):
+                self._treeview.column(column, stretch=False, width=100)
+                self._treeview.heading(column, text=column, command=lambda i=i: self._sort(i))
+            if self._sort_column is not None and self._sort_column >= len(columns):
+                self._sort_column = None
+
+    def _render(self) -> None:
+        """Fill the fixed treeview rows from the current view and offset."""
+        rows = self._view[self._offset:self._offset+self._n_visible]
+        for item, row in zip(self._items, rows):
+            self._treeview.item(item, values=self._values[row].tolist())
+        for item in self._items[len(rows):]:
+            self._treeview.item(item, values=[])
+        n_rows = len(self._view)
+        if n_rows > 0:
+            self._scrollbar.set(self._offset / n_rows, min(1, (self._offset + self._n_visible) / n_rows))
+        else:
+            self._scrollbar.set(0, 1)
+        self._count_label.config(text=f'{n_rows} of {len(self._values)} rows')
+
+    def _scroll(self, n: int, what: str) -> None:
+        """Move the view by n rows (tk.UNITS) or n pages (tk.PAGES)."""
+        step = n * self._n_visible if what == tk.PAGES else n
+        self._set_offset(self._offset + step)
+
+    def _scrollbar_cb(self, *args) -> None:
+        """Scrollbar command, either ('moveto', fraction) or ('scroll', n, what)."""
+        if args[0] == tk.MOVETO:
+            self._set_offset(int(round(float(args[1]) * len(self._view))))
+        elif args[0] == tk.SCROLL:
+            self._scroll(int(args[1]), args[2])
+
+    def _set_offset(self, offset: int) -> None:
+        """Clamp and apply the first visible row."""
+        offset = max(0, min(offset, len(self._view) - self._n_visible))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _sort(self, col: int) -> None:
+        """Sort by the passed column, toggling ascending/descending on repeated clicks."""
+        if col not in self._sort_cache.keys():
+            self._sort_cache[col] = np.argsort(self._values[:, col], kind='stable')
+        self._sort_descending = not self._sort_descending if self._sort_column == col else False
+        self._sort_column = col
+        self._update_view()
+
+    def _filter(self) -> None:
+        """Show only rows matching the filter entry, of the form 'column op value'."""
+        try:
+            self._filter_mask = self._get_filter_mask()
+            self._update_view()
+        except ValueError:
+            s = "Invalid filter. Please enter a filter of the form 'column > value', using one of >, <, >=, <=, ==, !=."
+            tk.messagebox.showwarning(title=None, message=s, parent=self)
+
+    def _get_filter_mask(self):
+        """Returns the row mask for the filter entry, None if empty. Raises ValueError for invalid filters."""
+        entry = self._filter_entry.get().strip()
+        if entry == '':
+            return None
+        for symbol, op in self._filter_ops.items():
+            if symbol in entry:
+                column, value = (part.strip() for part in entry.split(symbol, 1))
+                return op(self._values[:, self._columns.index(column)], float(value))
+        raise ValueError
+
+    def _update_view(self) -> None:
+        """Rebuild the view indices from the cached sort order and the filter mask."""
+        if self._sort_column is not None:
+            view = self._sort_cache[self._sort_column]
+            if self._sort_descending:
+                view = view[::-1]
+        else:
+            view = np.arange(len(self._values))
+        if self._filter_mask is not None:
+            view = view[self._filter_mask[view]]
+        self._view = view
+        self._offset = 0
+        self._render()
 
     def _save(self) -> None:
-        """Callback for saving the stored data"""
-        allowed_types = [('csv', '*.csv')]
+        """Callback for saving the stored data, as csv or as a binary export including the curves"""
+        allowed_types = [('csv', '*.csv')] + export.available_formats()
         filename = tk.filedialog.asksaveasfilename(filetypes=allowed_types, defaultextension=allowed_types)
-        if filename is not None and filename != '':
+        if filename is None or filename == '':
+            return
+        if filename.lower().endswith('.csv'):
             self._analytics.to_csv(filename, index=False)
+            return
+        try:
+            export.save_results(filename, self._analytics, self._x, self._curves)
+        except (OSError, ValueError) as e:
+            tk.messagebox.showwarning(title=None, message=f"Unable to save the results. {e}", parent=self)
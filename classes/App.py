@@ -5,15 +5,24 @@
 # description: backend for the application.
 # Handles GUI creation, interactivity, analysis.
 
+import sqlite3
+
 import tkinter as tk
 import tkinter.ttk as ttk
+import tkinter.simpledialog
 
 import numpy as np
-import pandas as pd
 
-from classes.EmbeddedPlot import EmbeddedPlot
+# pandas and matplotlib take seconds to import, modules depending on them
+# (EmbeddedPlot, AnalyticsWindow, FigureExporter, session) are imported on first use
 from classes.EmbeddedTable import EmbeddedTable
-from classes.AnalyticsWindow import AnalyticsWindow
+from classes.BandMapper import BandMapper
+from classes.FolderWatcher import FolderWatcher
+from classes.ProgressWindow import ProgressWindow
+from classes.ProfilerWindow import ProfilerWindow
+from classes.ResultStore import ResultStore
+import classes.continuum as continuum
+import classes.profiling as profiling
 
 import classes.config as config
 
@@ -40,11 +49,8 @@ class App(tk.Tk):
         table_x, table_y, table_w, table_h = 0.02, 0.02, 0.47, 0.96
         self._table = EmbeddedTable(self, table_x, table_y, table_w, table_h)
 
-        # GUI plot component
-        plot_x, plot_y, plot_w, plot_h = 0.51, 0.02, 0.47, 0.96
-        self._plot = EmbeddedPlot(self, plot_x, plot_y, plot_w, plot_h)
-        self._plot._update_button.config(command=lambda: self._plot.draw(self._table.get_x(), self._table.get_y()))
-        self._plot._save_button.config(command=self._save_plot)
+        # GUI plot component, created once the window is shown, see _create_plot()
+        self._plot = None
 
         # create the menu bar
         self._menubar = tk.Menu(self)
@@ -53,29 +59,112 @@ class App(tk.Tk):
         # create the file menu
         self._filemenu = tk.Menu(self._menubar, tearoff=0)
         self._filemenu.add_command(label="Open", command=self._open_file)
+        self._filemenu.add_separator()
+        self._filemenu.add_command(label="Open Session", command=self._open_session)
+        self._filemenu.add_command(label="Save Session", command=self._save_session)
+        self._filemenu.add_separator()
+        self._filemenu.add_command(label="Batch Export Figures", command=self._batch_export)
+        self._filemenu.add_separator()
+        self._filemenu.add_command(label="Watch Folder", command=self._watch_folder)
+        self._filemenu.add_command(label="Stop Watching", command=self._stop_watching, state=tk.DISABLED)
         self._menubar.add_cascade(label="File", menu=self._filemenu)
 
         # create the tools menu
         self._toolmenu = tk.Menu(self._menubar, tearoff=0)
         self._toolmenu.add_command(label="Straight Line Continuum Removal",
                                    command=self._straight_line_continuum_removal_cb)
+        self._preview_enabled = tk.BooleanVar(self, value=config.continuum_preview)
+        self._toolmenu.add_checkbutton(label="Live Preview", variable=self._preview_enabled,
+                                       command=self._toggle_preview)
+        self._toolmenu.add_command(label="Detect Bands", command=self._detect_bands)
         self._toolmenu.add_separator()
         self._toolmenu.add_command(label="Run Tool", command=self._run_tool)
+        self._toolmenu.add_separator()
+        self._toolmenu.add_command(label="Generate Band Maps", command=self._generate_band_maps)
+        self._toolmenu.add_command(label="PCA and Clustering", command=self._cluster_spectra)
         self._menubar.add_cascade(label="Tools", menu=self._toolmenu)
 
+        # create the datasets menu, listing every opened file, see _update_dataset_menu()
+        self._datasetmenu = tk.Menu(self._menubar, tearoff=0)
+        self._dataset_var = tk.StringVar(self)
+        self._menubar.add_cascade(label="Datasets", menu=self._datasetmenu)
+        self._update_dataset_menu()
+
+        # create the debug menu
+        self._debugmenu = tk.Menu(self._menubar, tearoff=0)
+        self._profiling_enabled = tk.BooleanVar(self, value=profiling.is_enabled())
+        self._debugmenu.add_checkbutton(label="Enable Profiling", variable=self._profiling_enabled,
+                                        command=lambda: self._set_profiling(self._profiling_enabled.get()))
+        self._debugmenu.add_command(label="Show Profiler", command=lambda: ProfilerWindow(self, self._set_profiling))
+        self._menubar.add_cascade(label="Debug", menu=self._debugmenu)
+
         # default to no tool selected
         self._analytics_tool = self.NO_TOOL
+        self._analytics = None
+        self._analytics_window = None
+        self._clusters = None # (selected indices, cluster label of each spectrum), see _cluster_spectra()
+
+        # background ingest of new files, see _watch_folder()
+        self._watcher = None
+
+        # results from previous runs, shared across sessions
+        try:
+            self._result_store = ResultStore(config.result_store_path, config.result_store_max_bytes)
+        except (OSError, sqlite3.Error):
+            self._result_store = None
+
+        # let the window appear before the slow plot construction
+        profiling.startup_mark('build window')
+        self.after(1, self._create_plot)
 
     def run(self) -> None:
         """Run the GUI."""
         tk.mainloop()
 
+    def _create_plot(self) -> None:
+        """Import matplotlib and build the plot component, deferred from __init__ so startup shows the window first."""
+        profiling.startup_mark('show window')
+        from classes.EmbeddedPlot import EmbeddedPlot
+        profiling.startup_mark('import matplotlib')
+        plot_x, plot_y, plot_w, plot_h = 0.51, 0.02, 0.47, 0.96
+        self._plot = EmbeddedPlot(self, plot_x, plot_y, plot_w, plot_h)
+        self._plot._update_button.config(command=lambda: self._plot.draw_spectra(self._table.get_spectra()))
+        self._plot._save_button.config(command=self._save_plot)
+        self._plot.enable_preview(self._preview_enabled.get())
+        profiling.startup_mark('create plot')
+
     def _open_file(self) -> None:
         """See EmbeddedTable.open()."""
-        allowed_types = [('Excel', '*.xlsx'), ('csv', '*.csv'), ('txt', '*.txt'), ('dpt', '*.dpt')]
+        allowed_types = [('Excel', '*.xlsx'), ('csv', '*.csv'), ('txt', '*.txt'), ('dpt', '*.dpt'), ('zip', '*.zip'),
+                         ('compressed', '*.gz *.bz2 *.xz')]
         filename = tk.filedialog.askopenfilename(filetypes=allowed_types, header=None)
         if filename is not None:
             self._table.open(filename)
+            self._update_dataset_menu()
+
+    def _update_dataset_menu(self) -> None:
+        """List the opened datasets, the displayed one is checked."""
+        self._datasetmenu.delete(0, tk.END)
+        datasets = self._table.get_datasets()
+        for dataset_id, name in datasets:
+            self._datasetmenu.add_radiobutton(label=name if name else dataset_id, value=dataset_id,
+                                              variable=self._dataset_var, command=self._show_dataset)
+        if len(datasets) > 0:
+            self._datasetmenu.add_separator()
+        self._datasetmenu.add_command(label="Close Dataset", command=self._close_dataset,
+                                      state=tk.NORMAL if len(datasets) > 0 else tk.DISABLED)
+        self._dataset_var.set(self._table.get_dataset_id() or '')
+
+    def _show_dataset(self) -> None:
+        """See EmbeddedTable.show_dataset()."""
+        self._table.show_dataset(self._dataset_var.get())
+
+    def _close_dataset(self) -> None:
+        """See EmbeddedTable.remove_dataset(), closes the displayed dataset."""
+        dataset_id = self._table.get_dataset_id()
+        if dataset_id is not None:
+            self._table.remove_dataset(dataset_id)
+            self._update_dataset_menu()
 
     def _save_plot(self) -> None:
         """See EmbeddedPlot.save()."""
@@ -84,22 +173,267 @@ class App(tk.Tk):
         if filename != '' and filename.find('.') != 0: # non-empty name with filename length >= 1, not including extension
             self._plot.save(filename)
 
+    def _save_session(self) -> None:
+        """Save the table, selections, plot and tool outputs to a session file."""
+        allowed_types = [('Session', '*.sats')]
+        filename = tk.filedialog.asksaveasfilename(filetypes=allowed_types, defaultextension=allowed_types)
+        if filename is not None and filename != '':
+            import classes.session as session
+            try:
+                session.save(filename, self._table.get_state(), self._plot.get_state(),
+                             self._analytics, self._analytics_tool)
+            except (OSError, ValueError) as e:
+                tk.messagebox.showwarning(title=None, message=f"Unable to save the session. {e}")
+
+    def _open_session(self) -> None:
+        """Restore the table, selections, plot and tool outputs from a session file."""
+        allowed_types = [('Session', '*.sats')]
+        filename = tk.filedialog.askopenfilename(filetypes=allowed_types)
+        if filename is None or filename == '':
+            return
+        import classes.session as session
+        try:
+            state = session.load(filename)
+        except (OSError, ValueError, KeyError) as e:
+            tk.messagebox.showwarning(title=None, message=f"Unable to open the session. {e}")
+            return
+        if state['table'] is not None:
+            self._table.restore_state(*state['table'])
+        else:
+            self._table.clear()
+        self._update_dataset_menu()
+        if state['plot'] is not None:
+            self._plot.restore_state(*state['plot'])
+        else:
+            self._plot.clear()
+        self._analytics_tool = state['tool']
+        self._analytics = state['analytics']
+        if self._analytics is not None:
+            from classes.AnalyticsWindow import AnalyticsWindow
+            self._analytics_window = AnalyticsWindow(self, self._analytics, *self._plot.get_tool_data(), self._plot.get_data()[1])
+
+    def _watch_folder(self) -> None:
+        """
+        Append files written to a folder to the open table as they arrive, repeating the active
+        y-selections on each file. Plotted data and tool results are extended incrementally.
+        """
+        if self._table.get_x() is None or len(self._table.get_y()) == 0:
+            s = "Unable to watch a folder. Please open a file and select x- and y-data first, they are applied to every new file."
+            tk.messagebox.showwarning(title=None, message=s)
+            return
+        folder = tk.filedialog.askdirectory(mustexist=True)
+        if folder is None or folder == '':
+            return
+        self._stop_watching()
+        self._watcher = FolderWatcher(folder, config.watch_interval_s)
+        self._watcher.start()
+        self._filemenu.entryconfig("Stop Watching", state=tk.NORMAL)
+        self.after(config.watch_poll_ms, self._poll_watcher)
+
+    def _stop_watching(self) -> None:
+        """Stop the folder watcher, if running."""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        self._filemenu.entryconfig("Stop Watching", state=tk.DISABLED)
+
+    def _poll_watcher(self) -> None:
+        """Ingest files parsed by the folder watcher, repeats while watching."""
+        if self._watcher is None:
+            return
+        errors = []
+        for filename, df, error in self._watcher.get_updates():
+            if df is None:
+                errors.append(f"{filename}: {error if error is not None else 'unsupported file type'}")
+            else:
+                self._ingest(filename, df)
+        if len(errors) > 0:
+            tk.messagebox.showwarning(title=None, message="Unable to read:\n" + "\n".join(errors))
+        self.after(config.watch_poll_ms, self._poll_watcher)
+
+    @profiling.profiled()
+    def _ingest(self, filename: str, df) -> None:
+        """Append a newly written file to the table, then extend the plot and tool results with its spectra only."""
+        positions = self._table.append(filename, df)
+        x, tool_curves = self._plot.get_tool_data() if self._plot is not None else (None, None)
+        if len(positions) == 0 or x is None:
+            return
+        y_list = self._table.get_y()
+        y_new = [y_list[position] for position in positions]
+
+        # apply the active segments to the new spectra if the tool has been run
+        y_removed = None
+        if self._analytics_tool == self.STRAIGHT_LINE_CONTINUUM and self._analytics is not None and len(tool_curves) > 0:
+            x_pts, y_pts = self._plot.get_selected_points()
+            y_removed, analytics = self._straight_line_continuum_removal(x, y_new, x_pts, y_pts)
+            self._analytics = self._merge_analytics(self._analytics, analytics, positions, len(x_pts))
+        self._plot.update_series(positions, y_new, y_removed)
+        if y_removed is not None and self._analytics_window is not None and self._analytics_window.winfo_exists():
+            self._analytics_window.set_analytics(self._analytics, *self._plot.get_tool_data(), self._plot.get_data()[1])
+
+    def _merge_analytics(self, analytics, new_analytics, positions: list, n_segments: int):
+        """Returns analytics with the rows of the spectra at positions replaced or appended, rows are spectrum-major."""
+        import pandas as pd
+        analytics = analytics.copy()
+        appended = []
+        for k, position in enumerate(positions):
+            rows = new_analytics.iloc[k*n_segments:(k+1)*n_segments]
+            start = position * n_segments
+            if start < len(analytics):
+                analytics.iloc[start:start+n_segments] = rows.to_numpy()
+            else:
+                appended.append(rows)
+        if len(appended) > 0:
+            analytics = pd.concat([analytics] + appended, ignore_index=True)
+        return analytics
+
+    def _batch_export(self) -> None:
+        """
+        Export one figure per file, or per spectrum, for many files using the active
+        table selections and plot styling. Rendering runs in background processes.
+        """
+        indices = self._table.get_indices()
+        if 'x' not in indices.keys() or len(indices.get('y', [])) == 0:
+            s = "Unable to export figures. Please select x- and y-data first, they are applied to every file."
+            tk.messagebox.showwarning(title=None, message=s)
+            return
+        allowed_types = [('Excel', '*.xlsx'), ('csv', '*.csv'), ('txt', '*.txt'), ('dpt', '*.dpt'), ('zip', '*.zip'),
+                         ('compressed', '*.gz *.bz2 *.xz')]
+        sources = tk.filedialog.askopenfilenames(filetypes=allowed_types)
+        if sources is None or len(sources) == 0:
+            return
+        out_dir = tk.filedialog.askdirectory(mustexist=False)
+        if out_dir is None or out_dir == '':
+            return
+        fmt = tk.simpledialog.askstring('Batch Export', 'Figure format (png, pdf, jpeg, jpg, svg):', initialvalue='png', parent=self)
+        if fmt is None or fmt.strip().lower() not in ('png', 'pdf', 'jpeg', 'jpg', 'svg'):
+            return
+        per_spectrum = tk.messagebox.askyesno(title='Batch Export', message='Export one figure per spectrum instead of one per file?')
+        from classes.FigureExporter import FigureExporter
+        exporter = FigureExporter(sources, indices, out_dir, fmt.strip(), per_spectrum,
+                                  self._plot.get_export_style(), self._plot.get_size_inches())
+        ProgressWindow(self, 'Exporting Figures', exporter.run,
+                       on_done=self._batch_export_done, on_cancel=exporter.cancel)
+
+    def _batch_export_done(self, result, error) -> None:
+        """Report the outcome of a batch export."""
+        if error is not None:
+            tk.messagebox.showwarning(title=None, message=f"Batch export stopped: {error}")
+            return
+        written, errors = result
+        s = f"{len(written)} figures exported."
+        if len(errors) > 0:
+            s += f"\n{len(errors)} files could not be exported:\n" + "\n".join(f"{k}: {v}" for k, v in errors.items())
+        tk.messagebox.showinfo(title=None, message=s)
+
+    @profiling.profiled()
     def _run_tool(self) -> None:
         """Perform the active tool analysis."""
         analytics = None
 
         # run the straight line continuum removal tool
         if self._analytics_tool == self.STRAIGHT_LINE_CONTINUUM:
-            x = self._table.get_x()
-            y_list = self._table.get_y()
+            spectra = self._table.get_spectra()
+            if spectra is None or len(spectra) == 0:
+                s = "Unable to run the tool. Please ensure x- and y-data have been selected."
+                tk.messagebox.showwarning(title=None, message=s)
+                return
+            x = spectra.get_x()
+            # the matrix is analysed without copying unless some spectra are shorter than the x-data
+            y_list = spectra.get_y() if spectra.is_aligned() else spectra.get_y_list()
             x_pts, y_pts = self._plot.get_selected_points()
             self._plot.enable_point_selection(False)
-            y_removed_list, analytics = self._straight_line_continuum_removal(x, y_list, x_pts, y_pts)
-            self._plot.draw(x, y_list, y_removed_list)
+            key = self._get_result_key(x_pts, y_pts)
+            result = self._get_stored_result(key)
+            if result is not None:
+                y_removed_list, analytics = result
+                # analytics stored without their curves only need the curves recomputed
+                if y_removed_list is None:
+                    y_removed_list, _ = self._straight_line_continuum_removal(x, y_list, x_pts, y_pts, metrics=False)
+            else:
+                y_removed_list, analytics = self._straight_line_continuum_removal(x, y_list, x_pts, y_pts)
+                self._put_stored_result(key, y_removed_list, analytics)
+            self._plot.draw_spectra(spectra, y_removed_list)
 
         # display window with analytical results
         if analytics is not None:
-            AnalyticsWindow(self, analytics)
+            self._analytics = analytics
+            from classes.AnalyticsWindow import AnalyticsWindow
+            self._analytics_window = AnalyticsWindow(self, analytics, x, y_removed_list, spectra.get_y())
+            # clusters of the same spectra are included in the analytics
+            if self._clusters is not None and self._clusters[0] == self._table.get_indices():
+                self._analytics_window.set_spectrum_column('cluster', self._clusters[1])
+
+    def _get_result_key(self, x_pts: list, y_pts: list):
+        """Returns the result store key for the active tool and selections, or None if results can't be stored."""
+        key = None
+        if self._result_store is not None:
+            file_hash = self._table.get_file_hash()
+            if file_hash is not None:
+                key = ResultStore.make_key(file_hash, self._table.get_indices(), x_pts, y_pts, self._analytics_tool)
+        return key
+
+    def _get_stored_result(self, key):
+        """Returns the stored (curves, analytics) for key, curves are None if stored without them, None if missing."""
+        result = None
+        if key is not None:
+            try:
+                result = self._result_store.get(key)
+            except (sqlite3.Error, ValueError):
+                result = None
+        return result
+
+    def _put_stored_result(self, key, curves: list, analytics: 'pd.DataFrame') -> None:
+        """Save a result for reuse, failures only cost the reuse so they are ignored."""
+        if key is not None:
+            try:
+                self._result_store.put(key, self._table.get_file_hash(), analytics,
+                                       curves if config.result_store_curves else None)
+            except (OSError, sqlite3.Error):
+                pass
+
+    def _set_profiling(self, enabled: bool) -> None:
+        """Enable or disable hot-path profiling, see profiling.py. Shared by the Debug menu and profiler window."""
+        self._profiling_enabled.set(enabled)
+        if enabled:
+            profiling.enable()
+        else:
+            profiling.disable()
+
+    def _generate_band_maps(self) -> None:
+        """
+        Generate band depth, centre and area maps for an image cube using the selected segments.
+        The cube is a .npy file of shape (rows, columns, bands), with bands given by the active x-data.
+        """
+        x = self._table.get_x()
+        x_pts, _ = self._plot.get_selected_points()
+        segments = [x_pt for x_pt in x_pts if len(x_pt) == 2]
+        if x is None or len(segments) == 0:
+            s = "Unable to generate band maps. Please select x-data and at least one continuum segment first."
+            tk.messagebox.showwarning(title=None, message=s)
+            return
+        cube_filename = tk.filedialog.askopenfilename(filetypes=[('NumPy', '*.npy')])
+        if cube_filename is None or cube_filename == '':
+            return
+        out_dir = tk.filedialog.askdirectory(mustexist=False)
+        if out_dir is None or out_dir == '':
+            return
+        try:
+            mapper = BandMapper(cube_filename, x, segments, out_dir)
+        except (OSError, ValueError) as e:
+            tk.messagebox.showwarning(title=None, message=f"Unable to generate band maps. {e}")
+            return
+        ProgressWindow(self, 'Generating Band Maps', mapper.run,
+                       on_done=self._band_maps_done, on_cancel=mapper.cancel)
+
+    def _band_maps_done(self, result, error) -> None:
+        """Report the outcome of band map generation."""
+        if error is not None:
+            s = f"Band map generation stopped: {error}. Completed tiles are kept, run again to resume."
+            tk.messagebox.showwarning(title=None, message=s)
+        elif result is not None:
+            s = "Band maps written to:\n" + "\n".join(result.values())
+            tk.messagebox.showinfo(title=None, message=s)
 
     def _straight_line_continuum_removal_cb(self) -> None:
         """Perform the continuum removal calculations."""
@@ -107,130 +441,64 @@ class App(tk.Tk):
         self._plot.enable_point_selection(True)
         self._analytics_tool = self.STRAIGHT_LINE_CONTINUUM
 
-    def _straight_line_continuum_removal(self, x: np.array, y_list: list, x_pts: list, y_pts: list) -> list:
-        """Performs continuum removal and calls all analysis functions on the resultant curve."""
-
-        # do removal on all selected y-data
-        y_removed  = []
-
-        # currently empty data store, fill lists then add to df
-        analytics = pd.DataFrame(None, columns=['band fwhm', 'band min', 
-                                                'band centre', 'band depth',
-                                                'band area', 
-                                                'x min', 'x max',
-                                                'y min', 'y max'])
-        band_fwhms   = []
-        band_minima  = []
-        band_centres = []
-        band_depths  = []
-        band_areas   = []
-        x_minima     = []
-        x_maxima     = []
-        y_minima     = []
-        y_maxima     = []
-
-        for y in y_list:
-
-            # get x-, y-data for analysis
-            length = min(len(x), len(y))
-            y_raw = y[:length]                # actual y-values
-            y_continuum = np.ones_like(y_raw) # temporarily set all values to 1, do removal below
-            x_continuum = x[:length]          # get corresponding x-data
-
-            # iterate over removal points and do relative reflectance only between consecutive points
-            for x_pt, y_pt in zip(x_pts, y_pts):
-
-                # get min/max values, swap if max < min
-                x_pt_min = x_pt[0]
-                x_pt_max = x_pt[1]
-                y_pt_min = y_pt[0]
-                y_pt_max = y_pt[1]
-                if x_pt_min > x_pt_max:
-                    x_pt_min, x_pt_max = x_pt_max, x_pt_min
-                    y_pt_min, y_pt_max = y_pt_max, y_pt_min
-
-                # get the continuum mask
-                mask = (x_continuum >= x_pt_min) & (x_continuum <= x_pt_max)
-                # do continuum removal
-                straight_line = np.linspace(y_pt_min, y_pt_max, len(x_continuum[mask]))
-                y_continuum[mask] = y_raw[mask] / straight_line
-                y_continuum[y_continuum > 1] = 1
-
-                # analysis calculations
-                band_fwhms.append(self._continuum_band_fwhm(x_continuum[mask], y_continuum[mask]))
-                band_minima.append(self._continuum_band_min(y_continuum[mask]))
-                band_centres.append(self._continuum_band_centre(x_continuum[mask], y_continuum[mask]))
-                band_depths.append(self._continuum_band_depth(y_continuum[mask]))
-                band_areas.append(self._continuum_band_area(x_continuum[mask], y_continuum[mask]))
-                x_minima.append(x_pt_min)
-                x_maxima.append(x_pt_max)
-                y_minima.append(y_pt_min)
-                y_maxima.append(y_pt_max)
-
-            # append continuum-removed curve
-            y_removed.append(y_continuum)
-
-        # populate the dataframe from the lists
-        analytics['band fwhm']   = band_fwhms
-        analytics['band min']    = band_minima
-        analytics['band centre'] = band_centres
-        analytics['band depth']  = band_depths
-        analytics['band area']   = band_areas
-        analytics['x min']       = x_minima
-        analytics['x max']       = x_maxima
-        analytics['y min']       = y_minima
-        analytics['y max']       = y_maxima
-
-        return y_removed, analytics
-
-    def _continuum_band_fwhm(self, x: np.array, y: np.array) -> float:
-        """
-        Returns the full-width half-maximum of a given curve.
-        fwhm is the x-width between the y-midpoints of a curve.
-        """
-        retval = -1
-        try:
-            # get y-curve half-value and minima index
-            y_min_idx = y.argmin()
-            y_half = (y.max() + y.min()) / 2
-            # get x-value at minima
-            x_mid = x[y_min_idx]
-            # get x-value at closest value on minima LHS
-            y_lhs_idx = (np.abs(y[x < x_mid] - y_half)).argmin()
-            x_lhs = x[y_lhs_idx]
-            # get x-value at closest value on minima RHS
-            y_rhs_idx = (np.abs(y[x > x_mid] - y_half)).argmin() + len(y[x <= x_mid])
-            x_rhs = x[y_rhs_idx]
-            retval = x_rhs - x_lhs
-        except ValueError as e:
-            pass
-        return retval
-
-    def _continuum_band_min(self, y: np.array) -> float:
-        """Returns the minimum value of a curve."""
-        return y.min()
-
-    def _continuum_band_centre(self, x: np.array, y: np.array) -> float:
-        """Returns the x-value at the minimum value of a curve."""
-        return x[y.argmin()]
-
-    def _continuum_band_depth(self, y_cont: np.array) -> float:
-        """
-        Returns the band depth.
-        Band depth is 1 - min(y_cont)
-        where Rc is the reflectance of the continuum at band centre and
-        Rb is the band reflectance at band centre.
-        """
-        return 1 - y_cont.min()
-
-    def _continuum_band_area(self, x: np.array, y: np.array) -> float:
-        """Returns the upper area of a constrained curve."""
-        # boxed area around the removed curve
-        box_area = np.trapz(np.ones_like(y), x=x)
-        # area underneath the curve
-        under_area = np.trapz(y, x=x)
-        # area between curve and y=1
-        return box_area - under_area
+    @profiling.profiled()
+    def _detect_bands(self) -> None:
+        """Propose continuum removal segments for the absorption bands of all selected spectra, see banddetect.py."""
+        spectra = self._table.get_spectra()
+        if self._plot is None or self._plot.get_tool_data()[0] is None or spectra is None or len(spectra) == 0:
+            s = "Unable to detect bands. Please select and plot x- and y-data first."
+            tk.messagebox.showwarning(title=None, message=s)
+            return
+        min_depth = tk.simpledialog.askfloat('Detect Bands', 'Minimum band depth (0 - 1):', parent=self,
+                                             initialvalue=config.band_detect_min_depth, minvalue=0.0, maxvalue=1.0)
+        if min_depth is None:
+            return
+        import classes.banddetect as banddetect
+        x_pts, y_pts = banddetect.detect_bands(spectra.get_x(), spectra.get_y(), min_depth)
+        if len(x_pts) == 0:
+            tk.messagebox.showwarning(title=None, message="No absorption bands were found, try a smaller minimum depth.")
+            return
+        # the proposed segments can be reviewed and extended by hand before Run Tool
+        self._straight_line_continuum_removal_cb()
+        self._plot.set_selected_points(x_pts, y_pts)
+
+    @profiling.profiled()
+    def _cluster_spectra(self) -> None:
+        """Show the principal components and k-means clusters of the selected spectra, see multivariate.py."""
+        spectra = self._table.get_spectra()
+        if self._plot is None or spectra is None or len(spectra.get_x()) < 2 or len(spectra) < 2:
+            s = "Unable to run PCA and clustering. Please select x-data and at least two y-datasets first."
+            tk.messagebox.showwarning(title=None, message=s)
+            return
+        n_components = tk.simpledialog.askinteger('PCA and Clustering', 'Number of principal components:', parent=self,
+                                                  initialvalue=config.pca_components, minvalue=1, maxvalue=len(spectra))
+        if n_components is None:
+            return
+        n_clusters = tk.simpledialog.askinteger('PCA and Clustering', 'Number of clusters:', parent=self,
+                                                initialvalue=min(config.pca_clusters, len(spectra)), minvalue=1, maxvalue=len(spectra))
+        if n_clusters is None:
+            return
+        import classes.multivariate as multivariate
+        grid, matrix = multivariate.resample(spectra.get_x(), spectra.get_y())
+        pca = multivariate.randomized_pca(matrix, n_components)
+        labels, _, _ = multivariate.kmeans(pca['scores'], n_clusters)
+        self._plot.draw_multivariate(grid, pca, labels, multivariate.cluster_means(matrix, labels, n_clusters))
+        self._clusters = (self._table.get_indices(), labels)
+        if self._analytics_window is not None and self._analytics_window.winfo_exists():
+            try:
+                self._analytics_window.set_spectrum_column('cluster', labels)
+            except ValueError:
+                pass # the analytics are of other spectra
+
+    def _toggle_preview(self) -> None:
+        """See EmbeddedPlot.enable_preview()."""
+        if self._plot is not None:
+            self._plot.enable_preview(self._preview_enabled.get())
+
+    @profiling.profiled()
+    def _straight_line_continuum_removal(self, x: np.array, y_list: list, x_pts: list, y_pts: list, metrics=True) -> list:
+        """Performs continuum removal and calls all analysis functions on the resultant curve, see continuum.py."""
+        return continuum.straight_line_continuum_removal(x, y_list, x_pts, y_pts, metrics)
 
     def _configure_widgets(self):
         """
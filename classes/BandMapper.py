@@ -0,0 +1,181 @@
+# file:   BandMapper.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: generates per-pixel band parameter maps for image cubes.
+# The cube is split into tiles which are processed by a pool of worker
+# processes. The cube and output maps are memory-mapped .npy files, so
+# workers share them through the OS page cache rather than pickled copies,
+# and peak memory is bounded by the number of tiles in flight.
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import classes.continuum as continuum
+
+def _map_filename(metric: str) -> str:
+    """Returns the output filename for a metric, eg. 'band depth' -> 'band_depth.npy'."""
+    return metric.replace(' ', '_') + '.npy'
+
+def _map_tile(cube_path: str, x: np.array, segments: list, out_dir: str, metrics: tuple, rows: tuple, cols: tuple) -> tuple:
+    """
+    Worker function, computes all metrics for a single tile and writes them into the output maps.
+    Returns the tile origin so the parent can record its completion.
+    """
+    r0, r1 = rows
+    c0, c1 = cols
+    cube = np.load(cube_path, mmap_mode='r')
+    # only the tile itself is read into memory
+    tile = np.asarray(cube[r0:r1, c0:c1, :], dtype=np.float64)
+    spectra = tile.reshape(-1, tile.shape[-1])
+    maps = {metric: np.load(os.path.join(out_dir, _map_filename(metric)), mmap_mode='r+') for metric in metrics}
+    for i, (x_min, x_max) in enumerate(segments):
+        x_seg, y_removed = continuum.remove_continuum(x, spectra, x_min, x_max)
+        values = continuum.band_metrics(x_seg, y_removed)
+        for metric in metrics:
+            maps[metric][i, r0:r1, c0:c1] = values[metric].reshape(r1 - r0, c1 - c0)
+    for band_map in maps.values():
+        band_map.flush()
+    return r0, c0
+
+class BandMapper():
+
+    METRICS = ('band depth', 'band centre', 'band area')
+    PROGRESS_FILENAME = 'progress.json'
+
+    def __init__(self, cube_path: str, x: np.array, segments: list, out_dir: str,
+                 tile_size=128, max_workers=None, metrics=METRICS):
+        """
+        cube_path is a .npy file of shape (rows, columns, bands) and x holds the
+        band positions. segments is a list of (x_min, x_max) continuum endpoints.
+        """
+        self._cube_path = os.path.abspath(cube_path)
+        self._x = np.asarray(x, dtype=np.float64)
+        self._segments = [(float(min(s)), float(max(s))) for s in segments]
+        self._out_dir = out_dir
+        self._tile_size = tile_size
+        self._max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self._metrics = tuple(metrics)
+        self._cancel_event = threading.Event()
+
+        # validate the cube header without reading any data
+        cube = np.load(self._cube_path, mmap_mode='r')
+        if cube.ndim != 3:
+            raise ValueError("The image cube must have shape (rows, columns, bands).")
+        if cube.shape[2] != len(self._x):
+            raise ValueError(f"The image cube has {cube.shape[2]} bands but {len(self._x)} x-values were given.")
+        if len(self._segments) == 0:
+            raise ValueError("At least one continuum segment is required.")
+        self._shape = cube.shape[:2]
+
+    def run(self, progress_cb=None) -> dict:
+        """
+        Generate all maps, resuming from a previous partial run if one exists.
+        progress_cb(n_done, n_total) is called after every completed tile.
+        Returns a dictionary of metric name to output map filename, or None if cancelled.
+        """
+        os.makedirs(self._out_dir, exist_ok=True)
+        completed = self._load_progress()
+        if completed is None:
+            completed = set()
+            self._create_maps()
+            self._save_progress(completed)
+
+        tiles = [tile for tile in self._tiles() if (tile[0][0], tile[1][0]) not in completed]
+        n_total = len(completed) + len(tiles)
+        if progress_cb is not None:
+            progress_cb(len(completed), n_total)
+
+        # keep a bounded number of tiles in flight so memory does not grow with the scene size
+        max_pending = 2 * self._max_workers
+        pending = set()
+        tiles = iter(tiles)
+        # spawned workers never inherit the GUI process state
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self._max_workers, mp_context=context) as executor:
+            try:
+                while True:
+                    while len(pending) < max_pending and not self._cancel_event.is_set():
+                        tile = next(tiles, None)
+                        if tile is None:
+                            break
+                        pending.add(executor.submit(_map_tile, self._cube_path, self._x, self._segments,
+                                                    self._out_dir, self._metrics, *tile))
+                    if len(pending) == 0:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        completed.add(future.result()) # re-raises worker exceptions
+                    self._save_progress(completed)
+                    if progress_cb is not None:
+                        progress_cb(len(completed), n_total)
+            finally:
+                for future in pending:
+                    future.cancel()
+                self._save_progress(completed)
+
+        if len(completed) < n_total:
+            return None
+        return {metric: os.path.join(self._out_dir, _map_filename(metric)) for metric in self._metrics}
+
+    def cancel(self) -> None:
+        """Stop submitting tiles, completed tiles are kept for resuming."""
+        self._cancel_event.set()
+
+    def _tiles(self) -> list:
+        """Returns the (row range, column range) of every tile in the cube."""
+        n_rows, n_cols = self._shape
+        tiles = []
+        for r0 in range(0, n_rows, self._tile_size):
+            for c0 in range(0, n_cols, self._tile_size):
+                tiles.append(((r0, min(r0 + self._tile_size, n_rows)), (c0, min(c0 + self._tile_size, n_cols))))
+        return tiles
+
+    def _create_maps(self) -> None:
+        """Create the output maps on disk, one (segment, row, column) array per metric."""
+        shape = (len(self._segments),) + tuple(self._shape)
+        for metric in self._metrics:
+            filename = os.path.join(self._out_dir, _map_filename(metric))
+            band_map = np.lib.format.open_memmap(filename, mode='w+', dtype=np.float32, shape=shape)
+            band_map[:] = np.nan
+            band_map.flush()
+            del band_map
+
+    def _signature(self) -> str:
+        """Hash of all inputs, a previous run is only resumed if its inputs were identical."""
+        stat = os.stat(self._cube_path)
+        params = {'cube': self._cube_path,
+                  'size': stat.st_size,
+                  'mtime': stat.st_mtime_ns,
+                  'x': hashlib.sha256(self._x.tobytes()).hexdigest(),
+                  'segments': self._segments,
+                  'tile size': self._tile_size,
+                  'metrics': self._metrics}
+        return hashlib.sha256(json.dumps(params).encode()).hexdigest()
+
+    def _load_progress(self):
+        """Returns the set of completed tiles from a matching previous run, or None."""
+        filename = os.path.join(self._out_dir, self.PROGRESS_FILENAME)
+        try:
+            with open(filename, 'r') as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return None
+        maps_exist = all(os.path.exists(os.path.join(self._out_dir, _map_filename(metric))) for metric in self._metrics)
+        if progress.get('signature') != self._signature() or not maps_exist:
+            return None
+        return set(tuple(tile) for tile in progress['completed'])
+
+    def _save_progress(self, completed: set) -> None:
+        """Atomically write the completed tiles so an interrupted run can resume."""
+        filename = os.path.join(self._out_dir, self.PROGRESS_FILENAME)
+        progress = {'signature': self._signature(), 'completed': sorted(completed)}
+        with open(filename + '.tmp', 'w') as f:
+            json.dump(progress, f)
+        os.replace(filename + '.tmp', filename)
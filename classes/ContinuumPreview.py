@@ -0,0 +1,84 @@
+# file:   ContinuumPreview.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: live continuum removal of the segment being dragged.
+# The plotted spectra are stacked into one array once, then every cursor
+# move only touches the points inside the segment. The overlay curves are
+# evaluated at a bounded number of evenly spaced points, so their cost
+# follows the display width rather than the data length, and the band
+# metrics are computed at full resolution for the spectrum the segment
+# started on. Moves that snap to the same data point reuse the last result.
+
+import numpy as np
+
+import classes.continuum as continuum
+from classes.SpectrumSet import SpectrumSet
+import classes.profiling as profiling
+
+class ContinuumPreview():
+
+    def __init__(self, x: np.array, y_list: list):
+        """Prepare the preview for y_list, each plotted against x, see SpectrumSet.stack(). A stacked matrix isn't copied."""
+        self._x = np.asarray(x, dtype=np.float64)
+        self._y = SpectrumSet.stack(y_list, len(self._x))
+        self._ascending = bool(np.all(np.diff(self._x) > 0))
+        self._x_start = None
+        self._y_start = None
+        self._anchor = 0
+        self._last_key = None
+        self._last_result = None
+
+    def start(self, x: float, y: float) -> None:
+        """Begin a segment at (x, y), the spectrum passing closest to it is used for the band metrics."""
+        self._x_start = x
+        self._y_start = y
+        self._last_key = None
+        self._last_result = None
+        if len(self._y) > 0 and len(self._x) > 0:
+            column = self._y[:, np.abs(self._x - x).argmin()]
+            self._anchor = int(np.nanargmin(np.abs(column - y))) if not np.all(np.isnan(column)) else 0
+
+    def update(self, x: float, y: float, n_max: int) -> tuple:
+        """
+        Continuum removal between the start point and (x, y), as Run Tool would perform it for this segment.
+        Returns the x-values and removed curves of every spectrum at no more than n_max points, and the band
+        metrics of the anchor spectrum keyed by analytics column name. Returns None if the segment is empty.
+        """
+        if self._x_start is None:
+            return None
+        x_min, x_max, y_min, y_max = self._x_start, x, self._y_start, y
+        if x_min > x_max:
+            x_min, x_max = x_max, x_min
+            y_min, y_max = y_max, y_min
+        key = (x_min, x_max, y_min, y_max, n_max)
+        if key != self._last_key:
+            self._last_key = key
+            self._last_result = self._compute(x_min, x_max, y_min, y_max, n_max)
+        return self._last_result
+
+    @profiling.profiled()
+    def _compute(self, x_min: float, x_max: float, y_min: float, y_max: float, n_max: int) -> tuple:
+        """Evaluate the segment, see update()."""
+        if self._ascending:
+            seg = np.arange(np.searchsorted(self._x, x_min, 'left'), np.searchsorted(self._x, x_max, 'right'))
+        else:
+            seg = np.flatnonzero(continuum.segment_mask(self._x, x_min, x_max))
+        n_seg = len(seg)
+        if n_seg == 0 or len(self._y) == 0:
+            return None
+
+        # overlay curves on evenly spaced points of the segment, the line runs by index as in Run Tool
+        positions = np.unique(np.linspace(0, n_seg - 1, min(n_seg, max(n_max, 2))).astype(int))
+        t = positions / (n_seg - 1) if n_seg > 1 else np.zeros(1)
+        straight_line = y_min + (y_max - y_min) * t
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_removed = self._y[:, seg[positions]] / straight_line[None, :]
+        y_removed[y_removed > 1] = 1
+
+        # band metrics of the anchor spectrum at full resolution
+        x_seg, y_seg = continuum.remove_continuum(self._x[seg], self._y[self._anchor, seg], x_min, x_max, y_min, y_max)
+        metrics = {column: float(values[0]) for column, values in continuum.band_metrics(x_seg, y_seg).items()}
+        if not self._ascending:
+            metrics['band fwhm'] = float(continuum.band_fwhm_unordered(x_seg, y_seg[0]))
+        return self._x[seg[positions]], y_removed, metrics
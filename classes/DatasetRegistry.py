@@ -0,0 +1,147 @@
+# file:   DatasetRegistry.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: keeps the numeric data of every opened file addressable.
+# Datasets are full-precision float arrays identified by a hash of their
+# contents, so selections referring to them stay valid across sessions.
+# While the arrays exceed the memory budget, the least recently used
+# datasets are spilled to memory-mapped .npy files and reloaded on access.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+import classes.config as config
+
+class DatasetRegistry():
+
+    def __init__(self, max_bytes=config.dataset_memory_bytes, spill_dir=None):
+        """Keep at most max_bytes of datasets in memory, spilled datasets are written to spill_dir, a temporary folder by default."""
+        self._max_bytes = max_bytes
+        self._spill_dir = spill_dir
+        self._datasets = {}          # id -> {'name', 'values', 'path', 'text cells'}
+        self._loaded = OrderedDict() # ids of in-memory datasets, least recently used first
+        self._loaded_bytes = 0
+        self._finalizer = None
+
+    @staticmethod
+    def make_id(values: np.array) -> str:
+        """Returns the id for a dataset, a short hash of its shape and values."""
+        sha = hashlib.sha256(str(values.shape).encode())
+        sha.update(np.ascontiguousarray(values).tobytes())
+        return sha.hexdigest()[:16]
+
+    def add(self, name: str, values: np.array, text_cells=None, dataset_id=None) -> str:
+        """
+        Add a dataset, or replace the values of an existing one if dataset_id is given.
+        text_cells are the [row, column, text] of non-numeric cells, kept for displaying the dataset again.
+        Returns the dataset id.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if dataset_id is None:
+            dataset_id = self.make_id(values)
+        if dataset_id in self._datasets.keys():
+            self._unload(dataset_id, spill=False)
+            self._remove_spill(dataset_id)
+        self._datasets[dataset_id] = {'name': name, 'values': None, 'path': None,
+                                      'text cells': list(text_cells) if text_cells is not None else []}
+        self._load(dataset_id, values)
+        return dataset_id
+
+    def get(self, dataset_id: str) -> np.array:
+        """Returns the values of a dataset, reloading it into memory if it was spilled. Raises KeyError if unknown."""
+        dataset = self._datasets[dataset_id]
+        if dataset_id in self._loaded.keys():
+            self._loaded.move_to_end(dataset_id)
+            return dataset['values']
+        values = np.load(dataset['path'])
+        self._load(dataset_id, values)
+        return values
+
+    def get_name(self, dataset_id: str) -> str:
+        """Returns the name, usually the filename, of a dataset."""
+        return self._datasets[dataset_id]['name']
+
+    def get_text_cells(self, dataset_id: str) -> list:
+        """Returns the [row, column, text] of the dataset's non-numeric cells."""
+        return self._datasets[dataset_id]['text cells']
+
+    def get_datasets(self) -> list:
+        """Returns (id, name) of every dataset, in the order they were added."""
+        return [(dataset_id, dataset['name']) for dataset_id, dataset in self._datasets.items()]
+
+    def is_loaded(self, dataset_id: str) -> bool:
+        """Returns True if the dataset is held in memory rather than spilled to disk."""
+        return dataset_id in self._loaded.keys()
+
+    def get_loaded_bytes(self) -> int:
+        """Returns the size of the in-memory datasets."""
+        return self._loaded_bytes
+
+    def __contains__(self, dataset_id) -> bool:
+        return dataset_id in self._datasets.keys()
+
+    def remove(self, dataset_id: str) -> None:
+        """Forget a dataset and delete its spilled copy."""
+        if dataset_id in self._datasets.keys():
+            self._unload(dataset_id, spill=False)
+            self._remove_spill(dataset_id)
+            self._datasets.pop(dataset_id)
+
+    def close(self) -> None:
+        """Forget all datasets and delete the spill folder if it was created by the registry."""
+        for dataset_id in list(self._datasets.keys()):
+            self.remove(dataset_id)
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _load(self, dataset_id: str, values: np.array) -> None:
+        """Hold values in memory as the most recently used dataset, spilling others beyond the budget."""
+        dataset = self._datasets[dataset_id]
+        dataset['values'] = values
+        self._loaded[dataset_id] = values.nbytes
+        self._loaded_bytes += values.nbytes
+        # the dataset being accessed is never spilled, even if it alone exceeds the budget
+        while self._loaded_bytes > self._max_bytes and len(self._loaded) > 1:
+            self._unload(next(iter(self._loaded.keys())), spill=True)
+
+    def _unload(self, dataset_id: str, spill: bool) -> None:
+        """Release a dataset from memory, leaving it memory-mapped from its spill file if spill is set."""
+        if dataset_id not in self._loaded.keys():
+            return
+        dataset = self._datasets[dataset_id]
+        self._loaded_bytes -= self._loaded.pop(dataset_id)
+        if spill:
+            if dataset['path'] is None:
+                path = os.path.join(self._get_spill_dir(), f'{dataset_id}.npy')
+                np.save(path, dataset['values'])
+                dataset['path'] = path
+            dataset['values'] = np.load(dataset['path'], mmap_mode='r')
+        else:
+            dataset['values'] = None
+
+    def _remove_spill(self, dataset_id: str) -> None:
+        """Delete the spilled copy of a dataset, if any."""
+        dataset = self._datasets[dataset_id]
+        if dataset['path'] is not None:
+            dataset['values'] = None
+            try:
+                os.remove(dataset['path'])
+            except OSError:
+                pass
+            dataset['path'] = None
+
+    def _get_spill_dir(self) -> str:
+        """Returns the spill folder, creating it on first use."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='sat-datasets-')
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, ignore_errors=True)
+        else:
+            os.makedirs(self._spill_dir, exist_ok=True)
+        return self._spill_dir
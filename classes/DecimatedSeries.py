@@ -0,0 +1,113 @@
+# file:   DecimatedSeries.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: level-of-detail rendering data for a dense series.
+# A pyramid of per-bin minimum and maximum indices is built once, with bin
+# sizes doubling at each level. For a given view, the level whose bins are
+# just narrower than a display pixel is selected and each bin is reduced to
+# its first, minimum, maximum and last points. Missing values are ignored
+# for the extremes, a bin holding any keeps one of them as well so gaps still
+# break the line. Drawn as a line this is visually identical to the
+# full-resolution series, but the number of points is bounded by the display
+# width instead of the data length.
+# The source arrays are never modified.
+
+import numpy as np
+
+class DecimatedSeries():
+
+    _min_level = 2 # smallest bins hold 2**_min_level points, finer views draw raw points
+
+    def __init__(self, x: np.array, y: np.array):
+        """Build the pyramid for y plotted against x, truncated to their common length."""
+        length = min(len(x), len(y))
+        self._x_source = x[:length]
+        self._y_source = y[:length]
+        x = np.asarray(x[:length], dtype=np.float64)
+        y = np.asarray(y[:length], dtype=np.float64)
+
+        # decimation requires monotonic x, views keep descending data uncopied
+        diffs = np.diff(x)
+        self._levels = None
+        if np.all(diffs >= 0):
+            self._x, self._y = x, y
+        elif np.all(diffs <= 0):
+            self._x, self._y = x[::-1], y[::-1]
+        else:
+            self._x, self._y = x, y
+            return
+
+        # level 1 from raw pairs, each following level merges pairs of bins
+        self._levels = {}
+        index_dtype = np.int32 if length < np.iinfo(np.int32).max else np.int64
+        min_idx = np.arange(length, dtype=index_dtype)
+        max_idx = min_idx
+        # index of a missing value in each bin, or -1, only kept if there are any
+        missing = np.isnan(y)
+        nan_idx = np.where(missing, min_idx, -1).astype(index_dtype) if missing.any() else None
+        level = 0
+        while len(min_idx) > 1:
+            min_idx = self._merge(min_idx, np.less)
+            max_idx = self._merge(max_idx, np.greater)
+            if nan_idx is not None:
+                nan_idx = self._merge_nan(nan_idx)
+            level += 1
+            if level >= self._min_level:
+                self._levels[level] = (min_idx, max_idx, nan_idx)
+
+    def _merge(self, idx: np.array, better) -> np.array:
+        """Combine neighbouring bins, keeping the index of the better value. NaNs only win over other NaNs."""
+        left = idx[0::2]
+        right = idx[1::2]
+        merged = left.copy()
+        n = len(right)
+        left_vals = self._y[left[:n]]
+        right_vals = self._y[right]
+        take_right = better(right_vals, left_vals) | (np.isnan(left_vals) & ~np.isnan(right_vals))
+        merged[:n][take_right] = right[take_right]
+        return merged
+
+    @staticmethod
+    def _merge_nan(idx: np.array) -> np.array:
+        """Combine neighbouring bins of missing value indices, keeping either one, -1 if neither bin has one."""
+        left = idx[0::2]
+        right = idx[1::2]
+        merged = left.copy()
+        n = len(right)
+        merged[:n] = np.where(left[:n] >= 0, left[:n], right)
+        return merged
+
+    def get_source(self) -> tuple:
+        """Returns the untouched source arrays."""
+        return self._x_source, self._y_source
+
+    def decimate(self, x_lim: tuple, width: int) -> tuple:
+        """Returns (x, y) to draw for the view x_lim on an axis width pixels wide."""
+        n_pts = len(self._x)
+        if self._levels is None or n_pts == 0:
+            return self._x, self._y
+        x_min, x_max = min(x_lim), max(x_lim)
+        # include one neighbour on each side so lines leave the axis correctly
+        lo = max(0, np.searchsorted(self._x, x_min, side='left') - 1)
+        hi = min(n_pts, np.searchsorted(self._x, x_max, side='right') + 1)
+        pts_per_pixel = (hi - lo) / max(1, width)
+        level = int(np.floor(np.log2(pts_per_pixel))) if pts_per_pixel >= 1 else 0
+        level = min(level, max(self._levels.keys(), default=0))
+        if level < self._min_level:
+            return self._x[lo:hi], self._y[lo:hi]
+
+        # first, min, max and last point of every bin in view, in index order
+        bin_size = 1 << level
+        min_idx, max_idx, nan_idx = self._levels[level]
+        b0 = lo // bin_size
+        b1 = min(len(min_idx), -(-hi // bin_size))
+        first = np.arange(b0, b1, dtype=np.int64) * bin_size
+        last = np.minimum(first + bin_size, n_pts) - 1
+        columns = [first, min_idx[b0:b1], max_idx[b0:b1], last]
+        if nan_idx is not None:
+            # a missing value breaks the line, bins without one repeat their first point instead
+            columns.append(np.where(nan_idx[b0:b1] >= 0, nan_idx[b0:b1], first))
+        idx = np.stack(columns, axis=1)
+        idx = np.sort(idx, axis=1).reshape(-1)
+        return self._x[idx], self._y[idx]
@@ -12,8 +12,18 @@ import numpy as np
 
 import matplotlib.cm as cm
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.ticker import AutoLocator, ScalarFormatter
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from classes.container import pack_ragged, unpack_ragged
+from classes.SnapIndex import SnapIndex
+from classes.DecimatedSeries import DecimatedSeries
+from classes.ContinuumPreview import ContinuumPreview
+from classes.SpectralEnvelope import SpectralEnvelope
+from classes.SpectrumSet import SpectrumSet
+import classes.plotstyle as plotstyle
+import classes.profiling as profiling
 import classes.config as config
 
 class EmbeddedPlot() :
@@ -38,20 +48,52 @@ class EmbeddedPlot() :
         self._canvas = FigureCanvasTkAgg(self._fig, master=self._canvas_frame) 
         self._canvas.get_tk_widget().place(relx=0.01, rely=0.01, relwidth=0.98, relheight=0.98)
         self._canvas.get_tk_widget().config(bg=config.widget_bg_color)
-        self._canvas.mpl_connect('motion_notify_event', self._set_temp_point)
+        self._canvas.mpl_connect('motion_notify_event', self._queue_motion)
         self._canvas.mpl_connect('button_press_event', self._set_first_point)
         self._canvas.mpl_connect('button_release_event', self._set_final_point)
         self._canvas.mpl_connect('axes_leave_event', self._axis_leave_cb)
         self._canvas.mpl_connect('figure_leave_event', self._axis_leave_cb)
+        self._canvas.mpl_connect('draw_event', self._cache_background)
+        self._canvas.mpl_connect('resize_event', self._resize_cb)
         self._canvas.draw() # draw blank canvas once
 
-        # for storing data
+        # redraw scheduling, at most one render and one motion update per Tk idle cycle
+        self._needs_draw = False
+        self._pending_motion = None
+        self._idle_id = None
+
+        # interactive overlay, blitted over a cached background of the static plot
+        self._background = None
+        self._temp_point = None
+        self._temp_line = None
+
+        # live continuum removal of the segment being dragged, drawn with the overlay
+        self._do_preview = config.continuum_preview
+        self._preview = None
+        self._preview_lines = None
+        self._preview_text = None
+
+        # for storing data, _y_pts_list are the rows of _spectra when drawn from a SpectrumSet
+        self._spectra = None
         self._x_pts = None
         self._y_pts_list = []
         self._y_tool_pts_list = []
         self._x_selected_pts = []
         self._y_selected_pts = []
         self._do_point_selection = False
+        self._snap_index = None
+
+        # level-of-detail data for each series and the long-lived artists drawn from them
+        self._lod_raw = []
+        self._lod_tool = []
+        self._lod_views = {}
+        self._raw_lines = None
+        self._tool_lines = None
+        self._selected_lines = None
+
+        # aggregate display of many spectra, statistics are computed on first use after the data changes
+        self._envelopes = {}
+        self._envelope_artists = {'raw': [], 'tool': []}
 
         # create frame for placing buttons
         button_frame_x, button_frame_y, button_frame_w, button_frame_h = 0.00, 0.81, 1.00, 0.19
@@ -95,7 +137,16 @@ class EmbeddedPlot() :
         selected_button_x, selected_button_y, selected_button_w, selected_button_h = 0.25, 0.50, 0.24, 0.22
         self._toggle_selected_data_button = ttk.Button(self._button_frame, text='Toggle Selections', command=self._toggle_selected_data)
         self._toggle_selected_data_button.place(relx=selected_button_x, rely=selected_button_y, relwidth=selected_button_w, relheight=selected_button_h)
+
+        # initialize envelope toggle button
+        self._do_envelope = False
+        envelope_button_x, envelope_button_y, envelope_button_w, envelope_button_h = 0.25, 0.75, 0.24, 0.22
+        self._toggle_envelope_button = ttk.Button(self._button_frame, text='Toggle Envelope', command=self._toggle_envelope)
+        self._toggle_envelope_button.place(relx=envelope_button_x, rely=envelope_button_y, relwidth=envelope_button_w, relheight=envelope_button_h)
         
+        # limits and ticks entered by the user, the others are only Matplotlib's choice for this plot
+        self._user_set = {'x limits': False, 'y limits': False, 'x ticks': False, 'y ticks': False}
+
         # initialize title set button
         self._title = ''
         title_button_x, title_button_y, title_button_w, title_button_h = 0.50, 0.25, 0.16, 0.22
@@ -143,124 +194,420 @@ class EmbeddedPlot() :
         self._y_tick_button.place(relx=y_tick_button_x, rely=y_tick_button_y, relwidth=y_tick_button_w, relheight=y_tick_button_h)
 
     def draw(self, x, y_list, y_tool_pts_list=None) -> None:
-        """Clears the existing plot and draws passed data."""
-        valid_x = x is not None
-        valid_y = len(y_list) > 0
-        if valid_x and valid_y:
+        """Clears the existing plot and draws passed data, see draw_spectra()."""
+        spectra = SpectrumSet.from_arrays(x, y_list) if x is not None and len(y_list) > 0 else None
+        self.draw_spectra(spectra, y_tool_pts_list)
+
+    def draw_spectra(self, spectra: SpectrumSet, y_tool_pts_list=None) -> None:
+        """Clears the existing plot and draws the spectra, y_tool_pts_list holds the matching tool outputs, if any."""
+        if spectra is not None and len(spectra) > 0:
             self.clear(clear_selections=False)
-            self._x_pts = x
-            self._y_pts_list = y_list
+            self._spectra = spectra
+            self._x_pts = spectra.get_x()
+            self._y_pts_list = spectra.get_y_list()
             if y_tool_pts_list is not None:
                 self._y_tool_pts_list = y_tool_pts_list
+            # too many spectra to tell apart as lines
+            self._do_envelope = len(self._y_pts_list) >= config.envelope_min_spectra
+            self._snap_index = SnapIndex(self._x_pts, self._y_pts_list)
+            self._preview = None
+            self._build_lod()
             self._draw()
         else:
             s = "Unable to produce the requested plot. Please ensure x- and y-data have been selected before plotting."
             tk.messagebox.showwarning(title=None, message=s)
 
+    def update_series(self, positions: list, y_list: list, y_tool_list=None) -> None:
+        """
+        Replace the plotted series at positions, or append them if at or past the end, keeping the existing
+        artists and styling. y_tool_list holds the matching tool outputs, if any. Used for incremental ingest.
+        """
+        if self._x_pts is None or self._raw_lines is None:
+            return
+        # the series no longer match the drawn set
+        self._spectra = None
+        self._y_pts_list = list(self._y_pts_list)
+        self._y_tool_pts_list = list(self._y_tool_pts_list)
+        for series_list, lod_list, new_list in ((self._y_pts_list, self._lod_raw, y_list),
+                                                (self._y_tool_pts_list, self._lod_tool, y_tool_list)):
+            if new_list is None:
+                continue
+            for position, y in zip(positions, new_list):
+                # level-of-detail data that hasn't been built yet will include the new series
+                if position < len(series_list):
+                    series_list[position] = y
+                    if lod_list is not None:
+                        lod_list[position] = DecimatedSeries(self._x_pts, y)
+                else:
+                    series_list.append(y)
+                    if lod_list is not None:
+                        lod_list.append(DecimatedSeries(self._x_pts, y))
+        self._snap_index = SnapIndex(self._x_pts, self._y_pts_list)
+        self._preview = None
+
+        # same colouring as a full draw
+        n_colours = len(self._y_pts_list) + len(self._y_tool_pts_list)
+        colours = cm.rainbow(np.linspace(0, 1, n_colours))
+        self._raw_lines.set_color(colours[:len(self._y_pts_list)])
+        self._tool_lines.set_color(colours[len(self._y_pts_list):])
+        self._lod_views = {}
+        self._envelopes = {}
+        if self._do_envelope:
+            self._remove_envelopes()
+            self._create_envelopes()
+        self._update_lod()
+        self._request_draw()
+
+    @profiling.profiled()
     def _draw(self) -> None:
-        """Internal method to clear the existing plot and draws passed data."""
+        """
+        Internal method to clear the existing plot and create the artists for all stored data.
+        Only needed when the data changes, toggles and configuration update the artists in place.
+        """
         self._fig.clear()
         self._plot = self._fig.add_subplot(111)
         self._configure_plot()
+        self._create_overlay()
 
         # manually choose colours for consistency in toggling
         n_colours = len(self._y_pts_list) + len(self._y_tool_pts_list)
-        colours = iter(cm.rainbow(np.linspace(0, 1, n_colours)))
-
-        # plot the raw data
-        for y in self._y_pts_list:
-            c = next(colours)
-            if self._do_raw_data:
-                length = min(len(self._x_pts), len(y))
-                self._plot.plot(self._x_pts[:length], y[:length], c=c)
-    
-        # plot the analyzed data
-        for y in self._y_tool_pts_list:
-            c = next(colours)
-            if self._do_tool_data:
-                length = min(len(self._x_pts), len(y))
-                self._plot.plot(self._x_pts[:length], y[:length], c=c)
+        colours = cm.rainbow(np.linspace(0, 1, n_colours))
+
+        # one collection per series group, toggled by visibility
+        self._lod_views = {}
+        show_raw = self._do_raw_data and not self._do_envelope
+        show_tool = self._do_tool_data and not self._do_envelope
+        self._raw_lines = self._create_collection(self._get_lod()[0] if show_raw else [], colours[:len(self._y_pts_list)], show_raw)
+        self._tool_lines = self._create_collection(self._get_lod()[1] if show_tool else [], colours[len(self._y_pts_list):], show_tool)
+        self._envelope_artists = {'raw': [], 'tool': []}
+        if self._do_envelope:
+            self._create_envelopes()
 
         # plot the selection data
-        if self._do_selected_data:
-            if len(self._x_selected_pts) > 0 and len(self._x_selected_pts) == len(self._y_selected_pts):
-                x_list = self._group_list(self._x_selected_pts.copy(), 2)
-                y_list = self._group_list(self._y_selected_pts.copy(), 2)
-                for x, y in zip(x_list, y_list):
-                    self._plot.plot(x, y, ls='--', color='r')
-        self._canvas.draw()
+        self._selected_lines = LineCollection([], linestyles='--', colors='r', zorder=2)
+        self._selected_lines.set_visible(self._do_selected_data)
+        self._plot.add_collection(self._selected_lines, autolim=False)
+        self._update_selected_lines()
 
-        # update labels if we didn't manually set them
-        if len(self._x_tick_vals) == 0 or len(self._x_tick_strs) == 0:
-            self._x_tick_vals = self._plot.get_xticks()
-            self._x_tick_strs = self._plot.get_xticklabels()
-        if len(self._y_tick_vals) == 0 or len(self._y_tick_strs) == 0:
-            self._y_tick_vals = self._plot.get_yticks()
-            self._y_tick_strs = self._plot.get_yticklabels()
+        self._update_lod()
+        self._store_ticks_and_limits()
+        self._request_draw()
 
+    def draw_multivariate(self, grid: np.array, pca: dict, labels: np.array, means: np.array) -> None:
+        """
+        Replace the plot with the results of multivariate.py: the principal component loadings, the scores
+        of the first two components coloured by cluster, and the mean spectrum of each cluster.
+        """
+        self.clear(clear_selections=False)
+        self._fig.clear()
+        colours = cm.rainbow(np.linspace(0, 1, len(means)))
+        counts = np.bincount(labels, minlength=len(means))
+
+        loadings = self._fig.add_subplot(2, 2, 1)
+        for i, (component, ratio) in enumerate(zip(pca['components'], pca['explained variance'])):
+            loadings.plot(grid, component, linewidth=1, label=f'PC{i+1} ({100*ratio:.1f}%)')
+        loadings.set_title('Loadings')
+        loadings.legend(fontsize='small')
+
+        scores = pca['scores']
+        scatter = self._fig.add_subplot(2, 2, 2)
+        scatter.scatter(scores[:, 0], scores[:, 1] if scores.shape[1] > 1 else np.zeros(len(scores)),
+                        c=colours[labels], s=4, linewidths=0, rasterized=True)
+        scatter.set_title('Scores')
+        scatter.set_xlabel('PC1')
+        scatter.set_ylabel('PC2' if scores.shape[1] > 1 else '')
+
+        cluster_means = self._fig.add_subplot(2, 1, 2)
+        for k, mean in enumerate(means):
+            cluster_means.plot(grid, mean, color=colours[k], linewidth=1, label=f'cluster {k} ({counts[k]})')
+        cluster_means.set_title('Cluster Means')
+        cluster_means.legend(fontsize='small')
+        self._request_draw()
+
+    def _create_collection(self, series_list: list, colours: np.array, visible: bool) -> LineCollection:
+        """
+        Create a single collection drawing every series in series_list, decimated over the full data range.
+        Hidden collections are left empty until they are shown, see _update_lod().
+        """
+        width = self._get_plot_width()
+        segments = [np.column_stack(series.decimate((-np.inf, np.inf), width)) for series in series_list] if visible else []
+        collection = LineCollection(segments, colors=colours, zorder=2)
+        collection.set_visible(visible)
+        self._plot.add_collection(collection, autolim=len(segments) > 0)
+        return collection
+
+    def _get_envelope(self, key: str) -> SpectralEnvelope:
+        """Returns the statistics of the raw ('raw') or tool ('tool') series, computed once per data change."""
+        if key not in self._envelopes.keys():
+            series_list = self._get_raw_spectra() if key == 'raw' else self._y_tool_pts_list
+            self._envelopes[key] = SpectralEnvelope.from_spectra(series_list, len(self._x_pts))
+        return self._envelopes[key]
+
+    @profiling.profiled()
+    def _create_envelopes(self) -> None:
+        """
+        Draw the raw and tool series as filled bands of their minimum to maximum, 5th to 95th and 25th to
+        75th percentiles with the median and mean as lines. The number of artists and points is fixed, so
+        drawing doesn't depend on the number of spectra.
+        """
+        x = np.asarray(self._x_pts, dtype=np.float64)
+        for key, colour, series_list, visible in (('raw', 'tab:blue', self._y_pts_list, self._do_raw_data),
+                                                   ('tool', 'tab:red', self._y_tool_pts_list, self._do_tool_data)):
+            if len(series_list) == 0:
+                continue
+            envelope = self._get_envelope(key)
+            percentiles = envelope.get_percentiles([5, 25, 50, 75, 95])
+            # blocks of neighbouring points keep their extremes for the bands, their average for the lines
+            edges = np.linspace(0, len(x), min(len(x), config.envelope_max_points) + 1).astype(int)
+            lower = lambda values: np.fmin.reduceat(values, edges[:-1])
+            upper = lambda values: np.fmax.reduceat(values, edges[:-1])
+            average = lambda values: np.add.reduceat(values, edges[:-1]) / np.diff(edges)
+            x_blocks = average(x)
+            artists = [self._plot.fill_between(x_blocks, lower(low), upper(high), color=colour, alpha=alpha, linewidth=0, zorder=2)
+                       for low, high, alpha in ((envelope.get_min(), envelope.get_max(), 0.15),
+                                                (percentiles[5], percentiles[95], 0.25),
+                                                (percentiles[25], percentiles[75], 0.35))]
+            artists.extend(self._plot.plot(x_blocks, average(percentiles[50]), color=colour, linewidth=1, zorder=3))
+            artists.extend(self._plot.plot(x_blocks, average(envelope.get_mean()), color=colour, linewidth=1, ls='--', zorder=3))
+            for artist in artists:
+                artist.set_visible(visible)
+            self._envelope_artists[key] = artists
+
+    def _get_raw_spectra(self):
+        """Returns the raw series as the SpectrumSet matrix if they were drawn from one, which consumers don't copy, or the list."""
+        return self._spectra.get_y() if self._spectra is not None else self._y_pts_list
+
+    def _remove_envelopes(self) -> None:
+        """Remove the envelope artists from the plot."""
+        for artists in self._envelope_artists.values():
+            for artist in artists:
+                artist.remove()
+        self._envelope_artists = {'raw': [], 'tool': []}
+
+    def _update_selected_lines(self) -> None:
+        """Update the selection lines in place from the selected points."""
+        segments = []
+        if len(self._x_selected_pts) > 0 and len(self._x_selected_pts) == len(self._y_selected_pts):
+            x_list = self._group_list(self._x_selected_pts.copy(), 2)
+            y_list = self._group_list(self._y_selected_pts.copy(), 2)
+            segments = [np.column_stack([x, y]) for x, y in zip(x_list, y_list)]
+        self._selected_lines.set_segments(segments)
+
+    def _store_ticks_and_limits(self) -> None:
+        """Store the ticks and limits chosen by Matplotlib, unless they were manually set."""
         # update limits if we didn't manually set them
         if self._x_lim_min >= self._x_lim_max:
             self._x_lim_min, self._x_lim_max = self._plot.get_xlim()
         if self._y_lim_min >= self._y_lim_max:
             self._y_lim_min, self._y_lim_max = self._plot.get_ylim()
 
+        # update labels if we didn't manually set them
+        for axis, tick_vals, tick_strs in ((self._plot.xaxis, '_x_tick_vals', '_x_tick_strs'),
+                                           (self._plot.yaxis, '_y_tick_vals', '_y_tick_strs')):
+            if len(getattr(self, tick_vals)) == 0 or len(getattr(self, tick_strs)) == 0:
+                locs = axis.get_majorticklocs()
+                setattr(self, tick_vals, locs)
+                setattr(self, tick_strs, axis.get_major_formatter().format_ticks(locs))
+
+    def _request_draw(self) -> None:
+        """Mark the canvas dirty, it is rendered once when Tk is next idle."""
+        self._needs_draw = True
+        self._schedule_idle()
+
+    def _queue_motion(self, event) -> None:
+        """Keep only the latest motion event, superseded events are dropped."""
+        self._pending_motion = event
+        self._schedule_idle()
+
+    def _schedule_idle(self) -> None:
+        """Schedule _on_idle unless it is already scheduled."""
+        if self._idle_id is None:
+            self._idle_id = self._frame.after_idle(self._on_idle)
+
+    @profiling.profiled()
+    def _on_idle(self) -> None:
+        """Perform the pending render, then the latest motion update."""
+        self._idle_id = None
+        if self._needs_draw:
+            self._needs_draw = False
+            self._canvas.draw()
+            # the overlay isn't part of full draws, put it back on the new background
+            self._blit_overlay()
+        if self._pending_motion is not None:
+            event = self._pending_motion
+            self._pending_motion = None
+            self._set_temp_point(event)
+
+    def _create_overlay(self) -> None:
+        """Create the animated snap marker and preview line, excluded from full canvas draws."""
+        self._temp_point, = self._plot.plot([], [], ls='', marker='o', ms=3, color='r', zorder=10, animated=True)
+        self._temp_line, = self._plot.plot([], [], ls='--', color='r', zorder=10, animated=True)
+        self._preview_lines = LineCollection([], linewidths=1, alpha=0.8, zorder=9, animated=True)
+        self._plot.add_collection(self._preview_lines, autolim=False)
+        self._preview_text = self._plot.text(0.02, 0.02, '', transform=self._plot.transAxes, fontsize='small',
+                                             bbox={'facecolor': 'white', 'alpha': 0.8, 'edgecolor': 'none'},
+                                             zorder=10, animated=True)
+        self._preview_text.set_visible(False)
+
+    def _cache_background(self, event) -> None:
+        """
+        Store the rendered static plot after every full draw.
+        Full draws only occur when the contents, limits or size change, so the cache is always current.
+        """
+        self._background = self._canvas.copy_from_bbox(self._fig.bbox)
+
+    def _blit_overlay(self) -> None:
+        """Redraw only the overlay artists on top of the cached background."""
+        if self._temp_point is None or self._needs_draw:
+            return
+        if self._background is None:
+            self._canvas.draw()
+        self._canvas.restore_region(self._background)
+        self._plot.draw_artist(self._preview_lines)
+        self._plot.draw_artist(self._temp_point)
+        self._plot.draw_artist(self._temp_line)
+        self._plot.draw_artist(self._preview_text)
+        self._canvas.blit(self._fig.bbox)
+
+    def _hide_overlay(self) -> None:
+        """Remove the snap marker and preview line from view."""
+        if self._temp_point is not None:
+            self._temp_point.set_data([], [])
+            self._temp_line.set_data([], [])
+            self._clear_preview()
+            self._blit_overlay()
+
+    def _clear_preview(self) -> None:
+        """Remove the continuum removal preview, the next full draw or blit hides it."""
+        if self._preview_lines is not None:
+            self._preview_lines.set_segments([])
+            self._preview_text.set_visible(False)
+
+    def _update_preview(self, x: float, y: float) -> None:
+        """Show the continuum-removed curves and band metrics of the segment from the last selected point to (x, y)."""
+        result = self._preview.update(x, y, 2 * self._get_plot_width()) if self._preview is not None else None
+        if result is None:
+            self._clear_preview()
+            return
+        x_removed, y_removed, metrics = result
+        self._preview_lines.set_segments([np.column_stack([x_removed, y]) for y in y_removed])
+        self._preview_lines.set_color(self._raw_lines.get_colors()[:len(y_removed)])
+        self._preview_text.set_text(f"depth: {metrics['band depth']:.4f}\n"
+                                    f"centre: {metrics['band centre']:.2f}\n"
+                                    f"fwhm: {metrics['band fwhm']:.2f}")
+        self._preview_text.set_visible(True)
+
+    def _build_lod(self) -> None:
+        """Discard the level-of-detail data and statistics of the previous data, they are rebuilt when first needed."""
+        self._envelopes = {}
+        self._lod_raw = None
+        self._lod_tool = None
+
+    def _get_lod(self) -> tuple:
+        """
+        Returns the level-of-detail data of the raw and tool series, building it if needed.
+        Envelope plots of many spectra never build it unless the lines are shown, the source arrays are left untouched.
+        """
+        if self._lod_raw is None:
+            self._lod_raw = [DecimatedSeries(self._x_pts, y) for y in self._y_pts_list]
+            self._lod_tool = [DecimatedSeries(self._x_pts, y) for y in self._y_tool_pts_list]
+        return self._lod_raw, self._lod_tool
+
+    def _get_plot_width(self) -> int:
+        """Returns the width of the plot area in display pixels."""
+        return int(np.ceil(self._plot.bbox.width)) if self._plot is not None else 1
+
+    def _update_lod(self) -> None:
+        """Re-decimate the visible series for the current x-limits and plot width, hidden ones on toggle."""
+        if self._plot is None or self._raw_lines is None:
+            return
+        view = (self._plot.get_xlim(), self._get_plot_width())
+        for collection, k in ((self._raw_lines, 0), (self._tool_lines, 1)):
+            if collection.get_visible() and self._lod_views.get(id(collection)) != view:
+                collection.set_segments([np.column_stack(series.decimate(*view)) for series in self._get_lod()[k]])
+                self._lod_views[id(collection)] = view
+
+    def _resize_cb(self, event) -> None:
+        """The plot width changed, so the decimated series need more or fewer points."""
+        if self._raw_lines is not None:
+            self._update_lod()
+            self._request_draw()
+
+    def get_style(self) -> dict:
+        """Return the plot configuration, see plotstyle.py."""
+        tick_str = lambda tick: tick.get_text() if hasattr(tick, 'get_text') else str(tick)
+        return {'title': self._title,
+                'x label': self._x_label,
+                'y label': self._y_label,
+                'x limits': [float(self._x_lim_min), float(self._x_lim_max)],
+                'y limits': [float(self._y_lim_min), float(self._y_lim_max)],
+                'x ticks': [float(tick) for tick in self._x_tick_vals],
+                'y ticks': [float(tick) for tick in self._y_tick_vals],
+                'x tick labels': [tick_str(tick) for tick in self._x_tick_strs],
+                'y tick labels': [tick_str(tick) for tick in self._y_tick_strs]}
+
+    def get_export_style(self) -> dict:
+        """
+        Return the plot configuration for figures of other data, see get_style().
+        Only limits and ticks set by the user are kept, Matplotlib chooses the others for each figure.
+        """
+        style = self.get_style()
+        for axis in ('x', 'y'):
+            if not self._user_set[f'{axis} limits']:
+                style[f'{axis} limits'] = [0.0, 0.0]
+            if not self._user_set[f'{axis} ticks']:
+                style[f'{axis} ticks'] = []
+                style[f'{axis} tick labels'] = []
+        return style
+
     def _configure_plot(self) -> None:
         """Applies all plot options to the current plot."""    
-        self._configure_plot_colours()
-        self._configure_plot_labels()
-        self._configure_plot_ticks()
-        self._configure_plot_limits()
-
-    def _configure_plot_colours(self) -> None:
-        """Set the plot background and text colours"""
         if self._plot is not None:
-            self._plot.axes.set_facecolor(config.text_color)
-            self._plot.xaxis.label.set_color(config.text_color)
-            self._plot.yaxis.label.set_color(config.text_color)
-            self._plot.set_facecolor(config.widget_bg_color)
+            plotstyle.configure_plot(self._plot, self.get_style())
 
     def _configure_plot_labels(self) -> None:
         """Set the plot and axis labels."""
         if self._plot is not None:
-            self._plot.set_title(self._title)
-            self._plot.set_xlabel(self._x_label)
-            self._plot.set_ylabel(self._y_label)
+            plotstyle.configure_labels(self._plot, self.get_style())
 
     def _configure_plot_ticks(self) -> None:
         """Set axis ticks, if empty, let Matplotlib decide"""
         if self._plot is not None:
-            self._plot.grid(True, which='both', axis='both')
-            self._plot.tick_params(labelsize=12, top=True, right=True, 
-                                   direction='in', which='both', 
-                                   grid_color=config.grid_color)
-            if len(self._x_tick_vals) > 0 or len(self._x_tick_strs) > 0:
-                self._plot.set_xticks(self._x_tick_vals)
-                self._plot.set_xticklabels(self._x_tick_strs)
-            if len(self._y_tick_vals) > 0 or len(self._y_tick_strs) > 0:
-                self._plot.set_yticks(self._y_tick_vals)
-                self._plot.set_yticklabels(self._y_tick_strs)
+            plotstyle.configure_ticks(self._plot, self.get_style())
 
     def _configure_plot_limits(self) -> None:
         """Set x- and y-limits, if stored max <= min then let Matplotlib decide"""
         if self._plot is not None:
-            if self._x_lim_min < self._x_lim_max:
-                self._plot.set_xlim(self._x_lim_min, self._x_lim_max)
-            if self._y_lim_min < self._y_lim_max:
-                self._plot.set_ylim(self._y_lim_min, self._y_lim_max)
+            plotstyle.configure_limits(self._plot, self.get_style())
 
     def clear(self, clear_selections=True) -> None:
         """Clears the existing plot and draws a blank canvas."""
-        if self._plot is not None:
-            self._plot = self._plot.clear()
+        if self._plot is not None or len(self._fig.axes) > 0:
+            if self._plot is not None:
+                self._plot = self._plot.clear()
             self._fig.clear()
+            self._temp_point = None
+            self._temp_line = None
+            self._preview_lines = None
+            self._preview_text = None
+            self._raw_lines = None
+            self._tool_lines = None
+            self._selected_lines = None
+            self._envelope_artists = {'raw': [], 'tool': []}
             self._clear_data(clear_selections)
             self._clear_configs()
-            self._canvas.draw()
+            self._request_draw()
 
     def _clear_data(self, clear_selections=True) -> None:
+        self._spectra = None
         self._x_pts = None
         self._y_pts_list = []
         self._y_tool_pts_list = []
+        self._snap_index = None
+        self._preview = None
+        self._envelopes = {}
+        self._lod_raw = []
+        self._lod_tool = []
         if clear_selections:
             self._x_selected_pts = []
             self._y_selected_pts = []
@@ -271,6 +618,7 @@ class EmbeddedPlot() :
         self._do_raw_data = True
         self._do_tool_data = True
         self._do_selected_data = True
+        self._do_envelope = False
         self._title = ''
         self._x_label = ''
         self._x_lim_min = 0
@@ -282,17 +630,85 @@ class EmbeddedPlot() :
         self._y_lim_max = 0
         self._y_tick_vals = []
         self._y_tick_strs = []
+        self._user_set = {'x limits': False, 'y limits': False, 'x ticks': False, 'y ticks': False}
 
     def save(self, filename: str) -> None:
         """Saves the existing plot."""
         self._fig.savefig(filename, bbox_inches='tight', transparent=True)
 
+    def get_state(self):
+        """Return the plotted data, selections and configuration as (arrays, meta) for saving a session."""
+        if self._x_pts is None:
+            return None
+        y_pts, y_lengths = pack_ragged(self._y_pts_list)
+        y_tool_pts, y_tool_lengths = pack_ragged(self._y_tool_pts_list)
+        arrays = {'x': np.asarray(self._x_pts, dtype=np.float64),
+                  'y': y_pts, 'y lengths': y_lengths,
+                  'y tool': y_tool_pts, 'y tool lengths': y_tool_lengths}
+        meta = self.get_style()
+        meta.update({'x selected': [float(x) for x in self._x_selected_pts],
+                     'y selected': [float(y) for y in self._y_selected_pts],
+                     'point selection': self._do_point_selection,
+                     'raw data': self._do_raw_data,
+                     'tool data': self._do_tool_data,
+                     'selected data': self._do_selected_data,
+                     'envelope': self._do_envelope,
+                     'user set': dict(self._user_set)})
+        return arrays, meta
+
+    def restore_state(self, arrays: dict, meta: dict) -> None:
+        """Restore the plot from a state produced by get_state(), arrays may be memory-mapped."""
+        self.clear()
+        self._x_pts = arrays['x']
+        self._y_pts_list = unpack_ragged(arrays['y'], arrays['y lengths'])
+        self._y_tool_pts_list = unpack_ragged(arrays['y tool'], arrays['y tool lengths'])
+        self._x_selected_pts = list(meta['x selected'])
+        self._y_selected_pts = list(meta['y selected'])
+        self._do_point_selection = meta['point selection']
+        self._do_raw_data = meta['raw data']
+        self._do_tool_data = meta['tool data']
+        self._do_selected_data = meta['selected data']
+        self._do_envelope = meta.get('envelope', False)
+        self._title = meta['title']
+        self._x_label = meta['x label']
+        self._y_label = meta['y label']
+        self._x_lim_min, self._x_lim_max = meta['x limits']
+        self._y_lim_min, self._y_lim_max = meta['y limits']
+        self._x_tick_vals = meta['x ticks']
+        self._y_tick_vals = meta['y ticks']
+        self._x_tick_strs = meta['x tick labels']
+        self._y_tick_strs = meta['y tick labels']
+        self._user_set.update(meta.get('user set', {}))
+        self._snap_index = SnapIndex(self._x_pts, self._y_pts_list)
+        self._build_lod()
+        self._draw()
+
+    def get_size_inches(self) -> tuple:
+        """Return the current figure size, for rendering other figures at the same size."""
+        return tuple(self._fig.get_size_inches())
+
     def get_selected_points(self) -> tuple:
         """Return the selected points in the plot surface."""
         x_list = self._group_list(self._x_selected_pts.copy(), 2)
         y_list = self._group_list(self._y_selected_pts.copy(), 2)
         return x_list, y_list
 
+    def set_selected_points(self, x_list: list, y_list: list) -> None:
+        """Replace the selected points with segments in the format of get_selected_points(), eg. proposed by band detection."""
+        self._x_selected_pts = [x for x_pair in x_list for x in x_pair]
+        self._y_selected_pts = [y for y_pair in y_list for y in y_pair]
+        if self._selected_lines is not None:
+            self._update_selected_lines()
+            self._request_draw()
+
+    def get_data(self) -> tuple:
+        """Return the plotted x-data and spectra."""
+        return self._x_pts, self._y_pts_list
+
+    def get_tool_data(self) -> tuple:
+        """Return the plotted x-data and tool output curves."""
+        return self._x_pts, self._y_tool_pts_list
+
     def enable_point_selection(self, do_point_selection: bool) -> None:
         """Enable/Disable point selection."""
         self._do_point_selection = do_point_selection
@@ -300,29 +716,40 @@ class EmbeddedPlot() :
         if self._do_point_selection:
             self._x_selected_pts = []
             self._y_selected_pts = []
-            self._draw()
+            if self._plot is None:
+                self._draw()
+            else:
+                self._update_selected_lines()
+                self._request_draw()
+
+    def enable_preview(self, do_preview: bool) -> None:
+        """Enable/Disable the live continuum removal preview while dragging a segment."""
+        self._do_preview = do_preview
+        if not do_preview:
+            self._clear_preview()
+            self._blit_overlay()
 
     def _axis_leave_cb(self, event) -> None:
-        """Forces a canvas update to visually remove any temporary (but actually removed) scatter points."""
+        """Removes the snap marker and preview line when the cursor leaves the plot."""
+        self._pending_motion = None
         self._clear_entry_text()
-        self._canvas.draw()
+        self._hide_overlay()
 
     def _set_temp_point(self, event) -> None:
-        """Draw a temporary line during click + drag."""
-        if self._do_point_selection and event.inaxes:
+        """Draw the snapped cursor point, or a temporary line during click + drag."""
+        if self._do_point_selection and event.inaxes and self._temp_point is not None:
             x, y = self._get_nearest(self._x_pts, self._y_pts_list, event.xdata, event.ydata)
             self._clear_entry_text()
             self._entry.insert(0, f'{x:.2f}, {y:.2f}')
             if len(self._x_selected_pts) % 2 == 0:
-                scat = self._plot.scatter(x, y, s=5, color='r', zorder=10)
-                self._configure_plot_limits()
-                self._canvas.draw()
-                scat.remove()
+                self._temp_point.set_data([x], [y])
+                self._temp_line.set_data([], [])
             else:
-                lines = self._plot.plot([self._x_selected_pts[-1], x], [self._y_selected_pts[-1], y], ls='--', color='r')
-                self._configure_plot_limits()
-                self._canvas.draw()
-                lines[0].remove()
+                self._temp_point.set_data([], [])
+                self._temp_line.set_data([self._x_selected_pts[-1], x], [self._y_selected_pts[-1], y])
+                if self._do_preview:
+                    self._update_preview(x, y)
+            self._blit_overlay()
 
     def _set_first_point(self, event) -> None:
         """Set the first selected point in the plot surface."""
@@ -332,6 +759,11 @@ class EmbeddedPlot() :
             self._y_selected_pts.append(y)
             self._clear_entry_text()
             self._entry.insert(0, f'{x:.2f}, {y:.2f}')
+            if self._do_preview and self._x_pts is not None:
+                # the stacked spectra are reused by every segment until the data changes
+                if self._preview is None:
+                    self._preview = ContinuumPreview(self._x_pts, self._get_raw_spectra())
+                self._preview.start(x, y)
 
     def _set_final_point(self, event) -> None:
         """Set the last selected point in the plot surface."""
@@ -339,8 +771,11 @@ class EmbeddedPlot() :
             x, y = self._get_nearest(self._x_pts, self._y_pts_list, event.xdata, event.ydata)
             self._x_selected_pts.append(x)
             self._y_selected_pts.append(y)
-            self._plot.plot(self._x_selected_pts[-2:], self._y_selected_pts[-2:], ls='--', color='r')
-            self._canvas.draw()
+            self._temp_point.set_data([], [])
+            self._temp_line.set_data([], [])
+            self._clear_preview()
+            self._update_selected_lines()
+            self._request_draw()
             self._clear_entry_text()
 
     def _group_list(self, old_data: list, n: int) -> list:
@@ -365,33 +800,74 @@ class EmbeddedPlot() :
     def _toggle_raw_data(self) -> None:
         """Toggle whether the plot should display the raw data."""
         self._do_raw_data = not self._do_raw_data
-        if self._plot is not None:
-            self._draw()
+        if self._plot is not None and self._raw_lines is not None:
+            self._raw_lines.set_visible(self._do_raw_data and not self._do_envelope)
+            for artist in self._envelope_artists['raw']:
+                artist.set_visible(self._do_raw_data)
+            self._update_lod()
+            self._request_draw()
 
     def _toggle_tool_data(self) -> None:
         """Toggle whether the plot should display the tool data."""
         self._do_tool_data = not self._do_tool_data
-        if self._plot is not None:
-            self._draw()
+        if self._plot is not None and self._tool_lines is not None:
+            self._tool_lines.set_visible(self._do_tool_data and not self._do_envelope)
+            for artist in self._envelope_artists['tool']:
+                artist.set_visible(self._do_tool_data)
+            self._update_lod()
+            self._request_draw()
+
+    def _toggle_envelope(self) -> None:
+        """Toggle between drawing every spectrum and drawing their statistical envelope."""
+        self._do_envelope = not self._do_envelope
+        if self._plot is not None and self._raw_lines is not None:
+            self._remove_envelopes()
+            if self._do_envelope:
+                self._create_envelopes()
+            self._raw_lines.set_visible(self._do_raw_data and not self._do_envelope)
+            self._tool_lines.set_visible(self._do_tool_data and not self._do_envelope)
+            self._update_lod()
+            self._request_draw()
 
     def _toggle_selected_data(self) -> None:
         """Toggle whether the plot should display the selected data."""
         self._do_selected_data = not self._do_selected_data
-        if self._plot is not None:
-            self._draw()
+        if self._plot is not None and self._selected_lines is not None:
+            self._selected_lines.set_visible(self._do_selected_data)
+            self._request_draw()
     
+    def _reset_limits(self, axis: str) -> None:
+        """Let Matplotlib choose the limits of the passed axis ('x' or 'y') again."""
+        if self._raw_lines is None:
+            self._draw()
+            return
+        self._plot.autoscale(True, axis=axis)
+        if axis == 'x':
+            self._update_lod()
+        self._store_ticks_and_limits()
+
+    def _reset_ticks(self, axis: str) -> None:
+        """Let Matplotlib choose the ticks of the passed axis ('x' or 'y') again."""
+        if self._raw_lines is None:
+            self._draw()
+            return
+        axis = self._plot.xaxis if axis == 'x' else self._plot.yaxis
+        axis.set_major_locator(AutoLocator())
+        axis.set_major_formatter(ScalarFormatter())
+        self._store_ticks_and_limits()
+
     def _set_title(self) -> None:
         """Set the title of the plot. Gets input from the text box and clears after."""
         self._title = self._get_entry_text()
         self._configure_plot_labels()
-        self._canvas.draw()
+        self._request_draw()
         self._clear_entry_text()
 
     def _set_x_label(self) -> None:
         """Set the x-axis label of the plot. Gets input from the text box and clears after."""
         self._x_label = self._get_entry_text()
         self._configure_plot_labels()
-        self._canvas.draw()
+        self._request_draw()
         self._clear_entry_text()
 
     def _set_x_limits(self) -> None:
@@ -402,7 +878,8 @@ class EmbeddedPlot() :
         if entry == '':
             self._x_lim_min = 0
             self._x_lim_max = 0
-            self._draw()
+            self._user_set['x limits'] = False
+            self._reset_limits('x')
         # use the passed ticks
         else:
             entry_list = entry.replace(' ', '').split(',') # remove whitespace, separate on commas
@@ -411,11 +888,13 @@ class EmbeddedPlot() :
                 self._x_lim_min, self._x_lim_max = float(entry_list[0]), float(entry_list[1])
                 if self._x_lim_min > self._x_lim_max:
                     self._x_lim_min, self._x_lim_max = self._x_lim_max, self._x_lim_min
+                self._user_set['x limits'] = True
                 self._configure_plot_limits()
+                self._update_lod()
             except (ValueError, IndexError) as e:
                 s = "Unable to set the x-axis ticks to the requested value. Please enter only comma-separated numeric values."
                 tk.messagebox.showwarning(title=None, message=s)
-        self._canvas.draw()
+        self._request_draw()
 
     def _set_x_ticks(self) -> None:
         """Set the x-axis ticks of the plot. Gets input from the text box and clears after."""
@@ -425,24 +904,26 @@ class EmbeddedPlot() :
         if entry == '':
             self._x_tick_vals = []
             self._x_tick_strs = []
-            self._draw()
+            self._user_set['x ticks'] = False
+            self._reset_ticks('x')
         # use the passed ticks
         else:
             entry_list = entry.replace(' ', '').split(',') # remove whitespace, separate on commas
             try:
                 self._x_tick_vals = [float(entry) for entry in entry_list] # raises ValueError if float(entry) fails
                 self._x_tick_strs = entry_list.copy()
+                self._user_set['x ticks'] = True
                 self._configure_plot_ticks()
             except ValueError as e:
                 s = "Unable to set the x-axis ticks to the requested value. Please enter only comma-separated numeric values."
                 tk.messagebox.showwarning(title=None, message=s)
-        self._canvas.draw()
+        self._request_draw()
 
     def _set_y_label(self) -> None:
         """Set the y-axis label of the plot. Gets input from the text box and clears after."""
         self._y_label = self._get_entry_text()
         self._configure_plot_labels()
-        self._canvas.draw()
+        self._request_draw()
         self._clear_entry_text()
 
     def _set_y_limits(self) -> None:
@@ -453,7 +934,8 @@ class EmbeddedPlot() :
         if entry == '':
             self._y_lim_min = 0
             self._y_lim_max = 0
-            self._draw()
+            self._user_set['y limits'] = False
+            self._reset_limits('y')
         # use the passed ticks
         else:
             entry_list = entry.replace(' ', '').split(',') # remove whitespace, separate on commas
@@ -462,11 +944,12 @@ class EmbeddedPlot() :
                 self._y_lim_min, self._y_lim_max = float(entry_list[0]), float(entry_list[1])
                 if self._y_lim_min > self._y_lim_max:
                     self._y_lim_min, self._y_lim_max = self._y_lim_max, self._y_lim_min
+                self._user_set['y limits'] = True
                 self._configure_plot_limits()
             except (ValueError, IndexError) as e:
                 s = "Unable to set the y-axis ticks to the requested value. Please enter only comma-separated numeric values."
                 tk.messagebox.showwarning(title=None, message=s)
-        self._canvas.draw()
+        self._request_draw()
 
     def _set_y_ticks(self) -> None:
         """Set the y-axis ticks of the plot. Gets input from the text box and clears after."""
@@ -476,50 +959,33 @@ class EmbeddedPlot() :
         if entry == '':
             self._y_tick_vals = []
             self._y_tick_strs = []
-            self._draw()
+            self._user_set['y ticks'] = False
+            self._reset_ticks('y')
         # use the passed ticks
         else:
             entry_list = entry.replace(' ', '').split(',') # remove whitespace, separate on commas
             try:
                 self._y_tick_vals = [float(entry) for entry in entry_list] # raises ValueError if float(entry) fails
                 self._y_tick_strs = entry_list.copy()
+                self._user_set['y ticks'] = True
                 self._configure_plot_ticks()
             except ValueError as e:
                 s = "Unable to set the y-axis ticks to the requested value. Please enter only comma-separated numeric values."
                 tk.messagebox.showwarning(title=None, message=s)
-        self._canvas.draw()
+        self._request_draw()
 
+    @profiling.profiled()
     def _get_nearest(self, x, y_list, x_pt, y_pt) -> tuple:
         """Given a set of x- and y-data, find the nearest data coordinate
-        to the passed x- and y-points."""
+        to the passed x- and y-points. See SnapIndex for the search itself."""
         nearest_x = x_pt
         nearest_y = y_pt
         thresh = 0.0025 # don't snap until within thresh distance from mouse
-        min_radius = 1000000 # any 'large' number
         if x is not None and len(y_list) > 0 and self._plot is not None:
-            # normalize x- and y-points to plot dimensions
-            min_x, max_x = self._plot.get_xlim()
-            min_y, max_y = self._plot.get_ylim()
-            x_pt = (x_pt - min_x) / (max_x - min_x)
-            y_pt = (y_pt - min_y) / (max_y - min_y)
-            for y in y_list:
-                # make series consistent length
-                length = min(len(x), len(y))
-                x = x[:length]
-                y = y[:length]
-                # normalize x- and y-data to plot dimensions
-                norm_x = (x - min_x) / (max_x - min_x)
-                norm_y = (y - min_y) / (max_y - min_y)
-                # get relative distance to selected points
-                dx = norm_x - x_pt
-                dy = norm_y - y_pt
-                # get nearest point by minimizing radius
-                radii = dx * dx + dy * dy
-                min_radius_temp = radii.min()
-                if min_radius_temp < thresh and min_radius_temp < min_radius:
-                    index = radii.argmin()
-                    if index < length:
-                        nearest_x = x[index]
-                        nearest_y = y[index]
-                        min_radius = min_radius_temp
+            # the index only depends on the data, rebuild if it was changed outside of draw()
+            if self._snap_index is None or not self._snap_index.matches(x, y_list):
+                self._snap_index = SnapIndex(x, y_list)
+            nearest = self._snap_index.query(x_pt, y_pt, self._plot.get_xlim(), self._plot.get_ylim(), thresh)
+            if nearest is not None:
+                nearest_x, nearest_y = nearest
         return nearest_x, nearest_y
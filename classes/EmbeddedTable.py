@@ -5,15 +5,20 @@
 # description: handles table operations for the application.
 # TODO: implement different display styles
 
+import copy
+import hashlib
+import os
 import platform
 
 import tkinter as tk
 import tkinter.ttk as ttk
 
-import pandas as pd
 import numpy as np
 
 from classes.TableColumn import TableColumn
+from classes.DatasetRegistry import DatasetRegistry
+from classes.SpectrumSet import SpectrumSet
+import classes.profiling as profiling
 import classes.config as config
 
 class EmbeddedTable() :
@@ -107,63 +112,236 @@ class EmbeddedTable() :
 
         # create a canvas for holding a number of TableColumns to form a table
         self._canvas = None
+        self._column_frame = None
         self._table_columns = []
 
+        # files appended after opening, filename -> {file column: table column}
+        self._appended = {}
+        self._n_file_columns = 0
+
+        # every opened file stays available, selections refer to their dataset by id
+        self._registry = DatasetRegistry(config.dataset_memory_bytes)
+        self._dataset_id = None
+        # dataset id -> sha256 hash of the file bytes it was parsed from
+        self._file_hashes = {}
+        # dataset id -> {appended filename: sha256 hash of its parsed contents}
+        self._appended_hashes = {}
+
         # default references for data
         self._df = None
+        self._filename = None
         self._indices = {}
         self._active_indices = []
         self._n_req_indices = 3
 
+    @profiling.profiled()
     def open(self, filename: str) -> None:
-        """Open the file at the passed file path."""
-        df = None
-        # excel file reading
-        if 'xlsx' in filename.lower():
-            df = pd.read_excel(filename, header=None) 
-        # csv file reading
-        elif 'csv' in filename.lower():
-            df = pd.read_csv(filename, sep=',', header=None)
-        # txt file reading, use sep=None to infer text delimeter
-        elif 'txt' in filename.lower():
-            df = pd.read_csv(filename, sep=None, header=None, engine='python')
-        # dpt file reading, use sep=None to infer text delimeter
-        elif 'dpt' in filename.lower():
-            df = pd.read_csv(filename, sep=None, header=None, engine='python')
+        """Open the file at the passed file path. Every table of a zip bundle is opened as a dataset, the first is displayed."""
+        import classes.readers as readers # deferred with pandas until the first file is opened
+        errors = []
+        tables = readers.read_hashed_tables(filename, errors)
         # update our existing data
-        if df is not None:
+        if len(tables) == 1:
+            name, df, file_hash = tables[0]
             self._populate(df)
+            self._filename = name
+            self._register()
+            self._file_hashes[self._dataset_id] = file_hash
+            self._update_listboxes()
+        # bundles are registered in order without populating the table, then the first is displayed
+        elif len(tables) > 1:
+            dataset_ids = []
+            for name, df, file_hash in tables:
+                dataset_ids.append(self._add_dataset(name, df))
+                self._file_hashes[dataset_ids[-1]] = file_hash
+            self.show_dataset(dataset_ids[0])
+        if len(errors) > 0:
+            s = "Skipped the tables that could not be read:\n" + "\n".join(f"{name}: {error}" for name, error in errors)
+            tk.messagebox.showwarning(title=None, message=s)
+
+    def _add_dataset(self, name: str, df: 'pd.DataFrame') -> str:
+        """Register a table without displaying it and return its id, its text cells are those _populate() would show."""
+        import classes.readers as readers
+        values = readers.to_numeric(df).to_numpy(dtype=np.float64, na_value=np.nan)
+        rows, cols = np.nonzero(np.isnan(values) & df.notna().to_numpy())
+        text_cells = [[int(row), int(col), str(df.iat[row, col])[:self._column_max_char]] for row, col in zip(rows, cols)]
+        return self._registry.add(name, values, [cell for cell in text_cells if cell[2] != ''])
+
+    def show_dataset(self, dataset_id: str) -> None:
+        """Display a previously opened dataset, selections of every dataset are kept."""
+        import pandas as pd
+        df = pd.DataFrame(self._registry.get(dataset_id)).astype(object)
+        for row, col, text in self._registry.get_text_cells(dataset_id):
+            df.iat[row, col] = text
+        self._populate(df)
+        self._filename = self._registry.get_name(dataset_id)
+        self._dataset_id = dataset_id
+        self._update_listboxes()
+
+    def remove_dataset(self, dataset_id: str) -> None:
+        """Forget a dataset and its selections, the most recently opened remaining dataset is displayed in its place."""
+        self._registry.remove(dataset_id)
+        self._file_hashes.pop(dataset_id, None)
+        self._appended_hashes.pop(dataset_id, None)
+        if 'x' in self._indices.keys() and self._get_dataset_id(self._indices['x']) == dataset_id:
+            self._indices.pop('x')
+        if 'y' in self._indices.keys():
+            self._indices['y'] = [y_index for y_index in self._indices['y'] if self._get_dataset_id(y_index) != dataset_id]
+        if dataset_id == self._dataset_id:
+            self.clear()
+            self._dataset_id = None
+            datasets = self._registry.get_datasets()
+            if len(datasets) > 0:
+                self.show_dataset(datasets[-1][0])
+        self._update_listboxes()
+
+    def get_datasets(self) -> list:
+        """Returns (id, name) of every opened dataset."""
+        return self._registry.get_datasets()
+
+    def get_dataset_id(self):
+        """Returns the id of the displayed dataset, or None."""
+        return self._dataset_id
+
+    def _register(self, dataset_id=None) -> None:
+        """Add the displayed table to the registry, or update its values if dataset_id is given."""
+        values = self._df.to_numpy(dtype=np.float64, na_value=np.nan)
+        self._dataset_id = self._registry.add(self._filename, values, self._get_text_cells(values), dataset_id)
+
+    def _get_dataset_id(self, index: list):
+        """Returns the dataset a selection refers to, selections without one refer to the displayed dataset."""
+        return index[3] if len(index) > 3 else self._dataset_id
+
+    def _get_values(self, index: list) -> np.array:
+        """Returns the full-precision values of the selected range, or None if its dataset was removed."""
+        dataset_id = self._get_dataset_id(index)
+        if dataset_id is None or dataset_id not in self._registry:
+            return None
+        x0, x1, col = index[:3]
+        return self._registry.get(dataset_id)[x0:x1, col]
+
+    def _index_str(self, index: list) -> str:
+        """Returns the listbox text for a selection, naming its file if it isn't the displayed one."""
+        x0, x1, col = index[:3]
+        s = f'col:{col+1}; row:{x0+1}-{x1}'
+        dataset_id = self._get_dataset_id(index)
+        if dataset_id != self._dataset_id and dataset_id in self._registry:
+            name = self._registry.get_name(dataset_id)
+            s += f' ({os.path.basename(name) if name else dataset_id})'
+        return s
+
+    def _update_listboxes(self) -> None:
+        """Show all x- and y-selections."""
+        self._x_listbox.delete(0, tk.END)
+        self._y_listbox.delete(0, tk.END)
+        if 'x' in self._indices.keys():
+            self._x_listbox.insert(0, self._index_str(self._indices['x']))
+        for y_index in self._indices.get('y', []):
+            self._y_listbox.insert(tk.END, self._index_str(y_index))
 
     def clear(self) -> None:
         """Clear all table and selection data."""
         if self._canvas is not None:
             self._canvas = self._canvas.destroy()
+        self._column_frame = None
         self._table_columns = []
+        self._appended = {}
         self._x_listbox.delete(0, tk.END)
         self._y_listbox.delete(0, tk.END)
         self._df = None
+        self._filename = None
         self._frame.update_idletasks()
 
+    def get_file_hash(self):
+        """
+        Return the sha256 hash of the file bytes the displayed dataset was parsed from, taken when it was opened
+        and combined with the files appended to it since, or None if no dataset is displayed.
+        """
+        return self._get_file_hash(self._dataset_id)
+
+    def _get_file_hash(self, dataset_id):
+        """Returns the hash of the file a dataset was parsed from, combined with the contents appended to it since."""
+        file_hash = self._file_hashes.get(dataset_id)
+        appended = self._appended_hashes.get(dataset_id, {})
+        if file_hash is not None and len(appended) > 0:
+            sha = hashlib.sha256(file_hash.encode())
+            for filename in sorted(appended.keys()):
+                sha.update(f'{filename}\n{appended[filename]}\n'.encode())
+            file_hash = sha.hexdigest()
+        return file_hash
+
+    def get_state(self):
+        """
+        Return the table contents and selections as (arrays, meta) for saving a session, or None if empty.
+        Numeric cells are stored as a float array, text cells (eg. headers) are stored separately.
+        """
+        if self._df is None:
+            return None
+        values = self._df.to_numpy(dtype=np.float64, na_value=np.nan)
+        arrays = {'values': values}
+        # other datasets are only stored if they are selected
+        datasets = {}
+        for index in [self._indices.get('x', [])] + self._indices.get('y', []):
+            dataset_id = self._get_dataset_id(index) if len(index) > 0 else None
+            if dataset_id not in (None, self._dataset_id) and dataset_id in self._registry and dataset_id not in datasets.keys():
+                arrays[f'datasets/{dataset_id}'] = self._registry.get(dataset_id)
+                datasets[dataset_id] = {'name': self._registry.get_name(dataset_id),
+                                        'text cells': self._registry.get_text_cells(dataset_id),
+                                        'file hash': self._get_file_hash(dataset_id)}
+        meta = {'filename': self._filename,
+                'file hash': self.get_file_hash(),
+                'indices': self.get_indices(),
+                'text cells': self._get_text_cells(values),
+                'dataset id': self._dataset_id,
+                'datasets': datasets}
+        return arrays, meta
+
+    def _get_text_cells(self, values: np.array) -> list:
+        """Returns [row, column, text] for every displayed non-numeric cell, eg. headers."""
+        text_cells = []
+        for i, column in enumerate(self._table_columns):
+            rows = np.flatnonzero(np.isnan(values[:, i]))
+            if len(rows) > 0:
+                texts = column.get(0, tk.END)
+                text_cells.extend([int(row), i, texts[row]] for row in rows if texts[row] != '')
+        return text_cells
+
+    def restore_state(self, arrays: dict, meta: dict) -> None:
+        """Restore the table from a state produced by get_state(), without re-parsing the source file."""
+        import pandas as pd
+        df = pd.DataFrame(arrays['values']).astype(object)
+        for row, col, text in meta['text cells']:
+            df.iat[row, col] = text
+        for dataset_id, dataset in meta.get('datasets', {}).items():
+            self._registry.add(dataset['name'], arrays[f'datasets/{dataset_id}'], dataset['text cells'], dataset_id)
+            self._file_hashes[dataset_id] = dataset.get('file hash')
+            self._appended_hashes.pop(dataset_id, None)
+        self._populate(df)
+        self._filename = meta['filename']
+        self._register(meta.get('dataset id'))
+        self._file_hashes[self._dataset_id] = meta['file hash']
+        self._appended_hashes.pop(self._dataset_id, None)
+        self._indices = meta['indices']
+        self._update_listboxes()
+
+    def get_indices(self) -> dict:
+        """Return a copy of the selected x- and y-indices."""
+        return copy.deepcopy(self._indices)
+
     def get_x(self) -> np.array:
         """Return the currently selected x-data."""
         x_vals = None
-        if self._df is not None and 'x' in self._indices.keys():
-            x0 = self._indices['x'][0]
-            x1 = self._indices['x'][1]
-            col = self._indices['x'][2]
-            x_vals = self._df.iloc[x0:x1, col].to_numpy()
+        if 'x' in self._indices.keys():
+            x_vals = self._get_values(self._indices['x'])
         return x_vals
     
     def _set_x(self) -> None:
         """Get the active table selections and assign to the active x-data."""
         if self._validate_active_data():
             # update the stored x-indices
-            self._indices['x'] = self._active_indices.copy()
-            x0 = self._indices['x'][0]
-            x1 = self._indices['x'][1]
-            col = self._indices['x'][2]
+            self._indices['x'] = self._active_indices.copy() + [self._dataset_id]
             # delete existing text and overwrite
-            s = f'col:{col+1}; row:{x0+1}-{x1}'
+            s = self._index_str(self._indices['x'])
             self._x_listbox.delete(0, tk.END)
             self._x_listbox.insert(0, s)
     
@@ -176,27 +354,49 @@ class EmbeddedTable() :
     def get_y(self) -> list:
         """Return the currently selected y-data."""
         y_vals = []
-        if self._df is not None and 'y' in self._indices.keys():
+        if 'y' in self._indices.keys():
             for y_index in self._indices['y']:
-                y0 = y_index[0]
-                y1 = y_index[1]
-                col = y_index[2]
-                y_vals.append(self._df.iloc[y0:y1, col].to_numpy())
+                y = self._get_values(y_index)
+                if y is not None:
+                    y_vals.append(y)
         return y_vals
 
+    def get_spectra(self):
+        """
+        Return the selected x- and y-data as a SpectrumSet, or None if no x-data is selected.
+        Spectra of the same dataset and rows are gathered from the dataset in a single copy.
+        """
+        x = self.get_x()
+        if x is None:
+            return None
+        n_points = len(x)
+        y_indices = [y_index for y_index in self._indices.get('y', []) if self._get_values(y_index) is not None]
+        y = np.full((len(y_indices), n_points), np.nan)
+        lengths = np.zeros(len(y_indices), dtype=np.int64)
+        sources = []
+        groups = {}
+        for i, y_index in enumerate(y_indices):
+            y0, y1, col = y_index[:3]
+            dataset_id = self._get_dataset_id(y_index)
+            groups.setdefault((dataset_id, y0, y1), []).append((i, col))
+            sources.append((y0, y1, col, dataset_id))
+        for (dataset_id, y0, y1), members in groups.items():
+            positions, cols = zip(*members)
+            block = self._registry.get(dataset_id)[y0:min(y1, y0 + n_points), list(cols)]
+            y[list(positions), :len(block)] = block.T
+            lengths[list(positions)] = len(block)
+        return SpectrumSet(x, y, lengths, sources)
+
     def _add_y(self, idx=-1) -> None:
         """Get the active table selections and append to the active y-data."""
         if self._validate_active_data():
             # update the stored y-indices
             if 'y' in self._indices.keys():
-                self._indices['y'].append(self._active_indices.copy())
+                self._indices['y'].append(self._active_indices.copy() + [self._dataset_id])
             else:
-                self._indices['y'] = [self._active_indices.copy()]
-            y0 = self._indices['y'][-1][0]
-            y1 = self._indices['y'][-1][1]
-            col = self._indices['y'][-1][2]
+                self._indices['y'] = [self._active_indices.copy() + [self._dataset_id]]
             # delete existing text and overwrite
-            s = f'col:{col+1}; row:{y0+1}-{y1}'
+            s = self._index_str(self._indices['y'][-1])
             if idx <= -1:
                 self._y_listbox.insert(tk.END, s)
             else:
@@ -221,12 +421,9 @@ class EmbeddedTable() :
         """Get the active table selections and replace the listbox and active y-data contents."""
         if self._validate_active_data():
             # update the stored y-indices
-            self._indices['y'][idx] = self._active_indices.copy()
+            self._indices['y'][idx] = self._active_indices.copy() + [self._dataset_id]
             # delete existing text and overwrite
-            y0 = self._indices['y'][idx][0]
-            y1 = self._indices['y'][idx][1]
-            col = self._indices['y'][idx][2]
-            s = f'col:{col+1}; row:{y0+1}-{y1}'
+            s = self._index_str(self._indices['y'][idx])
             self._y_listbox.delete(idx)
             self._y_listbox.insert(idx, s)
     
@@ -292,8 +489,10 @@ class EmbeddedTable() :
                 event.widget.select_clear(0, tk.END)
                 event.widget.select_set(selected_indices[0] + 1)
 
-    def _populate(self, df: pd.DataFrame) -> None:
+    @profiling.profiled()
+    def _populate(self, df: 'pd.DataFrame') -> None:
         """Populate the table with data given by the passed DataFrame"""
+        import pandas as pd
         if df is not None:
             self.clear()
 
@@ -311,29 +510,13 @@ class EmbeddedTable() :
             column_frame = ttk.Frame(self._canvas)
             column_frame.bind("<MouseWheel>",
                 lambda e: "break" if self._canvas is None else self._canvas.yview_scroll(int(-e.delta/self._scroll_div), tk.UNITS))
+            self._column_frame = column_frame
             
             # create all columns
             self._table_columns = []
             n_cols = len(df.columns)
             for i in range(n_cols):
-
-                # create a column
-                column = TableColumn(column_frame, i, justify=tk.LEFT, selectmode=tk.EXTENDED,
-                                     height=0, width=0, activestyle=tk.NONE, font=self._font)
-                column.bind("<MouseWheel>",
-                    lambda e: "break" if self._canvas is None else self._canvas.yview_scroll(int(-e.delta/self._scroll_div), tk.UNITS))
-                column.bind("<ButtonRelease-1>", self._get_table_selection)
-
-                # fill with values
-                for j in range(n_rows):
-                    try:
-                        val = str(round(float(self._df.iloc[j, i]), self._text_round))
-                    except ValueError as e:
-                        val = self._df.iloc[j, i]
-                    val = val[:self._column_max_char]
-                    column.insert(j, val)
-                self._table_columns.append(column)
-                column.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+                self._create_column(i, self._df.iloc[:, i].tolist())
 
             # add frame to canvas
             self._canvas.create_window(0, 0, height=0, width=0, window=column_frame, anchor=tk.NW)
@@ -351,6 +534,73 @@ class EmbeddedTable() :
             # convert strings to numbers for internal data
             for i in range(len(self._df.columns)):
                 self._df.iloc[:, i] = pd.to_numeric(self._df.iloc[:, i], errors='coerce')
+            self._n_file_columns = len(self._df.columns)
+
+    def _create_column(self, i: int, values: list) -> TableColumn:
+        """Create and show the table column at index i, filled with the passed cell values."""
+        column = TableColumn(self._column_frame, i, justify=tk.LEFT, selectmode=tk.EXTENDED,
+                             height=0, width=0, activestyle=tk.NONE, font=self._font)
+        column.bind("<MouseWheel>",
+            lambda e: "break" if self._canvas is None else self._canvas.yview_scroll(int(-e.delta/self._scroll_div), tk.UNITS))
+        column.bind("<ButtonRelease-1>", self._get_table_selection)
+        self._fill_column(column, values)
+        self._table_columns.append(column)
+        column.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        return column
+
+    def _fill_column(self, column: TableColumn, values: list) -> None:
+        """Replace the contents of a table column, numbers are rounded and empty cells given as ''."""
+        column.delete(0, tk.END)
+        for j, value in enumerate(values):
+            try:
+                val = str(round(float(value), self._text_round))
+            except ValueError as e:
+                val = value
+            val = val[:self._column_max_char]
+            column.insert(j, val)
+
+    def append(self, filename: str, df: 'pd.DataFrame') -> list:
+        """
+        Append the spectra of another file with the same layout as the opened file, without re-populating the table.
+        Each y-selection made on the opened file is repeated on the new file, as new table columns and y-data.
+        If filename was appended before, its columns are updated in place.
+        Returns the positions of the appended or updated spectra in get_y().
+        """
+        import pandas as pd
+        if self._df is None or df is None or 'y' not in self._indices.keys():
+            return []
+        if filename in self._appended.keys():
+            columns = self._appended[filename]
+        else:
+            # one new column per selected column of the opened file
+            template = [y_index[:3] for y_index in self._indices['y']
+                        if y_index[2] < self._n_file_columns and self._get_dataset_id(y_index) == self._dataset_id]
+            source_columns = sorted(set(col for _, _, col in template))
+            first = len(self._df.columns)
+            columns = {col: first + k for k, col in enumerate(source_columns)}
+            self._appended[filename] = columns
+            for y0, y1, col in template:
+                self._indices['y'].append([y0, y1, columns[col], self._dataset_id])
+                self._y_listbox.insert(tk.END, self._index_str(self._indices['y'][-1]))
+
+        # grow the internal data if the new file is longer, then add or overwrite its columns
+        if len(df.index) > len(self._df.index):
+            self._df = self._df.reindex(range(len(df.index)))
+        for col, table_col in columns.items():
+            values = df.iloc[:, col] if col < len(df.columns) else pd.Series(dtype=object)
+            numeric = pd.to_numeric(values, errors='coerce').reindex(self._df.index)
+            if table_col < len(self._table_columns):
+                self._fill_column(self._table_columns[table_col], values.fillna('').tolist())
+            else:
+                self._create_column(table_col, values.fillna('').tolist())
+            self._df[table_col] = numeric.to_numpy()
+        self._register(self._dataset_id)
+        # results of the dataset before this append must not be reused for it
+        contents = pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+        self._appended_hashes.setdefault(self._dataset_id, {})[filename] = hashlib.sha256(contents).hexdigest()
+        table_columns = set(columns.values())
+        return [i for i, y_index in enumerate(self._indices['y'])
+                if y_index[2] in table_columns and self._get_dataset_id(y_index) == self._dataset_id]
 
     def _scrollbar_h_click(self, event) :
         """
@@ -0,0 +1,171 @@
+# file:   FigureExporter.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: batch export of figures for many files.
+# Each file is parsed and rendered off-screen by a worker process, using
+# the same x- and y-selections and styling as the embedded plot, so export
+# throughput scales with the number of cores. Dense line layers are
+# rasterized inside vector outputs to keep file sizes reasonable.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import matplotlib.cm as cm
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import classes.config as config
+import classes.plotstyle as plotstyle
+import classes.readers as readers
+
+_vector_formats = ('pdf', 'svg', 'eps', 'ps')
+_rasterize_points = 100000 # line layers with more points are rasterized in vector outputs
+
+def render_figure(filename: str, x: np.array, y_list: list, style: dict, figsize=(12, 8), dpi=100) -> None:
+    """Render y_list against x with the passed style and save to filename, without any GUI backend."""
+    fig = Figure(figsize=figsize, dpi=dpi, tight_layout=True)
+    fig.set_facecolor(config.widget_bg_color)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    plotstyle.configure_plot(ax, style)
+
+    # manually choose colours to match the embedded plot
+    colours = cm.rainbow(np.linspace(0, 1, len(y_list)))
+    segments = []
+    for y in y_list:
+        length = min(len(x), len(y))
+        segments.append(np.column_stack([x[:length], y[:length]]))
+    n_points = sum(len(segment) for segment in segments)
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    rasterized = extension in _vector_formats and n_points > _rasterize_points
+    lines = LineCollection(segments, colors=colours, zorder=2, rasterized=rasterized)
+    ax.add_collection(lines, autolim=len(segments) > 0)
+    ax.autoscale_view()
+    fig.savefig(filename, bbox_inches='tight', transparent=True)
+
+def _stem(name: str) -> str:
+    """Returns the file name without its directory, compression and type extensions."""
+    return os.path.splitext(os.path.basename(readers.strip_compression(name)))[0]
+
+def _unique(name: str, used: set) -> str:
+    """Returns name, or name with the lowest free '_<n>' suffix if it is in used, and adds the result to used."""
+    unique, n = name, 1
+    while unique in used:
+        n += 1
+        unique = f'{name}_{n}'
+    used.add(unique)
+    return unique
+
+def _export_file(source: str, stem: str, indices: dict, out_dir: str, fmt: str, per_spectrum: bool,
+                 style: dict, figsize: tuple, dpi: int) -> list:
+    """
+    Worker function, exports the figures for one source file, or each table of a zip bundle, and returns the written filenames.
+    Figures are named after stem, unique among the sources, and the bundle member and selection they show.
+    """
+    errors = []
+    tables = readers.read_tables(source, errors)
+    if len(tables) == 0:
+        raise ValueError(errors[0][1] if len(errors) > 0 else "unsupported file type")
+    written = []
+    used = set()
+    for table_name, df in tables:
+        df = readers.to_numeric(df)
+        x0, x1, x_col = indices['x'][:3]
+        x = df.iloc[x0:x1, x_col].to_numpy(dtype=np.float64)
+        y_ranges = [y_index[:3] for y_index in indices['y']]
+        y_list = [df.iloc[y0:y1, col].to_numpy(dtype=np.float64) for y0, y1, col in y_ranges]
+
+        # figures of bundle members are also named after the member, compression extensions are dropped
+        member = readers.split_name(table_name)[1]
+        title = _stem(member) if member != '' else stem
+        table_stem = f'{stem}_{_stem(member)}' if member != '' else stem
+        if per_spectrum:
+            # a column can be selected more than once, with different rows
+            groups = [(f'{table_stem}_col{col+1}_row{y0+1}-{y1}', f'{title} col:{col+1}; row:{y0+1}-{y1}', [y])
+                      for (y0, y1, col), y in zip(y_ranges, y_list)]
+        else:
+            groups = [(table_stem, title, y_list)]
+        for name, title, group in groups:
+            group_style = dict(style)
+            if group_style['title'] == '':
+                group_style['title'] = title
+            filename = os.path.join(out_dir, f'{_unique(name, used)}.{fmt}')
+            render_figure(filename, x, group, group_style, figsize, dpi)
+            written.append(filename)
+    return written
+
+class FigureExporter():
+
+    def __init__(self, sources: list, indices: dict, out_dir: str, fmt='png', per_spectrum=False,
+                 style=None, figsize=(12, 8), dpi=100, max_workers=None):
+        """
+        Export one figure per source file, or per spectrum if per_spectrum is set.
+        indices are the table x- and y-selections (see EmbeddedTable.get_indices()), applied to every file.
+        """
+        if 'x' not in indices.keys() or len(indices.get('y', [])) == 0:
+            raise ValueError("x- and y-data must be selected before exporting.")
+        self._sources = list(sources)
+        self._indices = indices
+        self._out_dir = out_dir
+        self._fmt = fmt.lower().lstrip('.')
+        self._per_spectrum = per_spectrum
+        self._style = style if style is not None else {'title': '', 'x label': '', 'y label': '',
+                                                       'x limits': [0, 0], 'y limits': [0, 0],
+                                                       'x ticks': [], 'y ticks': [],
+                                                       'x tick labels': [], 'y tick labels': []}
+        self._figsize = tuple(figsize)
+        self._dpi = dpi
+        self._max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self._cancel_event = threading.Event()
+
+    def run(self, progress_cb=None) -> tuple:
+        """
+        Export all figures. progress_cb(n_done, n_total) is called after every file.
+        Returns the list of written filenames and a dictionary of source file to error message.
+        """
+        os.makedirs(self._out_dir, exist_ok=True)
+        written = []
+        errors = {}
+        n_total = len(self._sources)
+        if progress_cb is not None:
+            progress_cb(0, n_total)
+        # spawned workers never inherit the GUI process state
+        context = multiprocessing.get_context('spawn')
+        # sources with the same name in different folders get distinct figure names
+        used = set()
+        stems = [_unique(_stem(source), used) for source in self._sources]
+        with ProcessPoolExecutor(max_workers=self._max_workers, mp_context=context) as executor:
+            futures = {}
+            sources = iter(zip(self._sources, stems))
+            n_done = 0
+            while True:
+                while len(futures) < 2 * self._max_workers and not self._cancel_event.is_set():
+                    source, stem = next(sources, (None, None))
+                    if source is None:
+                        break
+                    future = executor.submit(_export_file, source, stem, self._indices, self._out_dir, self._fmt,
+                                             self._per_spectrum, self._style, self._figsize, self._dpi)
+                    futures[future] = source
+                if len(futures) == 0:
+                    break
+                done, _ = wait(futures.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = futures.pop(future)
+                    try:
+                        written.extend(future.result())
+                    except Exception as e:
+                        errors[source] = str(e)
+                    n_done += 1
+                if progress_cb is not None:
+                    progress_cb(n_done, n_total)
+        return written, errors
+
+    def cancel(self) -> None:
+        """Stop submitting files, figures already being rendered are still written."""
+        self._cancel_event.set()
@@ -0,0 +1,105 @@
+# file:   FolderWatcher.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: background detection and parsing of new spectrometer files.
+# A polling thread scans a folder for new or changed data files. A file is
+# only parsed once its size and modification time are unchanged between two
+# scans, so files still being written are not read half-finished. Parsed
+# tables are queued for the GUI thread, which collects them with get_updates().
+
+import os
+import queue
+import threading
+
+class FolderWatcher():
+
+    _TYPES = ('.dpt', '.csv', '.txt', '.xlsx', '.zip')
+    EXTENSIONS = _TYPES + tuple(extension + compression for extension in _TYPES for compression in ('.gz', '.bz2', '.xz'))
+
+    def __init__(self, folder: str, interval=1.0, extensions=EXTENSIONS, include_existing=False):
+        """
+        Watch folder every interval seconds. Files already in the folder are
+        ignored unless include_existing is set, until they change.
+        """
+        self._folder = folder
+        self._interval = interval
+        self._extensions = tuple(extension.lower() for extension in extensions)
+        self._updates = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # filename -> (mtime, size) when last seen, and when last parsed
+        self._seen = {}
+        self._parsed = {}
+        if not include_existing:
+            self._parsed = self._scan()
+
+    def get_folder(self) -> str:
+        """Returns the watched folder."""
+        return self._folder
+
+    def start(self) -> None:
+        """Start watching on a background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching, a file being parsed is finished first."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_updates(self) -> list:
+        """
+        Returns the files parsed since the last call as (filename, DataFrame, error), in the order
+        they were written. The DataFrame is None and error holds the message if parsing failed.
+        """
+        updates = []
+        while True:
+            try:
+                updates.append(self._updates.get_nowait())
+            except queue.Empty:
+                return updates
+
+    def _scan(self) -> dict:
+        """Returns (mtime, size) of every data file in the folder."""
+        signatures = {}
+        try:
+            with os.scandir(self._folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(self._extensions):
+                        stat = entry.stat()
+                        signatures[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+        return signatures
+
+    def _run(self) -> None:
+        """Worker thread entry point, never touches Tk."""
+        import classes.readers as readers
+        while not self._stop_event.is_set():
+            signatures = self._scan()
+            # stable files that are new or changed since they were last parsed, oldest first
+            ready = [filename for filename, signature in signatures.items()
+                     if self._seen.get(filename) == signature and self._parsed.get(filename) != signature]
+            for filename in sorted(ready, key=lambda filename: signatures[filename][0]):
+                if self._stop_event.is_set():
+                    break
+                try:
+                    # every table of a zip bundle is queued on its own
+                    errors = []
+                    tables = readers.read_tables(filename, errors)
+                    for name, df in tables:
+                        self._updates.put((name, df, None))
+                    for name, error in errors:
+                        self._updates.put((name, None, error))
+                    if len(tables) == 0 and len(errors) == 0:
+                        self._updates.put((filename, None, None))
+                except Exception as e:
+                    self._updates.put((filename, None, str(e)))
+                self._parsed[filename] = signatures[filename]
+            self._seen = signatures
+            self._stop_event.wait(self._interval)
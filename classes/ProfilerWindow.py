@@ -0,0 +1,92 @@
+# file:   ProfilerWindow.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: live view of the hot-path statistics collected by profiling.py,
+# with the startup breakdown below them.
+
+import tkinter as tk
+import tkinter.ttk as ttk
+
+import classes.config as config
+import classes.profiling as profiling
+
+class ProfilerWindow(tk.Toplevel):
+
+    _refresh_ms = 500
+    _columns = ['name', 'calls', 'total ms', 'mean ms', 'max ms', 'alloc KiB', 'peak KiB']
+
+    def __init__(self, parent, set_enabled=None):
+        """set_enabled(bool) is called by the toggle button, so other profiling controls stay in step."""
+        super().__init__(parent)
+        self._set_enabled = set_enabled
+
+        self.title("Profiler")
+        self.config(bg=config.widget_bg_color)
+
+        self._treeview = ttk.Treeview(self, columns=self._columns, show='headings', height=12)
+        for column in self._columns:
+            width = 260 if column == 'name' else 90
+            self._treeview.column(column, stretch=False, width=width)
+            self._treeview.heading(column, text=column)
+        self._treeview.grid(row=0, column=0, columnspan=4, sticky=tk.NSEW)
+
+        self._toggle_button = ttk.Button(self, command=self._toggle)
+        self._toggle_button.grid(row=1, column=0, pady=5)
+        self._reset_button = ttk.Button(self, text='Reset', command=profiling.reset)
+        self._reset_button.grid(row=1, column=1, pady=5)
+        self._json_button = ttk.Button(self, text='Export JSON', command=self._export_json)
+        self._json_button.grid(row=1, column=2, pady=5)
+        self._profile_button = ttk.Button(self, text='Export cProfile', command=self._export_profile)
+        self._profile_button.grid(row=1, column=3, pady=5)
+
+        # startup stages are kept by profiling.py even after the statistics are reset
+        self._startup_label = tk.Label(self, justify=tk.LEFT, font='TkFixedFont',
+                                       bg=config.widget_bg_color, fg=config.text_color)
+        self._startup_label.grid(row=2, column=0, columnspan=4, padx=5, pady=5, sticky=tk.W)
+
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Redraw the statistics table, repeats while the window is open."""
+        if not self.winfo_exists():
+            return
+        self._toggle_button.config(text='Disable' if profiling.is_enabled() else 'Enable')
+        self._startup_label.config(text='startup\n' + profiling.format_startup())
+        self._treeview.delete(*self._treeview.get_children())
+        stats = profiling.get_stats()
+        for name, stat in sorted(stats.items(), key=lambda item: -item[1]['total s']):
+            mean = stat['total s'] / stat['count'] if stat['count'] > 0 else 0
+            self._treeview.insert('', tk.END, values=[name, stat['count'],
+                                                      f"{1000 * stat['total s']:.2f}",
+                                                      f"{1000 * mean:.3f}",
+                                                      f"{1000 * stat['max s']:.2f}",
+                                                      f"{stat['alloc bytes'] / 1024:.1f}",
+                                                      f"{stat['peak bytes'] / 1024:.1f}"])
+        self.after(self._refresh_ms, self._refresh)
+
+    def _toggle(self) -> None:
+        """Enable or disable profiling."""
+        if self._set_enabled is not None:
+            self._set_enabled(not profiling.is_enabled())
+        elif profiling.is_enabled():
+            profiling.disable()
+        else:
+            profiling.enable()
+
+    def _export_json(self) -> None:
+        """Callback for saving the statistics as JSON."""
+        allowed_types = [('JSON', '*.json')]
+        filename = tk.filedialog.asksaveasfilename(filetypes=allowed_types, defaultextension=allowed_types)
+        if filename is not None and filename != '':
+            profiling.export_json(filename)
+
+    def _export_profile(self) -> None:
+        """Callback for saving the cProfile call profile."""
+        allowed_types = [('cProfile', '*.prof')]
+        filename = tk.filedialog.asksaveasfilename(filetypes=allowed_types, defaultextension=allowed_types)
+        if filename is not None and filename != '':
+            try:
+                profiling.export_profile(filename)
+            except ValueError as e:
+                tk.messagebox.showwarning(title=None, message=str(e))
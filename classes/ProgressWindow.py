@@ -0,0 +1,79 @@
+# file:   ProgressWindow.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: a small window that runs a long task on a worker thread
+# and reports its progress without blocking the GUI.
+
+import threading
+
+import tkinter as tk
+import tkinter.ttk as ttk
+
+import classes.config as config
+
+class ProgressWindow(tk.Toplevel):
+
+    _poll_ms = 100
+
+    def __init__(self, parent, title: str, task, on_done=None, on_cancel=None):
+        """
+        task(progress_cb) is run on a worker thread and may call progress_cb(n_done, n_total).
+        on_done(result, error) is called from the GUI thread once the task finishes.
+        """
+        super().__init__(parent)
+        self.title(title)
+        self.config(bg=config.widget_bg_color)
+        self.resizable(False, False)
+
+        self._progressbar = ttk.Progressbar(self, orient=tk.HORIZONTAL, length=300, mode='determinate')
+        self._progressbar.grid(row=0, column=0, padx=10, pady=10)
+        self._label = tk.Label(self, text='Starting...', bg=config.widget_bg_color, fg=config.text_color)
+        self._label.grid(row=1, column=0, padx=10)
+        self._cancel_button = ttk.Button(self, text='Cancel', command=self._cancel)
+        self._cancel_button.grid(row=2, column=0, pady=10)
+        if on_cancel is None:
+            self._cancel_button.state(['disabled'])
+
+        # shared with the worker thread, only read from the GUI thread
+        self._progress = (0, 0)
+        self._result = None
+        self._error = None
+        self._finished = False
+
+        self._on_done = on_done
+        self._on_cancel = on_cancel
+        self._thread = threading.Thread(target=self._run, args=(task,), daemon=True)
+        self._thread.start()
+        self.after(self._poll_ms, self._poll)
+
+    def _run(self, task) -> None:
+        """Worker thread entry point, never touches Tk."""
+        try:
+            self._result = task(self._set_progress)
+        except Exception as e:
+            self._error = e
+        self._finished = True
+
+    def _set_progress(self, n_done: int, n_total: int) -> None:
+        """Progress callback handed to the task."""
+        self._progress = (n_done, n_total)
+
+    def _poll(self) -> None:
+        """Update the progress display from the GUI thread."""
+        n_done, n_total = self._progress
+        if n_total > 0:
+            self._progressbar.config(maximum=n_total, value=n_done)
+            self._label.config(text=f'{n_done} / {n_total}')
+        if self._finished:
+            self.destroy()
+            if self._on_done is not None:
+                self._on_done(self._result, self._error)
+        else:
+            self.after(self._poll_ms, self._poll)
+
+    def _cancel(self) -> None:
+        """Ask the task to stop, the window closes once it has."""
+        self._label.config(text='Cancelling...')
+        self._cancel_button.state(['disabled'])
+        self._on_cancel()
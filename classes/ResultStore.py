@@ -0,0 +1,114 @@
+# file:   ResultStore.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: a local SQLite store of analytics results.
+# Results are keyed by the input file hash, the selected table ranges and
+# the segment endpoints, so re-running a tool on identical inputs, even in
+# a later session, returns the stored result instead of recomputing it.
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+class ResultStore():
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS results (
+            key         TEXT PRIMARY KEY,
+            file_hash   TEXT NOT NULL,
+            created     REAL NOT NULL,
+            last_access REAL NOT NULL,
+            analytics   TEXT NOT NULL,
+            curves      BLOB,
+            size        INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_file_hash ON results (file_hash);
+        CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+    """
+
+    def __init__(self, filename: str, max_bytes=None):
+        """Open (or create) the store at filename. If max_bytes is given, the store is pruned to that size on insert."""
+        directory = os.path.dirname(filename)
+        if directory != '':
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(filename)
+        self._connection.executescript(self._schema)
+        self._max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(file_hash: str, indices: dict, x_pts: list, y_pts: list, tool: int) -> str:
+        """Returns the lookup key for a tool run on the given inputs."""
+        params = {'file': file_hash,
+                  'indices': indices,
+                  'x points': [[float(x) for x in x_pt] for x_pt in x_pts],
+                  'y points': [[float(y) for y in y_pt] for y_pt in y_pts],
+                  'tool': tool}
+        # table indices may be numpy integers, store them as plain python numbers
+        params = json.dumps(params, sort_keys=True, default=lambda value: value.item())
+        return hashlib.sha256(params.encode()).hexdigest()
+
+    def get(self, key: str):
+        """Returns the stored (curves, analytics) for key, or None. Curves are None if they were not stored."""
+        row = self._connection.execute('SELECT analytics, curves FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with self._connection:
+            self._connection.execute('UPDATE results SET last_access = ? WHERE key = ?', (time.time(), key))
+        import pandas as pd # deferred, pandas is slow to import and not needed until a lookup hits
+        analytics = pd.read_json(io.StringIO(row[0]), orient='split')
+        curves = None
+        if row[1] is not None:
+            with np.load(io.BytesIO(row[1])) as npz:
+                curves = [npz[f'arr_{i}'] for i in range(len(npz.files))]
+        return curves, analytics
+
+    def put(self, key: str, file_hash: str, analytics: 'pd.DataFrame', curves=None) -> None:
+        """Store a result, replacing any existing result with the same key."""
+        analytics_json = analytics.to_json(orient='split', index=False, double_precision=15)
+        curves_blob = None
+        if curves is not None:
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, *curves)
+            curves_blob = buffer.getvalue()
+        size = len(analytics_json) + (len(curves_blob) if curves_blob is not None else 0)
+        now = time.time()
+        with self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                     (key, file_hash, now, now, analytics_json, curves_blob, size))
+        if self._max_bytes is not None:
+            self.prune(self._max_bytes)
+
+    def delete_file(self, file_hash: str) -> None:
+        """Remove every result computed from the given file."""
+        with self._connection:
+            self._connection.execute('DELETE FROM results WHERE file_hash = ?', (file_hash,))
+
+    def size(self) -> int:
+        """Returns the total stored payload size in bytes."""
+        return self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def prune(self, max_bytes: int) -> None:
+        """Remove the least recently used results until the stored payload is at most max_bytes."""
+        excess = self.size() - max_bytes
+        if excess <= 0:
+            return
+        keys = []
+        rows = self._connection.execute('SELECT key, size FROM results ORDER BY last_access ASC').fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append((key,))
+            excess -= size
+        with self._connection:
+            self._connection.executemany('DELETE FROM results WHERE key = ?', keys)
+        self._connection.execute('VACUUM')
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._connection.close()
@@ -0,0 +1,106 @@
+# file:   SnapIndex.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: spatial index for snapping the cursor to the nearest data point.
+# Points are kept in sorted-x order and split into fixed-size blocks with
+# precomputed x- and y-extents. A query only looks at blocks inside the
+# x-window around the cursor, ranks them by a lower bound on their distance
+# in normalized display space and only evaluates points of blocks that can
+# still contain a closer point. The index is built in data space, so it is
+# independent of the axis limits and only needs rebuilding when data changes.
+
+import numpy as np
+
+class SnapIndex():
+
+    _block_size = 256
+
+    def __init__(self, x: np.array, y_list: list):
+        """Build the index for y_list, each plotted against x."""
+        self._x_source = x
+        self._y_sources = list(y_list)
+
+        x = np.asarray(x, dtype=np.float64)
+        n_pts = len(x)
+        # sorted order of x, slices keep the series as views for monotonic x
+        diffs = np.diff(x)
+        if np.all(diffs >= 0):
+            order = slice(None)
+        elif np.all(diffs <= 0):
+            order = slice(None, None, -1)
+        else:
+            order = np.argsort(x, kind='stable')
+        self._order = order
+        self._x = x[order]
+
+        # series sorted alongside x, padded with NaNs only where shorter than x
+        self._y = []
+        for y in self._y_sources:
+            y = np.asarray(y, dtype=np.float64)
+            if len(y) >= n_pts:
+                self._y.append(y[:n_pts][order])
+            else:
+                padded = np.full(n_pts, np.nan)
+                padded[:len(y)] = y
+                self._y.append(padded[order])
+
+        # block extents, NaNs are ignored and all-NaN blocks never match
+        self._block_starts = np.arange(0, n_pts, self._block_size)
+        if n_pts > 0:
+            self._block_x_min = np.fmin.reduceat(self._x, self._block_starts)
+            self._block_x_max = np.fmax.reduceat(self._x, self._block_starts)
+            self._block_y_min = np.array([np.fmin.reduceat(y, self._block_starts) for y in self._y]).reshape(len(self._y), -1)
+            self._block_y_max = np.array([np.fmax.reduceat(y, self._block_starts) for y in self._y]).reshape(len(self._y), -1)
+
+    def matches(self, x: np.array, y_list: list) -> bool:
+        """Returns True if the index was built from exactly these arrays."""
+        return (x is self._x_source and len(y_list) == len(self._y_sources) and
+                all(y is y_source for y, y_source in zip(y_list, self._y_sources)))
+
+    def query(self, x_pt: float, y_pt: float, x_lim: tuple, y_lim: tuple, thresh: float):
+        """
+        Returns the data coordinate nearest to (x_pt, y_pt), or None if none is within thresh.
+        Distances are squared and normalized to the axis limits, as displayed.
+        """
+        if len(self._y) == 0 or len(self._x) == 0:
+            return None
+        x_scale = x_lim[1] - x_lim[0]
+        y_scale = y_lim[1] - y_lim[0]
+        radius = np.sqrt(thresh)
+
+        # points within the x-window around the cursor
+        lo = np.searchsorted(self._x, x_pt - radius * x_scale, side='left')
+        hi = np.searchsorted(self._x, x_pt + radius * x_scale, side='right')
+        if lo >= hi:
+            return None
+        b0 = lo // self._block_size
+        b1 = (hi - 1) // self._block_size + 1
+
+        # lower bound of the normalized distance from the cursor to each block
+        x_gap = np.maximum(0, np.maximum(self._block_x_min[b0:b1] - x_pt, x_pt - self._block_x_max[b0:b1])) / x_scale
+        y_gap = np.maximum(0, np.maximum(self._block_y_min[:, b0:b1] - y_pt, y_pt - self._block_y_max[:, b0:b1])) / y_scale
+        bounds = y_gap * y_gap + (x_gap * x_gap)[None, :]
+        bounds[np.isnan(bounds)] = np.inf
+        series, blocks = np.nonzero(bounds < thresh)
+        if len(series) == 0:
+            return None
+
+        # evaluate the most promising blocks first, stop once no block can be closer
+        nearest = None
+        min_radius = thresh
+        for i in np.argsort(bounds[series, blocks], kind='stable'):
+            s, b = series[i], blocks[i] + b0
+            if bounds[s, b - b0] >= min_radius:
+                break
+            start = max(lo, b * self._block_size)
+            stop = min(hi, (b + 1) * self._block_size)
+            dx = (self._x[start:stop] - x_pt) / x_scale
+            dy = (self._y[s][start:stop] - y_pt) / y_scale
+            radii = dx * dx + dy * dy
+            radii[np.isnan(radii)] = np.inf
+            index = radii.argmin()
+            if radii[index] < min_radius:
+                min_radius = radii[index]
+                nearest = (self._x[start + index], self._y[s][start + index])
+        return nearest
@@ -0,0 +1,153 @@
+# file:   SpectralEnvelope.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: single-pass summary statistics of many spectra at each x-value.
+# Spectra are added in chunks of any size, and only per-point accumulators
+# are kept, so the summarized spectra never have to be in memory together.
+# Mean and variance are merged chunk by chunk with Welford's parallel update,
+# minimum and maximum are exact, and percentiles are read from per-point
+# histograms. The histogram range of a point starts at the range of its
+# first values and is widened by merging neighbouring bins whenever values
+# fall outside of it, so percentiles are accurate to one bin width of the
+# values seen at that point.
+
+import numpy as np
+
+import classes.config as config
+from classes.SpectrumSet import SpectrumSet
+
+class SpectralEnvelope():
+
+    def __init__(self, n_points: int, n_bins=config.envelope_bins):
+        """Summarize spectra of n_points values, percentiles use n_bins histogram bins per point."""
+        self._n_points = n_points
+        self._n_bins = n_bins
+        self._count = np.zeros(n_points, dtype=np.int64)
+        self._mean = np.zeros(n_points)
+        self._m2 = np.zeros(n_points)
+        self._min = np.full(n_points, np.nan)
+        self._max = np.full(n_points, np.nan)
+        # histogram bin i of a point covers [lo + i*width, lo + (i+1)*width)
+        self._hist = np.zeros((n_points, n_bins), dtype=np.uint32)
+        self._lo = np.full(n_points, np.nan)
+        self._width = np.full(n_points, np.nan)
+
+    @classmethod
+    def from_spectra(cls, y_list: list, n_points: int, chunk_size=config.envelope_chunk_size, n_bins=config.envelope_bins):
+        """Returns the envelope of y_list, added chunk_size spectra at a time."""
+        envelope = cls(n_points, n_bins)
+        for start in range(0, len(y_list), chunk_size):
+            envelope.update(y_list[start:start + chunk_size])
+        return envelope
+
+    def get_n_points(self) -> int:
+        return self._n_points
+
+    def get_count(self) -> np.array:
+        """Returns the number of values seen at each point."""
+        return self._count.copy()
+
+    def get_mean(self) -> np.array:
+        """Returns the mean at each point, NaN where no values were seen."""
+        return np.where(self._count > 0, self._mean, np.nan)
+
+    def get_std(self) -> np.array:
+        """Returns the sample standard deviation at each point, NaN where fewer than two values were seen."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self._count > 1, np.sqrt(self._m2 / (self._count - 1)), np.nan)
+
+    def get_min(self) -> np.array:
+        return self._min.copy()
+
+    def get_max(self) -> np.array:
+        return self._max.copy()
+
+    def get_percentiles(self, percentiles: list) -> dict:
+        """Returns {percentile: values} for percentiles from 0 to 100, interpolated within the histogram bins."""
+        cumulative = np.cumsum(self._hist, axis=1, dtype=np.int64)
+        rows = np.arange(self._n_points)
+        result = {}
+        for percentile in percentiles:
+            target = percentile / 100 * self._count
+            # first bin reaching the target, then the fraction of that bin needed
+            idx = np.minimum((cumulative < target[:, None]).sum(axis=1), self._n_bins - 1)
+            before = np.where(idx > 0, cumulative[rows, np.maximum(idx - 1, 0)], 0)
+            in_bin = self._hist[rows, idx].astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.0)
+            values = self._lo + (idx + np.clip(fraction, 0, 1)) * self._width
+            values = np.clip(values, self._min, self._max)
+            result[percentile] = np.where(self._count > 0, values, np.nan)
+        return result
+
+    def update(self, y_chunk) -> None:
+        """
+        Add a chunk of spectra, a 2D array of shape (n_spectra, n_points) or a list of spectra.
+        Spectra are truncated or NaN-padded to n_points, NaN values are ignored.
+        """
+        y = SpectrumSet.stack(y_chunk, self._n_points)
+        if len(y) == 0:
+            return
+        valid = ~np.isnan(y)
+        count_b = valid.sum(axis=0)
+        seen = count_b > 0
+        if not seen.any():
+            return
+
+        # Welford/Chan merge of the chunk's mean and sum of squared deviations
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(seen, np.nansum(y, axis=0) / np.maximum(count_b, 1), 0.0)
+            m2_b = np.nansum((y - mean_b[None, :]) ** 2, axis=0)
+        count = self._count + count_b
+        delta = mean_b - self._mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self._mean = np.where(seen, self._mean + delta * count_b / np.maximum(count, 1), self._mean)
+            self._m2 = np.where(seen, self._m2 + m2_b + delta ** 2 * self._count * count_b / np.maximum(count, 1), self._m2)
+        self._count = count
+
+        with np.errstate(invalid='ignore'):
+            chunk_min = np.nanmin(np.where(valid, y, np.inf), axis=0)
+            chunk_max = np.nanmax(np.where(valid, y, -np.inf), axis=0)
+        self._min = np.where(seen, np.fmin(self._min, chunk_min), self._min)
+        self._max = np.where(seen, np.fmax(self._max, chunk_max), self._max)
+
+        self._fit_range(seen)
+        self._add_to_histograms(y, valid)
+
+    def _fit_range(self, seen: np.array) -> None:
+        """Start or widen the histogram range of every point so it covers the values seen so far."""
+        # first values at a point set its range
+        new = seen & np.isnan(self._lo)
+        if new.any():
+            span = self._max[new] - self._min[new]
+            self._lo[new] = self._min[new]
+            self._width[new] = np.where(span > 0, span, np.maximum(np.abs(self._min[new]), 1.0) * 1e-6) / self._n_bins * (1 + 1e-9)
+
+        # points whose values now fall outside of the range are widened by doubling the bin width
+        lo, width = self._lo, self._width
+        with np.errstate(invalid='ignore'):
+            outside = seen & ~new & ((self._min < lo) | (self._max >= lo + self._n_bins * width))
+        if not outside.any():
+            return
+        rows = np.flatnonzero(outside)
+        # whole old bins added below the range, then the number of doublings needed to span everything
+        shift = np.ceil(np.maximum(lo[rows] - self._min[rows], 0) / width[rows]).astype(np.int64)
+        needed = shift + np.ceil((self._max[rows] - lo[rows]) / width[rows]).astype(np.int64) + 1
+        doublings = np.maximum(np.ceil(np.log2(needed / self._n_bins)), 0).astype(np.int64)
+        old = self._hist[rows]
+        new_idx = np.minimum((np.arange(self._n_bins)[None, :] + shift[:, None]) >> doublings[:, None], self._n_bins - 1)
+        merged = np.zeros_like(old)
+        np.add.at(merged, (np.repeat(np.arange(len(rows)), self._n_bins), new_idx.ravel()), old.ravel())
+        self._hist[rows] = merged
+        self._lo[rows] = lo[rows] - shift * width[rows]
+        self._width[rows] = width[rows] * (2.0 ** doublings)
+
+    def _add_to_histograms(self, y: np.array, valid: np.array) -> None:
+        """Count the chunk's values into the histogram bins of their points."""
+        cols = np.broadcast_to(np.arange(self._n_points)[None, :], y.shape)[valid]
+        with np.errstate(invalid='ignore'):
+            bins = np.floor((y[valid] - self._lo[cols]) / self._width[cols]).astype(np.int64)
+        bins = np.clip(bins, 0, self._n_bins - 1)
+        counts = np.bincount(cols * self._n_bins + bins, minlength=self._n_points * self._n_bins)
+        self._hist += counts.reshape(self._n_points, self._n_bins).astype(np.uint32)
@@ -0,0 +1,165 @@
+# file:   SpectralIndex.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: user-defined spectral indices evaluated over many spectra.
+# An index is an arithmetic expression of wavelength references, eg.
+# (R[2200] - R[2100]) / (R[2200] + R[2100]) or depth(2100, 2300) / depth(900, 1100).
+# The expression is parsed and checked once. For a given x-grid every
+# wavelength is resolved once to the neighbouring columns and interpolation
+# weight, or to the column range of a band, then the index is evaluated as
+# array operations over all spectra at once, one value per spectrum.
+#
+# R[w]            value at wavelength w, linearly interpolated
+# mean(a, b)      mean value between wavelengths a and b
+# min(a, b)       minimum value between a and b, max(a, b) likewise
+# depth(a, b)     band depth after straight line continuum removal between a and b
+# centre(a, b)    band centre, the wavelength of the continuum-removed minimum
+# area(a, b)      band area, between the continuum-removed curve and 1
+# abs, sqrt, log, exp of an expression, numbers, + - * / ** and parentheses
+
+import ast
+import operator
+import warnings
+
+import numpy as np
+
+import classes.continuum as continuum
+from classes.SpectrumSet import SpectrumSet
+
+class SpectralIndex():
+
+    _binary_ops = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+                   ast.Div: operator.truediv, ast.Pow: operator.pow}
+    _unary_ops = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+    _functions = {'abs': np.abs, 'sqrt': np.sqrt, 'log': np.log, 'exp': np.exp}
+    _range_functions = ('mean', 'min', 'max', 'depth', 'centre', 'area')
+
+    def __init__(self, expression: str, name=None):
+        """Parse expression, raises ValueError describing the problem if it is invalid. name defaults to the expression."""
+        self._expression = expression.strip()
+        self._name = name.strip() if name is not None and name.strip() != '' else self._expression
+        try:
+            tree = ast.parse(self._expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"invalid index '{self._expression}': {e.msg}") from None
+        self._references = []   # ('R', w) or (function, a, b), resolved per x-grid
+        self._evaluate = self._compile(tree.body)
+        self._bound_x = None
+        self._resolved = None
+
+    @classmethod
+    def parse(cls, definition: str):
+        """Returns the index for a definition of the form 'name = expression' or only 'expression'."""
+        name, _, expression = definition.rpartition('=') if '=' in definition else ('', '', definition)
+        return cls(expression, name)
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_expression(self) -> str:
+        return self._expression
+
+    def evaluate(self, x: np.array, y) -> np.array:
+        """
+        Returns the index of every spectrum, y is a 2D array of shape (n_spectra, n_points) or a list of
+        spectra, truncated or NaN-padded to the x-data. Raises ValueError if a wavelength is outside of x.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = SpectrumSet.stack(y, len(x))
+        self._bind(x)
+        # spectra without values in a range give NaN, like invalid arithmetic
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            values = self._evaluate(y)
+        return np.broadcast_to(np.asarray(values, dtype=np.float64), (len(y),)).copy()
+
+    def _compile(self, node):
+        """Returns a function of the spectra matrix for an expression node, raises ValueError for unsupported syntax."""
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda y: value
+        if isinstance(node, ast.BinOp) and type(node.op) in self._binary_ops:
+            op, lhs, rhs = self._binary_ops[type(node.op)], self._compile(node.left), self._compile(node.right)
+            return lambda y: op(lhs(y), rhs(y))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self._unary_ops:
+            op, operand = self._unary_ops[type(node.op)], self._compile(node.operand)
+            return lambda y: op(operand(y))
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == 'R':
+            k = self._add_reference(('R', self._wavelength(node.slice)))
+            return lambda y: self._interpolate(y, *self._resolved[k])
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and len(node.keywords) == 0:
+            name = node.func.id
+            if name in self._functions and len(node.args) == 1:
+                function, argument = self._functions[name], self._compile(node.args[0])
+                return lambda y: function(argument(y))
+            if name in self._range_functions and len(node.args) == 2:
+                a, b = sorted(self._wavelength(arg) for arg in node.args)
+                k = self._add_reference((name, a, b))
+                return lambda y: self._range_function(name, y, self._resolved[k])
+        raise ValueError(f"invalid index '{self._expression}': unsupported expression '{ast.unparse(node)}'")
+
+    def _wavelength(self, node) -> float:
+        """Returns the number a wavelength reference node holds."""
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self._wavelength(node.operand)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return float(node.value)
+        raise ValueError(f"invalid index '{self._expression}': wavelengths must be numbers, not '{ast.unparse(node)}'")
+
+    def _add_reference(self, reference: tuple) -> int:
+        """Returns the position of reference in the resolved references, shared by repeated references."""
+        if reference not in self._references:
+            self._references.append(reference)
+        return self._references.index(reference)
+
+    def _bind(self, x: np.array) -> None:
+        """Resolve every wavelength reference to columns of x, only when x differs from the last call."""
+        if self._bound_x is not None and len(self._bound_x) == len(x) and np.array_equal(self._bound_x, x, equal_nan=True):
+            return
+        x_min, x_max = np.nanmin(x), np.nanmax(x)
+        order = np.argsort(x, kind='stable')
+        x_sorted = x[order]
+        resolved = []
+        for reference in self._references:
+            wavelengths = reference[1:]
+            for w in wavelengths:
+                if not x_min <= w <= x_max:
+                    raise ValueError(f"wavelength {w:g} in '{self._name}' is outside of the x-data ({x_min:g} to {x_max:g})")
+            if reference[0] == 'R':
+                # neighbouring columns and the weight of the upper one
+                i = min(max(np.searchsorted(x_sorted, wavelengths[0], 'right'), 1), len(x) - 1)
+                x0, x1 = x_sorted[i - 1], x_sorted[i]
+                weight = (wavelengths[0] - x0) / (x1 - x0) if x1 != x0 else 0.0
+                resolved.append((order[i - 1], order[i], min(max(weight, 0.0), 1.0)))
+            else:
+                columns = order[np.searchsorted(x_sorted, wavelengths[0], 'left'):np.searchsorted(x_sorted, wavelengths[1], 'right')]
+                if len(columns) == 0:
+                    raise ValueError(f"no x-values between {wavelengths[0]:g} and {wavelengths[1]:g} in '{self._name}'")
+                # continuum removal follows the data order, as the continuum removal tool does
+                columns = np.sort(columns)
+                resolved.append((columns, x[columns]))
+        self._resolved = resolved
+        self._bound_x = x.copy()
+
+    @staticmethod
+    def _interpolate(y: np.array, i0: int, i1: int, weight: float) -> np.array:
+        return y[:, i0] * (1 - weight) + y[:, i1] * weight
+
+    @staticmethod
+    def _range_function(name: str, y: np.array, resolved: tuple) -> np.array:
+        """Evaluate a function of a wavelength range over all spectra."""
+        columns, x_seg = resolved
+        y_seg = y[:, columns]
+        if name == 'mean':
+            return np.nanmean(y_seg, axis=1)
+        if name == 'min':
+            return np.nanmin(y_seg, axis=1)
+        if name == 'max':
+            return np.nanmax(y_seg, axis=1)
+        _, y_removed = continuum.remove_continuum(x_seg, y_seg, x_seg.min(), x_seg.max())
+        if name == 'depth':
+            return continuum.band_depth(y_removed)
+        if name == 'centre':
+            return continuum.band_centre(x_seg, y_removed)
+        return continuum.band_area(x_seg, y_removed)
@@ -0,0 +1,83 @@
+# file:   SpectrumSet.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: the selected spectra, stored once for the table, plot and analysis.
+# The x-values are a contiguous float64 array and the spectra rows of one
+# contiguous float64 matrix of the same width, padded with NaN where a
+# spectrum is shorter than the x-data and truncated where it is longer. The
+# list form of the spectra is row views of the matrix, each cut to its own
+# length, so consumers that take a list see the same data without copies.
+# Each spectrum keeps the table range it was selected from.
+
+import numpy as np
+
+class SpectrumSet():
+
+    __slots__ = ('_x', '_y', '_lengths', '_sources', '_valid', '_y_list')
+
+    def __init__(self, x: np.array, y: np.array, lengths=None, sources=None):
+        """
+        x of shape (n_points,) and y of shape (n_spectra, n_points), copied only if not already contiguous float64.
+        lengths are the number of values of each spectrum, all n_points by default. sources are the
+        (row start, row end, column, dataset id) table selections of the spectra, if any.
+        """
+        self._x = np.ascontiguousarray(x, dtype=np.float64)
+        self._y = np.ascontiguousarray(y, dtype=np.float64).reshape(-1, len(self._x))
+        self._lengths = np.full(len(self._y), len(self._x), dtype=np.int64) if lengths is None else np.asarray(lengths, dtype=np.int64)
+        self._sources = list(sources) if sources is not None else [None] * len(self._y)
+        self._valid = None
+        self._y_list = None
+
+    @classmethod
+    def from_arrays(cls, x: np.array, y_list: list, sources=None):
+        """Returns the set of y_list, each plotted against x, see stack()."""
+        n_points = len(x)
+        return cls(x, cls.stack(y_list, n_points), [min(n_points, len(y)) for y in y_list], sources)
+
+    @staticmethod
+    def stack(y_list, n_points: int) -> np.array:
+        """
+        Returns the spectra as a float matrix of shape (n_spectra, n_points), truncated or NaN-padded.
+        A matrix of that shape is returned as is, eg. SpectrumSet.get_y().
+        """
+        if isinstance(y_list, np.ndarray) and y_list.ndim == 2 and y_list.shape[1] == n_points:
+            return np.asarray(y_list, dtype=np.float64)
+        y = np.full((len(y_list), n_points), np.nan)
+        for i, spectrum in enumerate(y_list):
+            length = min(n_points, len(spectrum))
+            y[i, :length] = np.asarray(spectrum[:length], dtype=np.float64)
+        return y
+
+    def __len__(self) -> int:
+        return len(self._y)
+
+    def get_x(self) -> np.array:
+        return self._x
+
+    def get_y(self) -> np.array:
+        """Returns the spectra matrix, shape (n_spectra, n_points). Not to be modified, the list rows share it."""
+        return self._y
+
+    def get_y_list(self) -> list:
+        """Returns the spectra as a list of row views, each only as long as the spectrum."""
+        if self._y_list is None:
+            self._y_list = [row[:length] for row, length in zip(self._y, self._lengths)]
+        return self._y_list
+
+    def get_lengths(self) -> np.array:
+        return self._lengths.copy()
+
+    def is_aligned(self) -> bool:
+        """Returns True if every spectrum spans the x-data, so the matrix holds no padding."""
+        return bool(np.all(self._lengths == len(self._x)))
+
+    def get_valid(self) -> np.array:
+        """Returns the mask of values that are present, False for padding and missing values."""
+        if self._valid is None:
+            self._valid = ~np.isnan(self._y)
+        return self._valid
+
+    def get_sources(self) -> list:
+        """Returns the table selection of each spectrum as (row start, row end, column, dataset id), or None."""
+        return list(self._sources)
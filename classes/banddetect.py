@@ -0,0 +1,222 @@
+# file:   banddetect.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: automatic detection of absorption bands for continuum removal.
+# The noise of the spectra is estimated from their point to point
+# differences, and they are smoothed with a moving average wide enough that
+# the remaining noise is well below the minimum band depth, leaving NaN gaps
+# and the points beyond the ends out of the average, against which
+# band depths and shoulders are also judged. The spectra are then divided by
+# their upper convex hull, with array operations over blocks of spectra at
+# once. Points on or just below the hull are shoulders, so bands on a sloped
+# or flat continuum are found between the points where they leave and rejoin
+# it. Local maxima of the hull-corrected spectrum are also shoulders if it
+# drops by the minimum band depth next to them, which splits neighbouring
+# bands under one hull segment, while noise and small bumps inside a band
+# don't split it. Each band is the deepest minimum between two shoulders,
+# measured against the straight line joining them. Bands found in many
+# spectra are clustered while their segments overlap, and proposed as one
+# shared segment per cluster.
+
+import numpy as np
+
+import classes.config as config
+from classes.SpectrumSet import SpectrumSet
+
+_block_size = 256      # spectra processed together, bounds the temporary arrays
+_hull_tolerance = 0.25 # shoulders may lie below the hull by this fraction of the minimum band depth
+_noise_ratio = 5       # the smallest band depth in multiples of the noise left after smoothing
+_max_smoothing = 0.05  # the widest moving average window, as a fraction of the number of points
+
+def smooth(y: np.array, window: int) -> np.array:
+    """
+    Returns the moving average of each row of y over window points. Missing values and the points beyond
+    the ends are left out of the average, it is NaN where a window holds no values.
+    """
+    if window <= 1:
+        return y
+    left = window // 2
+    valid = ~np.isnan(y)
+    averages = []
+    for values in (np.where(valid, y, 0.0), valid.astype(np.float64)):
+        sums = np.cumsum(np.pad(values, ((0, 0), (left + 1, window - 1 - left))), axis=1)
+        averages.append(sums[:, window:] - sums[:, :-window])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return averages[0] / averages[1]
+
+def _fill_nan(y: np.array) -> np.array:
+    """Returns y with missing values replaced by the previous valid value of the row, or the next one at the start."""
+    missing = np.isnan(y)
+    if not missing.any():
+        return y
+    cols = np.arange(y.shape[1])[None, :]
+    previous = np.maximum.accumulate(np.where(missing, -1, cols), axis=1)
+    following = np.minimum.accumulate(np.where(missing, y.shape[1], cols)[:, ::-1], axis=1)[:, ::-1]
+    source = np.where(previous >= 0, previous, np.minimum(following, y.shape[1] - 1))
+    return np.take_along_axis(y, source, axis=1)
+
+def estimate_noise(y: np.array) -> float:
+    """
+    Returns the typical noise of the rows of y relative to their level, from the median absolute deviation
+    of their point to point differences, which a smooth spectrum barely changes.
+    """
+    diff = np.diff(y, axis=1)
+    with np.errstate(all='ignore'):
+        mad = np.median(np.abs(diff - np.median(diff, axis=1, keepdims=True)), axis=1)
+        noise = 1.4826 * mad / np.sqrt(2) / np.median(np.abs(y), axis=1)
+        noise = np.nanmedian(np.where(np.isfinite(noise), noise, np.nan))
+    return float(noise) if np.isfinite(noise) else 0.0
+
+def upper_hull(x: np.array, y: np.array) -> np.array:
+    """Returns the upper convex hull of each row of y at every point, x ascending."""
+    n_rows, n_pts = y.shape
+    cols = np.broadcast_to(np.arange(n_pts)[None, :], y.shape)
+    rows = np.arange(n_rows)[:, None]
+    tolerance = 1e-9 * np.max(np.abs(y), axis=1, keepdims=True) # rounding, not a point above the hull
+    on_hull = np.zeros(y.shape, dtype=bool)
+    on_hull[:, [0, -1]] = True
+    # add the point furthest above each segment between hull points until none is above
+    while True:
+        left = np.maximum.accumulate(np.where(on_hull, cols, 0), axis=1)
+        right = np.minimum.accumulate(np.where(on_hull, cols, n_pts - 1)[:, ::-1], axis=1)[:, ::-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(right > left, (x[None, :] - x[left]) / (x[right] - x[left]), 0)
+        hull = y[rows, left] + (y[rows, right] - y[rows, left]) * t
+        above = (y - hull).ravel()
+        starts = np.flatnonzero(on_hull.ravel())
+        segment_max = np.maximum.reduceat(above, starts)[np.cumsum(on_hull.ravel()) - 1]
+        furthest = ((above == segment_max) & (above > tolerance.repeat(n_pts))).reshape(y.shape)
+        if not furthest.any():
+            return hull
+        on_hull |= furthest
+
+def _find_bands(x: np.array, y: np.array, min_depth: float, noise=0.0) -> tuple:
+    """
+    Returns (spectrum, left shoulder, right shoulder, minimum, depth) index arrays of the bands in each row
+    of y, x ascending. noise is the relative noise left in y, bands must be deeper than _noise_ratio times it.
+    See the module description.
+    """
+    min_depth = max(min_depth, _noise_ratio * noise)
+    n_rows, n_pts = y.shape
+    cols = np.broadcast_to(np.arange(n_pts)[None, :], y.shape)
+    inner = (slice(None), slice(1, -1))
+
+    # extrema of the hull-corrected spectra, a sloped continuum has none of its own
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = y / upper_hull(x, y)
+    # the hull rests on the noise peaks, the continuum lies a few noise levels below it
+    on_hull = q >= 1 - max(_hull_tolerance * min_depth, 3 * noise)
+
+    # local extrema, plateaus count once
+    is_min = np.zeros(y.shape, dtype=bool)
+    is_max = np.zeros(y.shape, dtype=bool)
+    is_min[inner] = (q[:, 1:-1] < q[:, :-2]) & (q[:, 1:-1] <= q[:, 2:])
+    is_max[inner] = (q[:, 1:-1] > q[:, :-2]) & (q[:, 1:-1] >= q[:, 2:])
+
+    # a maximum below the hull must drop by min_depth into one of its neighbouring minima
+    rows = np.arange(n_rows)[:, None]
+    left_min = np.maximum.accumulate(np.where(is_min, cols, -1), axis=1)
+    right_min = np.minimum.accumulate(np.where(is_min, cols, n_pts)[:, ::-1], axis=1)[:, ::-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drop_left = np.where(left_min >= 0, 1 - q[rows, np.maximum(left_min, 0)] / q, 0)
+        drop_right = np.where(right_min < n_pts, 1 - q[rows, np.minimum(right_min, n_pts - 1)] / q, 0)
+    is_shoulder = on_hull | (is_max & (np.maximum(drop_left, drop_right) >= min_depth))
+
+    # shoulders either side of every minimum
+    left = np.maximum.accumulate(np.where(is_shoulder, cols, -1), axis=1)
+    right = np.minimum.accumulate(np.where(is_shoulder, cols, n_pts)[:, ::-1], axis=1)[:, ::-1]
+    r, j = np.nonzero(is_min)
+    lhs, rhs = left[r, j], right[r, j]
+    valid = (lhs >= 0) & (lhs < j) & (j < rhs) & (rhs < n_pts)
+    r, j, lhs, rhs = r[valid], j[valid], lhs[valid], rhs[valid]
+
+    # depth below the straight line between the shoulders
+    t = (x[j] - x[lhs]) / (x[rhs] - x[lhs])
+    line = y[r, lhs] + (y[r, rhs] - y[r, lhs]) * t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        depth = 1 - y[r, j] / line
+    keep = depth >= min_depth
+    r, j, lhs, rhs, depth = r[keep], j[keep], lhs[keep], rhs[keep], depth[keep]
+
+    # only the deepest minimum between each pair of shoulders
+    order = np.lexsort((-depth, lhs, r))
+    r, j, lhs, rhs, depth = r[order], j[order], lhs[order], rhs[order], depth[order]
+    first = np.ones(len(r), dtype=bool)
+    first[1:] = (r[1:] != r[:-1]) | (lhs[1:] != lhs[:-1])
+    return r[first], lhs[first], rhs[first], j[first], depth[first]
+
+def detect_bands(x: np.array, y_list: list, min_depth=config.band_detect_min_depth,
+                 smoothing=config.band_detect_smoothing, min_support=config.band_detect_min_support) -> tuple:
+    """
+    Find absorption bands in the spectra of y_list, each plotted against x.
+    smoothing is the narrowest moving average window as a fraction of the number of points, widened for noisy
+    spectra, min_depth the smallest band depth relative to the line between its shoulders, and min_support the
+    fraction of spectra a band must be found in. Returns segment endpoints as ([[x_min, x_max], ...],
+    [[y_min, y_max], ...]), in the format of EmbeddedPlot.get_selected_points(), with the y-values the median
+    of the spectra at each endpoint.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n_pts = len(x)
+    if n_pts < 3 or len(y_list) == 0:
+        return [], []
+    # work in ascending x, spectra of different lengths are truncated or padded to the x-data
+    order = np.argsort(x, kind='stable')
+    x_sorted = x[order]
+    min_window = max(1, int(round(smoothing * n_pts)))
+    max_window = max(min_window, int(round(_max_smoothing * n_pts)))
+
+    found = []
+    for start in range(0, len(y_list), _block_size):
+        block = SpectrumSet.stack(y_list[start:start + _block_size], n_pts)[:, order]
+        # widen the window until the noise left is a fraction of the band depth, averaging n points divides it by sqrt(n)
+        noise = estimate_noise(_fill_nan(block))
+        window = int(np.clip(np.ceil((_noise_ratio * noise / min_depth) ** 2), min_window, max_window))
+        # the smoothed spectra change little within a quarter window, so only every step-th point is searched.
+        # gaps are filled after smoothing, a single noisy value held across a wide gap would look like a band
+        step = max(1, window // 4)
+        block = _fill_nan(smooth(block, window)[:, ::step])
+        r, lhs, rhs, j, depth = _find_bands(x_sorted[::step], block, min_depth, noise / np.sqrt(window))
+        found.append((r + start, lhs * step, rhs * step, j * step, depth))
+    if sum(len(bands[0]) for bands in found) == 0:
+        return [], []
+    r, lhs, rhs, j, depth = (np.concatenate(values) for values in zip(*found))
+
+    # cluster bands of all spectra in order of their centre, a cluster ends at the first band whose
+    # segment doesn't overlap the part that all segments of the cluster share
+    centre_order = np.argsort(x_sorted[j], kind='stable')
+    r, lhs, rhs, j, depth = r[centre_order], lhs[centre_order], rhs[centre_order], j[centre_order], depth[centre_order]
+    splits = []
+    shared_min, shared_max = -1, n_pts
+    for k, (x_min, x_max) in enumerate(zip(lhs.tolist(), rhs.tolist())):
+        shared_min, shared_max = max(shared_min, x_min), min(shared_max, x_max)
+        if shared_min >= shared_max:
+            splits.append(k)
+            shared_min, shared_max = x_min, x_max
+    candidates = []
+    for cluster in np.split(np.arange(len(j)), splits):
+        support = len(np.unique(r[cluster])) / len(y_list)
+        if support >= min_support:
+            x_min = int(np.median(lhs[cluster]))
+            x_max = int(np.median(rhs[cluster]))
+            candidates.append((support, float(np.median(depth[cluster])), x_min, x_max))
+
+    # keep the best supported of overlapping segments
+    accepted = []
+    for support, _, x_min, x_max in sorted(candidates, reverse=True):
+        if x_max > x_min and all(x_max <= other_min or x_min >= other_max for other_min, other_max in accepted):
+            accepted.append((x_min, x_max))
+    accepted.sort()
+
+    # endpoints on data points, so they match points selected by hand
+    y_median = []
+    for x_min, x_max in accepted:
+        values = np.full((len(y_list), 2), np.nan)
+        for i, y in enumerate(y_list):
+            for k, idx in enumerate(order[[x_min, x_max]]):
+                if idx < len(y):
+                    values[i, k] = y[idx]
+        with np.errstate(all='ignore'):
+            y_median.append([float(v) for v in np.nanmedian(values, axis=0)])
+    x_pts = [[float(x_sorted[x_min]), float(x_sorted[x_max])] for x_min, x_max in accepted]
+    return x_pts, y_median
@@ -1,3 +1,5 @@
+import os
+
 bg_color = '#666666'        # primary application background colour
 widget_bg_color = '#bbbbbb' # secondary background colours, used for frames, scrollbar troughs, etc.
 hover_color = '#999999'     # colour used on mouse hover
@@ -6,3 +8,40 @@ grid_color = '#aaaaaa'
 text_pad = 12               # padding around text used in tables
 relief = 'sunken'           # flat, groove, raised, ridge, solid, or sunken
 border_width = 2            # doesn't work with ttk.Frame, leave as 2
+
+# local storage used to reuse results across sessions
+data_dir = os.path.join(os.path.expanduser('~'), '.spectral-analysis-tools')
+result_store_path = os.path.join(data_dir, 'results.sqlite')
+result_store_max_bytes = 256 * 1024 * 1024 # least recently used results are pruned beyond this size
+result_store_curves = True                 # also store continuum-removed curves, not only analytics
+
+# local analysis server, see server.py
+server_host = '127.0.0.1'                 # only reachable from this machine
+server_port = 8765
+server_max_queue = 32                     # analyses waiting for a worker before requests are rejected
+server_max_body_bytes = 256 * 1024 * 1024
+server_timeout = 300                      # seconds a request waits for its analysis
+
+# watch folder ingest, see FolderWatcher.py
+watch_interval_s = 1.0 # seconds between folder scans, files are read once unchanged for one scan
+watch_poll_ms = 500    # how often the GUI collects parsed files
+
+# continuum removal tool
+continuum_preview = True         # show the removed curve and band metrics while dragging a segment
+band_detect_min_depth = 0.02   # smallest band depth proposed by Tools -> Detect Bands, see banddetect.py
+band_detect_smoothing = 0.005  # narrowest moving average window, as a fraction of the number of points
+band_detect_min_support = 0.1  # fraction of spectra a band must be found in
+
+# aggregate display of many spectra, see SpectralEnvelope.py
+envelope_min_spectra = 500  # plots of at least this many spectra start as envelopes instead of lines
+envelope_bins = 128         # histogram bins per x-value, for percentiles
+envelope_chunk_size = 256   # spectra added to the statistics at a time
+envelope_max_points = 4096  # envelopes are reduced to at most this many x-values for drawing
+
+# Tools -> PCA and Clustering, see multivariate.py
+pca_max_points = 1024 # spectra are resampled onto a grid of at most this many points
+pca_components = 3
+pca_clusters = 4
+
+# opened files kept in memory, see DatasetRegistry.py
+dataset_memory_bytes = 512 * 1024 * 1024 # least recently used datasets are memory-mapped from disk beyond this size
@@ -0,0 +1,95 @@
+# file:   container.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: a single-file binary container for numeric arrays and metadata.
+# The container is a zip archive holding one .npy member per array and a
+# compressed JSON member for metadata. Array members are stored uncompressed
+# by default so they can be memory-mapped straight from the archive on read,
+# which makes re-opening large files nearly free.
+
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+_meta_name = 'meta.json'
+_local_header_size = 30 # fixed part of a zip local file header
+
+def write_container(filename: str, arrays: dict, meta: dict, compress=False, chunk_bytes=1 << 24) -> None:
+    """
+    Write arrays (name -> numeric np.array) and JSON-serializable meta to filename.
+    Arrays are written in chunks of about chunk_bytes so large arrays are never copied whole.
+    Compressed arrays are smaller on disk but can't be memory-mapped when read.
+    """
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    # write beside the target and swap in, arrays mapped from an existing file stay valid
+    temp_filename = filename + '.tmp'
+    with zipfile.ZipFile(temp_filename, 'w', allowZip64=True) as zf:
+        # numpy scalars are converted to plain python numbers
+        zf.writestr(_meta_name, json.dumps(meta, default=lambda value: value.item()),
+                    compress_type=zipfile.ZIP_DEFLATED)
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise ValueError(f"Array '{name}' has an object dtype and can't be stored.")
+            info = zipfile.ZipInfo(name + '.npy')
+            info.compress_type = compression
+            with zf.open(info, 'w', force_zip64=True) as f:
+                np.lib.format.write_array_header_2_0(f, np.lib.format.header_data_from_array_1_0(array))
+                flat = array.reshape(-1)
+                step = max(1, chunk_bytes // max(1, array.itemsize))
+                for i in range(0, len(flat), step):
+                    f.write(flat[i:i+step].tobytes())
+    os.replace(temp_filename, filename)
+
+def read_container(filename: str, mmap=True) -> tuple:
+    """
+    Returns (arrays, meta) from a container written by write_container.
+    Uncompressed arrays are returned as read-only memory maps if mmap is set.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filename, 'r') as zf:
+        meta = json.loads(zf.read(_meta_name))
+        with open(filename, 'rb') as raw:
+            for info in zf.infolist():
+                if not info.filename.endswith('.npy'):
+                    continue
+                name = info.filename[:-len('.npy')]
+                if mmap and info.compress_type == zipfile.ZIP_STORED:
+                    arrays[name] = _map_member(filename, raw, info)
+                else:
+                    with zf.open(info) as f:
+                        arrays[name] = np.lib.format.read_array(f)
+    return arrays, meta
+
+def _map_member(filename: str, raw, info: zipfile.ZipInfo) -> np.array:
+    """Memory-map an uncompressed .npy member in place."""
+    # the local header has variable length name and extra fields before the member data
+    raw.seek(info.header_offset)
+    local_header = raw.read(_local_header_size)
+    name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+    raw.seek(info.header_offset + _local_header_size + name_length + extra_length)
+    version = np.lib.format.read_magic(raw)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(raw)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(raw)
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    order = 'F' if fortran_order else 'C'
+    return np.memmap(filename, dtype=dtype, mode='r', offset=raw.tell(), shape=shape, order=order)
+
+def pack_ragged(arrays: list, dtype=np.float64) -> tuple:
+    """Pack a list of 1D arrays of varying length into a NaN-padded 2D array and a length array."""
+    lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+    packed = np.full((len(arrays), lengths.max() if len(arrays) > 0 else 0), np.nan, dtype=dtype)
+    for i, a in enumerate(arrays):
+        packed[i, :len(a)] = a
+    return packed, lengths
+
+def unpack_ragged(packed: np.array, lengths: np.array) -> list:
+    """Inverse of pack_ragged, returns views into packed without copying."""
+    return [packed[i, :length] for i, length in enumerate(lengths)]
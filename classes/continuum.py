@@ -0,0 +1,174 @@
+# file:   continuum.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: vectorized straight line continuum removal and band metrics.
+# Metrics operate on 2D arrays of shape (n_spectra, n_points) so many spectra
+# are handled at once. straight_line_continuum_removal() is the continuum
+# removal tool itself, shared by the GUI, the band mapper and the server.
+
+import numpy as np
+
+def segment_mask(x: np.array, x_min: float, x_max: float) -> np.array:
+    """Returns the boolean mask of x-values within the segment, endpoints included."""
+    if x_min > x_max:
+        x_min, x_max = x_max, x_min
+    return (x >= x_min) & (x <= x_max)
+
+def remove_continuum(x: np.array, y: np.array, x_min: float, x_max: float, y_min=None, y_max=None) -> tuple:
+    """
+    Performs straight line continuum removal on every row of y between x_min and x_max.
+    If y_min/y_max are not given, the continuum is anchored to each spectrum's own
+    values at the segment endpoints. Returns the segment x-values and the removed curves.
+    """
+    y = np.atleast_2d(y)
+    mask = segment_mask(x, x_min, x_max)
+    x_seg = x[mask]
+    y_seg = y[:, mask]
+    n_pts = len(x_seg)
+    if n_pts == 0:
+        return x_seg, np.empty((len(y), 0))
+    # endpoints follow the segment in index order, as np.linspace does in App
+    if y_min is None or y_max is None:
+        y_start = y_seg[:, 0]
+        y_end = y_seg[:, -1]
+    else:
+        y_start = np.broadcast_to(np.asarray(y_min, dtype=float), (len(y),))
+        y_end = np.broadcast_to(np.asarray(y_max, dtype=float), (len(y),))
+    t = np.linspace(0, 1, n_pts)
+    straight_line = y_start[:, None] + (y_end - y_start)[:, None] * t[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_removed = y_seg / straight_line
+    y_removed[y_removed > 1] = 1
+    return x_seg, y_removed
+
+def band_min(y: np.array) -> np.array:
+    """Returns the minimum value of each curve."""
+    if y.shape[1] == 0:
+        return np.full(len(y), np.nan)
+    return y.min(axis=1)
+
+def band_centre(x: np.array, y: np.array) -> np.array:
+    """Returns the x-value at the minimum value of each curve."""
+    if y.shape[1] == 0:
+        return np.full(len(y), np.nan)
+    return x[y.argmin(axis=1)]
+
+def band_depth(y: np.array) -> np.array:
+    """Returns the band depth, 1 - min(y), of each curve."""
+    return 1 - band_min(y)
+
+def band_area(x: np.array, y: np.array) -> np.array:
+    """Returns the upper area, between each curve and y=1."""
+    if y.shape[1] < 2:
+        return np.zeros(len(y))
+    # trapezoidal integration of (1 - y), equivalent to box area minus under area
+    upper = 1 - y
+    return ((upper[:, 1:] + upper[:, :-1]) * 0.5 * np.diff(x)[None, :]).sum(axis=1)
+
+def band_fwhm(x: np.array, y: np.array) -> np.array:
+    """
+    Returns the full-width half-maximum of each curve, or -1 where it is undefined.
+    fwhm is the x-width between the y-midpoints on either side of the minimum.
+    """
+    n_curves, n_pts = y.shape
+    fwhm = np.full(n_curves, -1.0)
+    if n_pts < 3:
+        return fwhm
+    min_idx = y.argmin(axis=1)
+    y_half = (y.max(axis=1) + y.min(axis=1)) / 2
+    dist = np.abs(y - y_half[:, None])
+    cols = np.arange(n_pts)[None, :]
+    # closest half-value on the minimum LHS and RHS respectively
+    lhs_idx = np.where(cols < min_idx[:, None], dist, np.inf).argmin(axis=1)
+    rhs_idx = np.where(cols > min_idx[:, None], dist, np.inf).argmin(axis=1)
+    valid = (min_idx > 0) & (min_idx < n_pts - 1)
+    fwhm[valid] = x[rhs_idx[valid]] - x[lhs_idx[valid]]
+    return fwhm
+
+def band_metrics(x: np.array, y: np.array) -> dict:
+    """Returns all band metrics for continuum-removed curves, keyed by analytics column name."""
+    return {'band fwhm': band_fwhm(x, y),
+            'band min': band_min(y),
+            'band centre': band_centre(x, y),
+            'band depth': band_depth(y),
+            'band area': band_area(x, y)}
+
+ANALYTICS_COLUMNS = ['band fwhm', 'band min', 'band centre', 'band depth', 'band area',
+                     'x min', 'x max', 'y min', 'y max']
+
+def band_fwhm_unordered(x: np.array, y: np.array) -> float:
+    """band_fwhm() for a single curve whose x-values are not strictly increasing, split by x-value instead of index."""
+    try:
+        y_min_idx = y.argmin()
+        y_half = (y.max() + y.min()) / 2
+        x_mid = x[y_min_idx]
+        x_lhs = x[(np.abs(y[x < x_mid] - y_half)).argmin()]
+        x_rhs = x[(np.abs(y[x > x_mid] - y_half)).argmin() + len(y[x <= x_mid])]
+        return x_rhs - x_lhs
+    except ValueError:
+        return -1
+
+def straight_line_continuum_removal(x: np.array, y_list: list, x_pts: list, y_pts=None, metrics=True) -> tuple:
+    """
+    Performs straight line continuum removal between each pair of x_pts, with the line running between the
+    matching y_pts, on every spectrum in y_list, then calls all analysis functions on the resultant curves.
+    If y_pts is None, each line is anchored to the spectrum's own values at the segment endpoints.
+    y_list may also be a matrix of shape (n_spectra, len(x)), eg. SpectrumSet.get_y(), processed without copying.
+    Returns the continuum-removed curves, 1 outside of the segments, and a DataFrame of analytics with
+    one row per spectrum and segment, in that order. If metrics is False only the curves are computed,
+    and the analytics are None, eg. when they were stored without the curves.
+    """
+    import pandas as pd # deferred, band mapping workers don't need it
+    x = np.asarray(x, dtype=np.float64)
+    n_segments = len(x_pts)
+    columns = {column: np.empty(len(y_list) * n_segments) for column in ANALYTICS_COLUMNS}
+    y_removed = [None] * len(y_list)
+
+    # spectra are truncated to the x-data, those of equal length are processed together
+    stacked = isinstance(y_list, np.ndarray) and y_list.ndim == 2 and y_list.shape[1] == len(x)
+    groups = {len(x): list(range(len(y_list)))} if stacked and len(y_list) > 0 else {}
+    if not stacked:
+        for i, y in enumerate(y_list):
+            groups.setdefault(min(len(x), len(y)), []).append(i)
+    for length, indices in groups.items():
+        x_group = x[:length]
+        if stacked:
+            y_raw = np.asarray(y_list, dtype=np.float64)
+        else:
+            y_raw = np.vstack([np.asarray(y_list[i][:length], dtype=np.float64) for i in indices]).reshape(len(indices), length)
+        y_continuum = np.ones_like(y_raw)
+        rows = np.asarray(indices) * n_segments
+        ascending = bool(np.all(np.diff(x_group) > 0))
+
+        for j, x_pt in enumerate(x_pts):
+            # get min/max values, swap if max < min
+            x_min, x_max = x_pt[0], x_pt[1]
+            y_min, y_max = (y_pts[j][0], y_pts[j][1]) if y_pts is not None else (None, None)
+            if x_min > x_max:
+                x_min, x_max = x_max, x_min
+                y_min, y_max = y_max, y_min
+            mask = segment_mask(x_group, x_min, x_max)
+            x_seg, y_seg = remove_continuum(x_group, y_raw, x_min, x_max, y_min, y_max)
+            y_continuum[:, mask] = y_seg
+            if not metrics:
+                continue
+            if y_min is None:
+                y_min = y_raw[:, mask][:, 0] if len(x_seg) > 0 else np.nan
+                y_max = y_raw[:, mask][:, -1] if len(x_seg) > 0 else np.nan
+
+            # analysis calculations
+            seg_metrics = band_metrics(x_seg, y_seg)
+            if not ascending:
+                seg_metrics['band fwhm'] = np.array([band_fwhm_unordered(x_seg, y) for y in y_seg], dtype=np.float64)
+            for column, values in seg_metrics.items():
+                columns[column][rows + j] = values
+            columns['x min'][rows + j] = x_min
+            columns['x max'][rows + j] = x_max
+            columns['y min'][rows + j] = y_min
+            columns['y max'][rows + j] = y_max
+
+        for k, i in enumerate(indices):
+            y_removed[i] = y_continuum[k]
+
+    return y_removed, pd.DataFrame(columns, columns=ANALYTICS_COLUMNS) if metrics else None
@@ -0,0 +1,82 @@
+# file:   export.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: binary export of analytics and continuum-removed curves.
+# Results are written column by column into a single container, either the
+# .npz container from container.py, readable with np.load and memory-mapped
+# by load_results, or HDF5 when h5py is installed. Both are written in chunks.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from classes.container import write_container, read_container, pack_ragged, unpack_ragged
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+EXPORT_VERSION = 1
+_chunk_rows = 4096
+
+def available_formats() -> list:
+    """Returns the (description, pattern) file types that can be exported on this installation."""
+    formats = [('NumPy container', '*.npz')]
+    if h5py is not None:
+        formats.append(('HDF5', '*.h5'))
+    return formats
+
+def save_results(filename: str, analytics: pd.DataFrame, x=None, curves=None) -> None:
+    """Write analytics, the x-grid and the continuum-removed curves to filename, by extension."""
+    arrays = {f'analytics/{column}': analytics[column].to_numpy(dtype=np.float64) for column in analytics.columns}
+    if x is not None:
+        arrays['x'] = np.asarray(x, dtype=np.float64)
+    if curves is not None and len(curves) > 0:
+        arrays['curves'], arrays['curve lengths'] = pack_ragged(curves)
+    meta = {'version': EXPORT_VERSION, 'columns': list(analytics.columns)}
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in ('.h5', '.hdf5'):
+        if h5py is None:
+            raise ValueError("HDF5 export requires the h5py package.")
+        _save_hdf5(filename, arrays, meta)
+    else:
+        write_container(filename, arrays, meta)
+
+def _save_hdf5(filename: str, arrays: dict, meta: dict) -> None:
+    """Write arrays as chunked, compressed HDF5 datasets, row blocks at a time."""
+    with h5py.File(filename, 'w') as f:
+        f.attrs['version'] = meta['version']
+        f.attrs['columns'] = meta['columns']
+        for name, array in arrays.items():
+            chunks = (min(len(array), _chunk_rows),) + array.shape[1:] if len(array) > 0 else None
+            dataset = f.create_dataset(name, shape=array.shape, dtype=array.dtype,
+                                       chunks=chunks, compression='gzip' if chunks is not None else None)
+            for i in range(0, len(array), _chunk_rows):
+                dataset[i:i+_chunk_rows] = array[i:i+_chunk_rows]
+
+def load_results(filename: str, mmap=True) -> tuple:
+    """
+    Returns (analytics, x, curves) from an exported file, x and curves are None if not exported.
+    Arrays from .npz exports are memory-mapped, curves are views into them.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in ('.h5', '.hdf5'):
+        if h5py is None:
+            raise ValueError("Reading HDF5 files requires the h5py package.")
+        with h5py.File(filename, 'r') as f:
+            columns = [str(column) for column in f.attrs['columns']]
+            arrays = {name: f[name][()] for name in ('x', 'curves', 'curve lengths') if name in f}
+            arrays.update({f'analytics/{column}': f['analytics'][column][()] for column in columns})
+    else:
+        arrays, meta = read_container(filename, mmap=mmap)
+        columns = meta['columns']
+    analytics = pd.DataFrame({column: np.asarray(arrays[f'analytics/{column}']) for column in columns}, columns=columns)
+    x = arrays.get('x')
+    curves = None
+    if 'curves' in arrays.keys():
+        curves = unpack_ragged(arrays['curves'], arrays['curve lengths'])
+    return analytics, x, curves
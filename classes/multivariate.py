@@ -0,0 +1,137 @@
+# file:   multivariate.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: principal component analysis and k-means clustering of spectra.
+# Spectra are interpolated onto a shared grid of bounded size and stacked
+# into one matrix. The PCA uses a randomized SVD: the matrix is multiplied
+# by a few random vectors, refined with power iterations, and only the small
+# projected matrix is decomposed exactly, so the cost grows linearly with
+# the number of spectra. k-means runs on the PCA scores with k-means++
+# starting centres and distances computed for all spectra and centres at once.
+
+import numpy as np
+
+import classes.config as config
+from classes.SpectrumSet import SpectrumSet
+
+def resample(x: np.array, y_list: list, n_max=config.pca_max_points) -> tuple:
+    """
+    Returns (grid, matrix) with the spectra of y_list, each plotted against x, linearly interpolated onto an
+    evenly spaced grid of at most n_max points over the range of x. Missing values are filled with the mean
+    of the other spectra at that point, or 0 where no spectrum has a value.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n_pts = len(x)
+    y = SpectrumSet.stack(y_list, n_pts)
+    order = np.argsort(x, kind='stable')
+    x_sorted = x[order]
+    grid = np.linspace(x_sorted[0], x_sorted[-1], min(n_pts, n_max))
+
+    # neighbouring columns and weights are shared by all spectra
+    upper = np.clip(np.searchsorted(x_sorted, grid, 'right'), 1, n_pts - 1)
+    x0, x1 = x_sorted[upper - 1], x_sorted[upper]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.clip(np.where(x1 != x0, (grid - x0) / (x1 - x0), 0.0), 0, 1)
+    matrix = y[:, order[upper - 1]] * (1 - weight) + y[:, order[upper]] * weight
+
+    missing = np.isnan(matrix)
+    if missing.any():
+        counts = (~missing).sum(axis=0)
+        means = np.where(counts > 0, np.nansum(matrix, axis=0) / np.maximum(counts, 1), 0.0)
+        matrix[missing] = np.broadcast_to(means, matrix.shape)[missing]
+    return grid, matrix
+
+def randomized_pca(matrix: np.array, n_components: int, n_oversamples=10, n_iter=4, seed=0) -> dict:
+    """
+    Returns the principal components of the rows of matrix as a dictionary of 'mean' (n_points,),
+    'components' (n_components, n_points), 'scores' (n_spectra, n_components) and 'explained variance'
+    ratios (n_components,), computed with a randomized SVD (Halko, Martinsson and Tropp, 2011).
+    """
+    n_rows, n_cols = matrix.shape
+    n_components = max(1, min(n_components, n_rows, n_cols))
+    mean = matrix.mean(axis=0)
+    centred = matrix - mean
+    total_variance = (centred ** 2).sum() / max(n_rows - 1, 1)
+
+    # orthonormal basis of the range of the centred matrix, refined by power iterations
+    rng = np.random.default_rng(seed)
+    n_random = min(n_components + n_oversamples, n_rows, n_cols)
+    basis, _ = np.linalg.qr(centred @ rng.standard_normal((n_cols, n_random)))
+    for _ in range(n_iter):
+        basis, _ = np.linalg.qr(centred.T @ basis)
+        basis, _ = np.linalg.qr(centred @ basis)
+
+    # exact SVD of the small projected matrix
+    u, s, vt = np.linalg.svd(basis.T @ centred, full_matrices=False)
+    u = basis @ u[:, :n_components]
+    s = s[:n_components]
+    vt = vt[:n_components]
+    # deterministic signs, the largest loading of each component is positive
+    signs = np.sign(vt[np.arange(len(vt)), np.abs(vt).argmax(axis=1)])
+    signs[signs == 0] = 1
+    explained = (s ** 2 / max(n_rows - 1, 1)) / total_variance if total_variance > 0 else np.zeros_like(s)
+    return {'mean': mean,
+            'components': vt * signs[:, None],
+            'scores': u * s * signs[None, :],
+            'explained variance': explained}
+
+def _squared_distances(points: np.array, centres: np.array) -> np.array:
+    """Returns the squared distance from every point to every centre, shape (n_points, n_centres)."""
+    distances = (points ** 2).sum(axis=1)[:, None] - 2 * points @ centres.T + (centres ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0)
+
+def _one_hot(labels: np.array, n_clusters: int) -> np.array:
+    """Returns the (n_clusters, n_points) membership matrix of labels, so cluster sums are a matrix product."""
+    return (labels[None, :] == np.arange(n_clusters)[:, None]).astype(np.float64)
+
+def kmeans(points: np.array, n_clusters: int, n_init=4, max_iter=100, tol=1e-6, seed=0) -> tuple:
+    """
+    Cluster the rows of points into n_clusters with Lloyd's algorithm from k-means++ starting centres,
+    keeping the best of n_init runs. Returns (labels, centres, inertia), inertia being the sum of squared
+    distances of the points to their centres.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n_points = len(points)
+    n_clusters = max(1, min(n_clusters, n_points))
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(n_init):
+        # k-means++, each centre is drawn with probability proportional to its squared distance to the others
+        centres = points[[rng.integers(n_points)]]
+        closest = _squared_distances(points, centres)[:, 0]
+        for _ in range(1, n_clusters):
+            total = closest.sum()
+            chosen = rng.choice(n_points, p=closest / total) if total > 0 else rng.integers(n_points)
+            centres = np.vstack([centres, points[chosen]])
+            closest = np.minimum(closest, _squared_distances(points, points[[chosen]])[:, 0])
+
+        for _ in range(max_iter):
+            labels = _squared_distances(points, centres).argmin(axis=1)
+            counts = np.bincount(labels, minlength=n_clusters)
+            sums = _one_hot(labels, n_clusters) @ points
+            # an emptied cluster keeps its previous centre
+            new_centres = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centres)
+            shift = ((new_centres - centres) ** 2).sum()
+            centres = new_centres
+            if shift <= tol * max((centres ** 2).sum(), 1e-12):
+                break
+        distances = _squared_distances(points, centres)
+        labels = distances.argmin(axis=1)
+        inertia = distances[np.arange(n_points), labels].sum()
+        if best is None or inertia < best[2]:
+            best = (labels, centres, inertia)
+
+    # clusters numbered by size, largest first
+    labels, centres, inertia = best
+    rank = np.argsort(-np.bincount(labels, minlength=n_clusters), kind='stable')
+    relabel = np.empty(n_clusters, dtype=np.int64)
+    relabel[rank] = np.arange(n_clusters)
+    return relabel[labels], centres[rank], float(inertia)
+
+def cluster_means(matrix: np.array, labels: np.array, n_clusters: int) -> np.array:
+    """Returns the mean spectrum of each cluster, shape (n_clusters, n_points), NaN for empty clusters."""
+    counts = np.bincount(labels, minlength=n_clusters)
+    sums = _one_hot(labels, n_clusters) @ matrix
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums / counts[:, None]
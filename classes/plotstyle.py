@@ -0,0 +1,51 @@
+# file:   plotstyle.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: plot styling shared by the embedded plot and off-screen exports.
+# A style is a dictionary as returned by EmbeddedPlot.get_style(), so any
+# figure, on screen or not, can be given the same look.
+
+import classes.config as config
+
+def configure_plot(ax, style: dict) -> None:
+    """Applies all plot options to the passed axes."""
+    configure_colours(ax)
+    configure_labels(ax, style)
+    configure_ticks(ax, style)
+    configure_limits(ax, style)
+
+def configure_colours(ax) -> None:
+    """Set the plot background and text colours"""
+    ax.axes.set_facecolor(config.text_color)
+    ax.xaxis.label.set_color(config.text_color)
+    ax.yaxis.label.set_color(config.text_color)
+    ax.set_facecolor(config.widget_bg_color)
+
+def configure_labels(ax, style: dict) -> None:
+    """Set the plot and axis labels."""
+    ax.set_title(style['title'])
+    ax.set_xlabel(style['x label'])
+    ax.set_ylabel(style['y label'])
+
+def configure_ticks(ax, style: dict) -> None:
+    """Set axis ticks, if empty, let Matplotlib decide"""
+    ax.grid(True, which='both', axis='both')
+    ax.tick_params(labelsize=12, top=True, right=True,
+                   direction='in', which='both',
+                   grid_color=config.grid_color)
+    if len(style['x ticks']) > 0 or len(style['x tick labels']) > 0:
+        ax.set_xticks(style['x ticks'])
+        ax.set_xticklabels(style['x tick labels'])
+    if len(style['y ticks']) > 0 or len(style['y tick labels']) > 0:
+        ax.set_yticks(style['y ticks'])
+        ax.set_yticklabels(style['y tick labels'])
+
+def configure_limits(ax, style: dict) -> None:
+    """Set x- and y-limits, if stored max <= min then let Matplotlib decide"""
+    x_min, x_max = style['x limits']
+    y_min, y_max = style['y limits']
+    if x_min < x_max:
+        ax.set_xlim(x_min, x_max)
+    if y_min < y_max:
+        ax.set_ylim(y_min, y_max)
@@ -0,0 +1,162 @@
+# file:   profiling.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: opt-in instrumentation of hot paths.
+# Decorated functions and spans record call counts, wall time, and memory
+# allocation and peak deltas through tracemalloc. A cProfile profiler runs
+# alongside so a full call profile can be exported. Profiling is enabled by
+# setting the SAT_PROFILE environment variable or from the Debug menu. When
+# disabled, a decorated call costs a single flag check.
+# Startup stages are always timed with startup_mark(), they cost nothing
+# after the window is up and show where cold start time goes.
+
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ENV_VAR = 'SAT_PROFILE'
+
+_enabled = False
+_owns_tracemalloc = False       # True if enable() started tracemalloc, so disable() stops it
+_profiler = None
+_local = threading.local()      # peaks of the open spans of each thread, see span()
+_stats = {}
+_lock = threading.Lock()
+_startup = []                   # (stage, seconds since the previous mark)
+_startup_last = time.perf_counter()
+
+def enable() -> None:
+    """Start recording spans, memory and the cProfile call profile."""
+    global _enabled, _owns_tracemalloc, _profiler
+    if _enabled:
+        return
+    _owns_tracemalloc = not tracemalloc.is_tracing()
+    if _owns_tracemalloc:
+        tracemalloc.start()
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    _enabled = True
+
+def disable() -> None:
+    """Stop recording, collected statistics are kept until reset(). Tracing started by others is left running."""
+    global _enabled, _owns_tracemalloc
+    if not _enabled:
+        return
+    _enabled = False
+    _profiler.disable()
+    if _owns_tracemalloc:
+        tracemalloc.stop()
+        _owns_tracemalloc = False
+
+def is_enabled() -> bool:
+    """Returns True if profiling is active."""
+    return _enabled
+
+def reset() -> None:
+    """Clear all collected statistics."""
+    global _profiler
+    with _lock:
+        _stats.clear()
+    if _enabled:
+        _profiler.disable()
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+def record(name: str, seconds: float, alloc_bytes=0, peak_bytes=0) -> None:
+    """Add one call to the statistics for name."""
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = {'count': 0, 'total s': 0.0, 'max s': 0.0, 'alloc bytes': 0, 'peak bytes': 0}
+            _stats[name] = stat
+        stat['count'] += 1
+        stat['total s'] += seconds
+        stat['max s'] = max(stat['max s'], seconds)
+        stat['alloc bytes'] += alloc_bytes
+        stat['peak bytes'] = max(stat['peak bytes'], peak_bytes)
+
+@contextmanager
+def span(name: str):
+    """
+    Time the enclosed block. Memory deltas are relative to the start of the block.
+    A nested span resets the tracemalloc peak, so the peak reached so far is kept for the enclosing span.
+    """
+    if not _enabled:
+        yield
+        return
+    peaks = getattr(_local, 'peaks', None)
+    if peaks is None:
+        peaks = _local.peaks = []
+    current_before, peak_before = tracemalloc.get_traced_memory()
+    if len(peaks) > 0:
+        peaks[-1] = max(peaks[-1], peak_before)
+    tracemalloc.reset_peak()
+    peaks.append(current_before)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (current_before, current_before)
+        peak = max(peak, peaks.pop())
+        record(name, seconds, current - current_before, peak - current_before)
+
+def profiled(name=None):
+    """Decorator recording every call of the function as a span, named after the function by default."""
+    def decorator(fn):
+        label = name if name is not None else fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def startup_mark(stage: str) -> None:
+    """Record the time since the previous mark, or since this module was imported, as a startup stage."""
+    global _startup_last
+    now = time.perf_counter()
+    seconds = now - _startup_last
+    _startup_last = now
+    _startup.append((stage, seconds))
+    record(f'startup: {stage}', seconds)
+
+def get_startup() -> list:
+    """Returns the recorded startup stages as (stage, seconds) in the order they happened."""
+    return list(_startup)
+
+def format_startup() -> str:
+    """Returns the startup breakdown as printable text."""
+    lines = [f'{stage:30s} {1000 * seconds:9.1f} ms' for stage, seconds in _startup]
+    lines.append(f'{"total":30s} {1000 * sum(seconds for _, seconds in _startup):9.1f} ms')
+    return '\n'.join(lines)
+
+def get_stats() -> dict:
+    """Returns a copy of the statistics, name -> count, total/max seconds, allocated/peak bytes."""
+    with _lock:
+        return {name: dict(stat) for name, stat in _stats.items()}
+
+def export_json(filename: str) -> None:
+    """Write the span statistics to a JSON file."""
+    with open(filename, 'w') as f:
+        json.dump(get_stats(), f, indent=2)
+
+def export_profile(filename: str) -> None:
+    """Write the cProfile call profile, readable with pstats or snakeviz."""
+    if _profiler is None:
+        raise ValueError("Profiling has not been enabled.")
+    _profiler.create_stats()
+    _profiler.dump_stats(filename)
+    if _enabled:
+        _profiler.enable()
+
+if os.environ.get(ENV_VAR, '') not in ('', '0'):
+    enable()
@@ -0,0 +1,131 @@
+# file:   readers.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: file parsing shared by the table and background jobs.
+# Kept free of any GUI code so worker processes can import it.
+# gzip, bz2, xz and zip files are recognized by their first bytes and
+# decompressed while the parser reads them, without temporary files. The
+# type of a compressed table is taken from its name without the compression
+# extension, eg. spectra.csv.gz is read as csv. Every member of a zip bundle
+# with a table extension is read, by that extension, and named
+# '<bundle>::<member>'. Members that fail to parse are skipped, so notes or
+# other stray files don't stop the rest of the bundle.
+
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import zipfile
+
+import pandas as pd
+
+MEMBER_SEP = '::' # between a zip bundle and the name of a table inside it
+
+# (first bytes, opener of a decompressing stream) of the single-file compression formats
+_compressions = [(b'\x1f\x8b', gzip.open), (b'BZh', bz2.open), (b'\xfd7zXZ\x00', lzma.open)]
+_compression_extensions = ('.gz', '.gzip', '.bz2', '.xz')
+_zip_magic = b'PK\x03\x04'
+
+def _extension(name: str) -> str:
+    """Returns the lower case file type extension of name, that of the member for tables of a zip bundle."""
+    return os.path.splitext(strip_compression(split_name(name)[1] or name))[1].lower()
+
+def _parse(source, name: str):
+    """Parse source, a path or binary stream, into a headerless DataFrame by the extension of name, or None if unsupported."""
+    df = None
+    extension = _extension(name)
+    # excel file reading
+    if extension == '.xlsx':
+        df = pd.read_excel(source, header=None)
+    # csv file reading
+    elif extension == '.csv':
+        df = pd.read_csv(source, sep=',', header=None)
+    # txt file reading, use sep=None to infer text delimeter
+    elif extension == '.txt':
+        df = pd.read_csv(source, sep=None, header=None, engine='python')
+    # dpt file reading, use sep=None to infer text delimeter
+    elif extension == '.dpt':
+        df = pd.read_csv(source, sep=None, header=None, engine='python')
+    return df
+
+def strip_compression(name: str) -> str:
+    """Returns name without a compression extension, the name of the file it decompresses to."""
+    root, extension = os.path.splitext(name)
+    return root if extension.lower() in _compression_extensions else name
+
+def _read(stream, name: str, errors=None) -> list:
+    """
+    Returns (name, DataFrame) of every table in a seekable binary stream, decompressing as it is parsed.
+    Unreadable zip members are skipped and added to errors as (name, message), if a list is given.
+    """
+    magic = stream.read(6)
+    stream.seek(0)
+    for prefix, opener in _compressions:
+        if magic.startswith(prefix):
+            # parsed by the type of the decompressed name, but named after the file that is read
+            inner = strip_compression(name)
+            with opener(stream, 'rb') as decompressed:
+                return [(name + table_name[len(inner):], df) for table_name, df in _read(decompressed, inner, errors)]
+    # xlsx files are zip archives themselves
+    if magic.startswith(_zip_magic) and _extension(name) != '.xlsx':
+        tables = []
+        with zipfile.ZipFile(stream) as bundle:
+            for info in bundle.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                    continue
+                member_name = f'{name}{MEMBER_SEP}{info.filename}'
+                try:
+                    with bundle.open(info) as member:
+                        tables.extend(_read(member, member_name, errors))
+                except Exception as e:
+                    if errors is not None:
+                        errors.append((member_name, str(e)))
+        return tables
+    df = _parse(stream, name)
+    return [] if df is None else [(name, df)]
+
+def read_tables(filename: str, errors=None) -> list:
+    """
+    Read the file at the passed path into a list of (name, headerless DataFrame), one per table it holds.
+    Plain and compressed files give one table named filename, unsupported files none.
+    Zip members that fail to parse are skipped and added to errors as (name, message), if a list is given.
+    """
+    if not os.path.isfile(filename):
+        df = _parse(filename, filename)
+        return [] if df is None else [(filename, df)]
+    with open(filename, 'rb') as f:
+        return _read(f, filename, errors)
+
+def read_hashed_tables(filename: str, errors=None) -> list:
+    """
+    Like read_tables(), but as (name, DataFrame, hash) with the sha256 hash of the bytes the table was parsed from.
+    The file is read once and parsed from memory, so the hash can't describe a later version of the file.
+    Tables of a zip bundle hash the bundle and their member name.
+    """
+    if not os.path.isfile(filename):
+        return [(name, df, None) for name, df in read_tables(filename, errors)]
+    with open(filename, 'rb') as f:
+        data = f.read()
+    tables = []
+    for name, df in _read(io.BytesIO(data), filename, errors):
+        sha = hashlib.sha256(data)
+        sha.update(split_name(name)[1].encode())
+        tables.append((name, df, sha.hexdigest()))
+    return tables
+
+def read_table(filename: str):
+    """Read the file at the passed path into a headerless DataFrame, or None if the type is unsupported. Zip bundles give their first table."""
+    tables = read_tables(filename)
+    return tables[0][1] if len(tables) > 0 else None
+
+def split_name(name: str) -> tuple:
+    """Returns (path, member) of a '<bundle>::<member>' name from read_tables(), member is '' for other names."""
+    filename, _, member = name.partition(MEMBER_SEP)
+    return filename, member
+
+def to_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns a copy of df with all non-numeric cells replaced by NaN."""
+    return df.apply(pd.to_numeric, errors='coerce')
@@ -0,0 +1,52 @@
+# file:   session.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: saving and restoring working sessions.
+# A session holds the table data and selections, the plotted data, segment
+# selections and plot configuration, and the latest tool outputs, in a single
+# container file (see container.py). Arrays are memory-mapped on restore so
+# nothing is re-parsed.
+
+import numpy as np
+import pandas as pd
+
+from classes.container import write_container, read_container
+
+SESSION_VERSION = 1
+
+def save(filename: str, table_state, plot_state, analytics=None, tool=0) -> None:
+    """
+    Save a session. table_state and plot_state are (arrays, meta) tuples from
+    EmbeddedTable.get_state() and EmbeddedPlot.get_state(), either may be None.
+    """
+    arrays = {}
+    meta = {'version': SESSION_VERSION, 'tool': tool, 'table': None, 'plot': None, 'analytics': None}
+    for key, state in (('table', table_state), ('plot', plot_state)):
+        if state is not None:
+            state_arrays, state_meta = state
+            for name, array in state_arrays.items():
+                arrays[f'{key}/{name}'] = array
+            meta[key] = state_meta
+    if analytics is not None:
+        arrays['analytics/values'] = analytics.to_numpy(dtype=np.float64)
+        meta['analytics'] = {'columns': list(analytics.columns)}
+    write_container(filename, arrays, meta)
+
+def load(filename: str) -> dict:
+    """
+    Load a session. Returns a dictionary with 'table' and 'plot' (arrays, meta) states,
+    each possibly None, the 'analytics' DataFrame or None, and the active 'tool'.
+    """
+    arrays, meta = read_container(filename, mmap=True)
+    if meta.get('version', 0) > SESSION_VERSION:
+        raise ValueError("The session was saved by a newer version of the application.")
+    session = {'tool': meta['tool'], 'table': None, 'plot': None, 'analytics': None}
+    for key in ('table', 'plot'):
+        if meta[key] is not None:
+            prefix = key + '/'
+            state_arrays = {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+            session[key] = (state_arrays, meta[key])
+    if meta['analytics'] is not None:
+        session['analytics'] = pd.DataFrame(np.asarray(arrays['analytics/values']), columns=meta['analytics']['columns'])
+    return session
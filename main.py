@@ -5,7 +5,9 @@
 # description: this is the main entrypoint for the application.
 # For implementation details, see App.py.
 
+import classes.profiling as profiling
 from classes.App import App
+profiling.startup_mark('import App')
 
 def main():
     app = App()
@@ -0,0 +1,36 @@
+# file:   server.py
+# author: Alex Krosney
+# date:   October 19, 2026
+#
+# description: entrypoint for the local analysis server.
+# Runs the continuum removal tool over HTTP without the GUI, for scripts and
+# notebooks. For implementation details and endpoints, see AnalysisServer.py.
+#
+# usage: python server.py [--host 127.0.0.1] [--port 8765] [--workers N] [--queue 32]
+
+import argparse
+
+import classes.config as config
+from classes.AnalysisServer import AnalysisServer
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the continuum removal tool over HTTP.')
+    parser.add_argument('--host', default=config.server_host)
+    parser.add_argument('--port', type=int, default=config.server_port)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to the number of CPUs')
+    parser.add_argument('--queue', type=int, default=config.server_max_queue, help='analyses allowed to wait for a worker')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    server = AnalysisServer(args.host, args.port, args.workers, args.queue, verbose=args.verbose)
+    host, port = server.get_address()
+    print(f'Serving on http://{host}:{port}, press Ctrl+C to stop.')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()